@@ -0,0 +1,124 @@
+"""
+Admission control and load shedding
+
+AdmissionController bounds how many prediction requests run at once in a
+worker. Requests over the limit wait in a short queue for a bounded time; when
+the queue is full, or the wait runs out, they are turned away at once instead
+of piling up behind CPU-bound scoring until every client times out.
+
+TokenBucketLimiter optionally limits each client to a sustained request rate
+with a burst allowance. Buckets live in memory, per worker, and the least
+recently seen clients are forgotten once max_clients is reached.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+class AdmissionController:
+    """Bounded in-flight limit with a short, bounded wait queue"""
+
+    def __init__(self, max_in_flight, queue_size=16, queue_timeout=0.1):
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def acquire(self):
+        """Admit the caller (possibly after a short wait); returns False if it should be rejected"""
+        with self._condition:
+            if self.in_flight < self.max_in_flight and not self.waiting:
+                self.in_flight += 1
+                self.admitted += 1
+                return True
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                return False
+
+            self.waiting += 1
+            self.queued += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        self.rejected += 1
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        """Mark an admitted request as finished and wake one waiter"""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def stats(self):
+        """Current load and counters for /health"""
+        with self._condition:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "queue_size": self.queue_size,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out
+            }
+
+class TokenBucketLimiter:
+    """Per-client token buckets: rate tokens per second, up to burst tokens saved"""
+
+    def __init__(self, rate, burst, max_clients=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def allow(self, client):
+        """
+        Take one token from the client's bucket
+
+        Returns (allowed, retry_after) where retry_after is the number of whole
+        seconds until a token is available again.
+        """
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.limited += 1
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        retry_after = 0 if allowed else max(1, math.ceil((1 - tokens) / self.rate))
+        return allowed, retry_after
+
+    def stats(self):
+        """Limiter settings and counters for /health"""
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "clients": len(self._buckets),
+                "limited": self.limited
+            }
@@ -0,0 +1,203 @@
+"""
+Bounded-memory live traffic analytics
+
+Fed from the prediction path, TrafficAnalytics keeps:
+
+- a counter per predicted (top-1) disease,
+- a count-min sketch over input tokens, for the count of any token, and a
+  space-saving table of the most frequent tokens (the trending list),
+- a HyperLogLog estimate of the number of distinct inputs,
+- how many inputs, and tokens, fall entirely outside the model vocabulary.
+
+Every structure has a fixed size chosen at construction, so memory does not
+grow with traffic, and no raw input is kept. Every snapshot_interval seconds
+(checked as inputs arrive) a compact summary is added to a bounded history. The class counters can be
+compared with the class distribution of the training CSV to spot drift.
+Values are per process, like /metrics.
+"""
+
+import hashlib
+import math
+import threading
+import time
+import zlib
+from array import array
+from collections import deque
+
+import numpy as np
+
+class CountMinSketch:
+    """depth x width counter table; estimates never undercount"""
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        # One flat array of 64-bit counters per row; plain indexing beats numpy for single updates
+        self.rows = [array('q', bytes(8 * width)) for _ in range(depth)]
+
+    def _columns(self, item):
+        data = item.encode('utf-8')
+        return [zlib.crc32(data, seed) % self.width for seed in range(1, self.depth + 1)]
+
+    def add(self, item, count=1):
+        """Count item"""
+        for row, column in zip(self.rows, self._columns(item)):
+            row[column] += count
+
+    def estimate(self, item):
+        """Upper-bound estimate of how often item was added"""
+        return min(row[column] for row, column in zip(self.rows, self._columns(item)))
+
+class SpaceSaving:
+    """Top-capacity heavy hitters; each count overestimates by at most its error"""
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, item):
+        if item in self.counts:
+            self.counts[item] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = 1
+            self.errors[item] = 0
+        else:
+            # Replace the smallest entry; the newcomer inherits its count as error
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[item] = floor + 1
+            self.errors[item] = floor
+
+    def top(self, n):
+        """The n largest (item, count, error) entries"""
+        ranked = sorted(self.counts.items(), key=lambda entry: (-entry[1], entry[0]))[:n]
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+class HyperLogLog:
+    """Distinct-count estimator with 2**precision one-byte registers"""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+        self.alpha = 0.7213 / (1 + 1.079 / self.size)
+
+    def add(self, item):
+        value = int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+        index = value & (self.size - 1)
+        rest = value >> self.precision
+        # Position of the lowest set bit of the remaining 64 - precision bits
+        rank = (rest & -rest).bit_length() if rest else 64 - self.precision + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self):
+        registers = np.frombuffer(bytes(self.registers), dtype=np.uint8).astype(np.int64)
+        estimate = self.alpha * self.size * self.size / float(np.sum(np.ldexp(1.0, -registers)))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * self.size and zeros:
+            # Small-range correction (linear counting)
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+def distribution_drift(observed, expected):
+    """Total variation distance and population stability index between two {name: share} maps"""
+    names = set(observed) | set(expected)
+    total_variation = 0.5 * sum(abs(observed.get(name, 0.0) - expected.get(name, 0.0)) for name in names)
+    psi = 0.0
+    for name in names:
+        # Floor both shares so classes missing on one side do not make the index infinite
+        actual = max(observed.get(name, 0.0), 1e-4)
+        reference = max(expected.get(name, 0.0), 1e-4)
+        psi += (actual - reference) * math.log(actual / reference)
+    return {"total_variation": round(total_variation, 4), "psi": round(psi, 4)}
+
+class TrafficAnalytics:
+    """Fixed-memory prediction and input statistics with periodic snapshots"""
+
+    def __init__(self, sketch_width=2048, sketch_depth=4, top_tokens=100, hll_precision=12,
+                 snapshot_interval=60.0, history=60):
+        self.sketch = CountMinSketch(sketch_width, sketch_depth)
+        self.heavy_hitters = SpaceSaving(top_tokens)
+        self.distinct = HyperLogLog(hll_precision)
+        self.snapshot_interval = snapshot_interval
+        self.snapshots = deque(maxlen=history)
+        self.class_counts = {}
+        self.inputs = 0
+        self.oov_inputs = 0
+        self.tokens = 0
+        self.oov_tokens = 0
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        self._lock = threading.Lock()
+        self._next_snapshot = time.monotonic() + snapshot_interval
+
+    def observe(self, current, symptoms, predicted_index):
+        """Record one input text and the class index it was predicted as"""
+        tokens = current.analyzer(symptoms)
+        vocabulary = current.tfidf.vocabulary_
+        in_vocabulary = sum(1 for token in tokens if token in vocabulary)
+        disease = current.class_names[predicted_index]
+        with self._lock:
+            self.inputs += 1
+            self.tokens += len(tokens)
+            self.oov_tokens += len(tokens) - in_vocabulary
+            if not in_vocabulary:
+                self.oov_inputs += 1
+            self.class_counts[disease] = self.class_counts.get(disease, 0) + 1
+            for token in tokens:
+                self.sketch.add(token)
+                self.heavy_hitters.add(token)
+            self.distinct.add(' '.join(symptoms.lower().split()))
+            if self.snapshot_interval > 0 and time.monotonic() >= self._next_snapshot:
+                self._next_snapshot = time.monotonic() + self.snapshot_interval
+                self.snapshots.append(self._summary(None, 10))
+
+    def token_count(self, token):
+        """Estimated number of times token appeared in inputs"""
+        with self._lock:
+            return self.sketch.estimate(token)
+
+    def _summary(self, current, top_n):
+        """Statistics as a dict (the caller holds the lock)"""
+        total = sum(self.class_counts.values())
+        observed = {name: count / total for name, count in self.class_counts.items()} if total else {}
+        summary = {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "inputs": self.inputs,
+            "distinct_inputs_estimate": self.distinct.estimate(),
+            "out_of_vocabulary_inputs": self.oov_inputs,
+            "out_of_vocabulary_input_rate": round(self.oov_inputs / self.inputs, 4) if self.inputs else 0.0,
+            "tokens": self.tokens,
+            "out_of_vocabulary_token_rate": round(self.oov_tokens / self.tokens, 4) if self.tokens else 0.0,
+            "predicted": dict(sorted(self.class_counts.items()))
+        }
+        if current is None:
+            return summary
+
+        vocabulary = current.tfidf.vocabulary_
+        expected = current.training_distribution
+        names = sorted(set(current.class_names) | set(self.class_counts))
+        summary["classes"] = [{
+            "disease": name,
+            "predicted": self.class_counts.get(name, 0),
+            "share": round(observed.get(name, 0.0), 4),
+            "training_share": round(expected.get(name, 0.0), 4) if expected else None
+        } for name in names]
+        summary["drift"] = distribution_drift(observed, expected) if expected and total else None
+        summary["top_tokens"] = [{
+            "token": token,
+            "count": count,
+            "max_overcount": error,
+            "in_vocabulary": token in vocabulary
+        } for token, count, error in self.heavy_hitters.top(top_n)]
+        return summary
+
+    def summary(self, current, top_n=20):
+        """Statistics compared with the training distribution of the given snapshot"""
+        with self._lock:
+            summary = self._summary(current, top_n)
+            summary["since"] = self.started_at
+            summary["snapshots"] = list(self.snapshots)
+        return summary
@@ -1,298 +1,927 @@
-"""
-Flask Backend API for Disease Prediction Chatbot
-"""
-
-import json
-import pickle
-import os
-import sys
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import numpy as np
-
-# Fix Windows console encoding for Unicode characters
-if sys.platform == 'win32':
-    try:
-        import codecs
-        sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-        sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
-    except:
-        # Fallback: use ASCII-safe characters
-        pass
-
-# ASCII-safe symbols for Windows compatibility
-CHECK = "[OK]"
-CROSS = "[X]"
-WARN = "[!]"
-
-app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
-
-# Global variables to store loaded models and data
-model = None
-tfidf = None
-mapping = None
-label_encoder = None
-
-def load_resources():
-    """Load model.pkl, tfidf.pkl, and mapping.json files"""
-    global model, tfidf, mapping, label_encoder
-    
-    try:
-        # Check if files exist
-        if not os.path.exists('model.pkl'):
-            raise FileNotFoundError("model.pkl not found in current directory")
-        if not os.path.exists('tfidf.pkl'):
-            raise FileNotFoundError("tfidf.pkl not found in current directory")
-        
-        # Load the trained ML model with proper error handling
-        print("Loading model.pkl...")
-        try:
-            # Try joblib first (more reliable for sklearn models)
-            try:
-                from joblib import load as joblib_load
-                file_size = os.path.getsize('model.pkl')
-                if file_size == 0:
-                    raise ValueError("model.pkl is empty")
-                model = joblib_load('model.pkl')
-                print(f"{CHECK} Model loaded successfully with joblib (size: {file_size} bytes)")
-            except ImportError:
-                # Fallback to pickle if joblib not available
-                with open('model.pkl', 'rb') as f:
-                    file_size = os.path.getsize('model.pkl')
-                    if file_size == 0:
-                        raise ValueError("model.pkl is empty")
-                    model = pickle.load(f)
-                    print(f"{CHECK} Model loaded successfully with pickle (size: {file_size} bytes)")
-        except Exception as e:
-            print(f"{CROSS} Error loading model.pkl: {e}")
-            print("  Tip: Try regenerating pickle files from your training script")
-            raise
-        
-        # Load the TF-IDF vectorizer with proper error handling
-        print("Loading tfidf.pkl...")
-        try:
-            # Try joblib first (more reliable for sklearn models)
-            try:
-                from joblib import load as joblib_load
-                file_size = os.path.getsize('tfidf.pkl')
-                if file_size == 0:
-                    raise ValueError("tfidf.pkl is empty")
-                tfidf = joblib_load('tfidf.pkl')
-                print(f"{CHECK} TF-IDF vectorizer loaded successfully with joblib (size: {file_size} bytes)")
-            except ImportError:
-                # Fallback to pickle if joblib not available
-                with open('tfidf.pkl', 'rb') as f:
-                    file_size = os.path.getsize('tfidf.pkl')
-                    if file_size == 0:
-                        raise ValueError("tfidf.pkl is empty")
-                    tfidf = pickle.load(f)
-                    print(f"{CHECK} TF-IDF vectorizer loaded successfully with pickle (size: {file_size} bytes)")
-        except Exception as e:
-            print(f"{CROSS} Error loading tfidf.pkl: {e}")
-            print("  Tip: Try regenerating pickle files from your training script")
-            raise
-        
-        # Load label encoder if it exists (optional)
-        if os.path.exists('label_encoder.pkl'):
-            print("Loading label_encoder.pkl...")
-            try:
-                # Try joblib first
-                try:
-                    from joblib import load as joblib_load
-                    label_encoder = joblib_load('label_encoder.pkl')
-                    print(f"{CHECK} Label encoder loaded successfully with joblib")
-                except ImportError:
-                    # Fallback to pickle
-                    with open('label_encoder.pkl', 'rb') as f:
-                        label_encoder = pickle.load(f)
-                    print(f"{CHECK} Label encoder loaded successfully with pickle")
-            except Exception as e:
-                print(f"{WARN} Warning: Could not load label_encoder.pkl: {e}")
-                print("  Label encoder is optional, continuing without it...")
-        
-        # Load mapping.json (fallback to disease_info.json if mapping.json doesn't exist)
-        if os.path.exists('mapping.json'):
-            with open('mapping.json', 'r', encoding='utf-8') as f:
-                mapping = json.load(f)
-            print(f"{CHECK} mapping.json loaded successfully")
-        elif os.path.exists('disease_info.json'):
-            with open('disease_info.json', 'r', encoding='utf-8') as f:
-                mapping = json.load(f)
-            print(f"{CHECK} disease_info.json loaded successfully (fallback)")
-        else:
-            raise FileNotFoundError("Neither mapping.json nor disease_info.json found")
-            
-        # Verify model has classes_ attribute
-        if not hasattr(model, 'classes_'):
-            print(f"{WARN} Warning: Model does not have 'classes_' attribute")
-        else:
-            print(f"{CHECK} Model has {len(model.classes_)} disease classes")
-            
-    except FileNotFoundError as e:
-        print(f"{CROSS} Error loading files: {e}")
-        print(f"Current directory: {os.getcwd()}")
-        print(f"Files in directory: {os.listdir('.')}")
-        raise
-    except Exception as e:
-        print(f"{CROSS} Error loading resources: {e}")
-        print(f"Error type: {type(e).__name__}")
-        raise
-
-@app.route('/predict', methods=['POST'])
-def predict():
-    """
-    POST endpoint to predict diseases from symptoms
-    
-    Expected JSON input:
-    {
-        "symptoms": "text",
-        "age": 22,
-        "gender": "female"
-    }
-    
-    Returns top 3 probable diseases with medication, recommendation, and description
-    """
-    try:
-        # Validate that models are loaded
-        if model is None or tfidf is None or mapping is None:
-            return jsonify({
-                "error": "Models not loaded. Please ensure all required files are present."
-            }), 500
-        
-        # Get JSON data from request
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
-        
-        # Extract input parameters
-        symptoms = data.get('symptoms', '')
-        age = data.get('age', None)
-        gender = data.get('gender', None)
-        
-        # Validate symptoms input
-        if not symptoms or not isinstance(symptoms, str):
-            return jsonify({"error": "Symptoms text is required"}), 400
-        
-        if not symptoms.strip():
-            return jsonify({"error": "Symptoms text cannot be empty"}), 400
-        
-        # Transform symptoms using TF-IDF vectorizer
-        symptoms_vectorized = tfidf.transform([symptoms])
-        
-        # Get probability predictions for all diseases
-        probabilities = model.predict_proba(symptoms_vectorized)[0]
-        
-        # Get all possible class labels (disease names)
-        disease_classes = model.classes_
-        
-        # Create list of (disease, probability) pairs
-        disease_probs = list(zip(disease_classes, probabilities))
-        
-        # Sort by probability (descending) and get top 3
-        disease_probs_sorted = sorted(disease_probs, key=lambda x: x[1], reverse=True)
-        top_3 = disease_probs_sorted[:3]
-        
-        # Build results list
-        results = []
-        for disease_label, probability in top_3:
-            # Convert disease label to string (handles numpy int64, int, string, etc.)
-            # If label_encoder exists, use it to decode numeric labels to disease names
-            if label_encoder is not None:
-                try:
-                    # If disease_label is numeric, use inverse_transform
-                    if isinstance(disease_label, (int, np.integer)):
-                        disease = label_encoder.inverse_transform([disease_label])[0]
-                    else:
-                        # Already a string, use as is
-                        disease = str(disease_label)
-                except:
-                    # Fallback to string conversion
-                    disease = str(disease_label)
-            else:
-                # No label encoder, convert to string
-                disease = str(disease_label)
-            
-            # Ensure disease is a string for mapping lookup and other operations
-            disease = str(disease)
-            
-            # Get disease information from mapping (try both string and original format)
-            disease_info = mapping.get(disease, {})
-            if not disease_info:
-                # Try with original label if disease is different
-                disease_info = mapping.get(disease_label, {})
-            
-            # Extract information with defaults if not found
-            severity = disease_info.get('severity', 'Low')
-            medication = disease_info.get('medication', 'Consult a doctor for proper medication')
-            recommendation = disease_info.get('recommendation', 'Consult a healthcare professional')
-            
-            # Safe description generation (convert disease to string for .lower())
-            disease_str = str(disease).lower() if disease else "unknown condition"
-            description = disease_info.get('description', f'Condition related to {disease_str}')
-            
-            results.append({
-                "disease": disease,  # Return as string
-                "probability": round(float(probability), 2),  # Round to 2 decimal places
-                "severity": severity,
-                "medication": medication,
-                "recommendation": recommendation,
-                "description": description
-            })
-        
-        # Build and return response
-        response = {
-            "results": results,
-            "tele_consult_link": "https://appointment.com"
-        }
-        
-        return jsonify(response), 200
-        
-    except Exception as e:
-        # Error handling
-        error_message = str(e)
-        print(f"{CROSS} Error in /predict endpoint: {error_message}")
-        return jsonify({
-            "error": "An error occurred while processing your request",
-            "details": error_message
-        }), 500
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint to verify API is running"""
-    status = {
-        "status": "healthy",
-        "model_loaded": model is not None,
-        "tfidf_loaded": tfidf is not None,
-        "mapping_loaded": mapping is not None
-    }
-    return jsonify(status), 200
-
-@app.route('/', methods=['GET'])
-def index():
-    """Root endpoint with API information"""
-    return jsonify({
-        "message": "Disease Prediction API",
-        "version": "1.0",
-        "endpoints": {
-            "POST /predict": "Predict diseases from symptoms",
-            "GET /health": "Health check endpoint"
-        }
-    }), 200
-
-if __name__ == '__main__':
-    print("=" * 50)
-    print("Disease Prediction API - Starting Server")
-    print("=" * 50)
-    
-    # Load all resources before starting the server
-    try:
-        load_resources()
-        print("\n" + "=" * 50)
-        print("Server starting on http://127.0.0.1:5000")
-        print("=" * 50 + "\n")
-        app.run(debug=True, host='0.0.0.0', port=5000)
-    except Exception as e:
-        print(f"\n{CROSS} Failed to start server: {e}")
-        print("Please ensure all required files (model.pkl, tfidf.pkl, mapping.json) are present.")
+"""
+Flask Backend API for Disease Prediction Chatbot
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from flask import Flask, request, jsonify, g
+from flask_cors import CORS
+import config
+from cache import PredictionCache, canonical_key
+from metrics import REGISTRY, REQUESTS, ERRORS, REQUEST_SECONDS, STAGE_SECONDS
+from batching import MicroBatcher
+from procpool import InferencePool, PoolClosed
+from admission import AdmissionController, TokenBucketLimiter
+from audit import AuditLog
+from analytics import TrafficAnalytics
+from registry import ModelRegistry
+from shadow import ShadowScorer
+from cases import DEFAULT_SIMILAR_CASES, MAX_SIMILAR_CASES
+from suggest import DEFAULT_LIMIT, MAX_LIMIT
+from snapshot import (CHECK, CROSS, SYNONYMS_FILE, WARN, apply_demographics, correct_texts, corrections_field,
+                      load_snapshot, rewrite_texts, rewrites_field, score_records, validate_record)
+
+# Fix Windows console encoding for Unicode characters
+if sys.platform == 'win32':
+    try:
+        import codecs
+        sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+        sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+    except:
+        # Fallback: use ASCII-safe characters
+        pass
+
+# Number of diseases returned per prediction
+TOP_K = 3
+
+# Maximum number of records accepted by /predict/batch in one request
+MAX_BATCH_SIZE = 1000
+
+# Endpoints subject to admission control and rate limiting
+ADMISSION_ENDPOINTS = frozenset(['predict', 'predict_batch'])
+
+# Seconds clients may cache /symptoms/suggest and /diseases responses
+SUGGEST_MAX_AGE = 300
+CATALOG_MAX_AGE = 300
+
+app = Flask(__name__)
+CORS(app)  # Enable CORS for React frontend
+
+# The model snapshot currently serving requests (see snapshot.py). Handlers read
+# this reference once per request; reloading swaps it for a new snapshot.
+snapshot = None
+
+# Named model versions: the primary (always the same object as snapshot) and any shadows
+model_registry = ModelRegistry()
+
+# Set once the loaded model has served a warm-up prediction in this process
+ready = False
+
+# Sample input used to warm up a freshly loaded model
+WARMUP_SYMPTOMS = "fever headache fatigue"
+
+# Cache of probability rows keyed on model version and canonical input (disabled when CACHE_SIZE is 0)
+prediction_cache = PredictionCache(config.CACHE_SIZE, config.CACHE_TTL) if config.CACHE_SIZE > 0 else None
+
+# Serializes reloads; requests never take this lock
+_reload_lock = threading.Lock()
+
+# Outcome of the most recent reload attempt, reported on /health
+reload_status = {
+    "in_progress": False,
+    "last_attempt": None,
+    "last_success": None,
+    "last_error": None
+}
+
+def load_resources(model_dir=None):
+    """Load the model artifacts from model_dir and make them the serving snapshot"""
+    global snapshot
+    snapshot = load_snapshot(model_dir or config.MODEL_DIR)
+    model_registry.register(config.MODEL_NAME, snapshot, primary=True)
+    if prediction_cache is not None:
+        prediction_cache.clear()
+    return snapshot
+
+def load_shadow_models(shadow_models=None):
+    """
+    Load the configured shadow model versions into the registry
+
+    A shadow that fails to load is reported and skipped; shadows never affect
+    what the primary serves.
+    """
+    shadow_models = config.SHADOW_MODELS if shadow_models is None else shadow_models
+    for name, model_dir in shadow_models.items():
+        if name == model_registry.primary:
+            print(f"{WARN} Shadow model name {name!r} is the primary's name, skipping it")
+            continue
+        print(f"Loading shadow model {name!r} from {model_dir}...")
+        try:
+            shadow = load_snapshot(model_dir)
+            warm_up(shadow)
+        except Exception as e:
+            print(f"{CROSS} Could not load shadow model {name!r}: {e}")
+            continue
+        model_registry.register(name, shadow)
+        print(f"{CHECK} Shadow model {name!r} loaded (version {shadow.version})")
+
+def warm_up(target=None, start_pool=True):
+    """
+    Run one uncached prediction so the first real request does not pay first-call costs
+
+    For the serving snapshot this also starts the process's inference pool
+    (when configured) before marking the process ready. create_app passes
+    start_pool=False, since under preload_app it runs in the gunicorn master,
+    which never serves requests.
+    """
+    global ready
+    target = target or snapshot
+    probabilities = target.predict_proba([WARMUP_SYMPTOMS])[0]
+    target.render_results(probabilities, TOP_K)
+    # With correction on by default, nearly every request needs the spelling index
+    if config.SPELL_CORRECTION:
+        target.corrector.build_index()
+    if target is snapshot:
+        if start_pool:
+            start_inference_pool(target)
+        ready = True
+
+def reload_model(model_dir=None):
+    """
+    Load, validate and warm up new artifacts, then swap them in atomically
+
+    Returns True on success. On any failure the current snapshot keeps serving
+    and the error is recorded in reload_status.
+    """
+    global snapshot
+    with _reload_lock:
+        reload_status["in_progress"] = True
+        reload_status["last_attempt"] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        try:
+            candidate = load_snapshot(model_dir or config.MODEL_DIR)
+            warm_up(candidate)
+            # A serving process gets the new snapshot's pool running before the swap
+            if inference_pool_for(snapshot) is not None:
+                start_inference_pool(candidate)
+        except Exception as e:
+            print(f"{CROSS} Model reload failed, keeping version {snapshot.version if snapshot else None}: {e}")
+            reload_status["last_error"] = f"{type(e).__name__}: {e}"
+            return False
+        finally:
+            reload_status["in_progress"] = False
+
+        # A single reference assignment: requests already running keep the old snapshot
+        previous = snapshot
+        snapshot = candidate
+        model_registry.register(config.MODEL_NAME, candidate, primary=True)
+        if prediction_cache is not None:
+            prediction_cache.clear()
+        reload_status["last_success"] = reload_status["last_attempt"]
+        reload_status["last_error"] = None
+        print(f"{CHECK} Model reloaded: {previous.version if previous else None} -> {candidate.version}")
+        return True
+
+def start_reload():
+    """Run reload_model() on a background thread; returns False if one is already running"""
+    if reload_status["in_progress"] or _reload_lock.locked():
+        return False
+    threading.Thread(target=reload_model, name='model-reload', daemon=True).start()
+    return True
+
+def _artifact_mtimes(model_dir):
+    """Modification times of the artifact files a reload would read"""
+    names = ['model.bundle', 'model.pkl', 'tfidf.pkl', 'label_encoder.pkl', 'mapping.json', 'disease_info.json',
+             SYNONYMS_FILE]
+    mtimes = {}
+    for name in names:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            mtimes[name] = os.path.getmtime(path)
+    return mtimes
+
+_watcher_pid = None
+
+def start_artifact_watcher(interval=None, model_dir=None):
+    """
+    Poll the artifact files and reload when they change
+
+    Runs one daemon thread per serving process: threads do not survive
+    fork, so gunicorn workers start their own from post_fork and the master
+    runs none. Disabled when the interval is 0. Returns an Event that stops
+    the watcher when set, or None when no watcher was started.
+    """
+    global _watcher_pid
+    interval = config.RELOAD_WATCH_INTERVAL if interval is None else interval
+    if interval <= 0 or _watcher_pid == os.getpid():
+        return None
+    _watcher_pid = os.getpid()
+    model_dir = model_dir or config.MODEL_DIR
+    stop = threading.Event()
+
+    def watch():
+        seen = _artifact_mtimes(model_dir)
+        while not stop.wait(interval):
+            current = _artifact_mtimes(model_dir)
+            if current != seen:
+                # Give writers a moment to finish before reading the new files
+                time.sleep(min(interval, 1.0))
+                seen = _artifact_mtimes(model_dir)
+                print(f"{WARN} Model artifacts changed, reloading...")
+                reload_model(model_dir)
+
+    threading.Thread(target=watch, name='artifact-watcher', daemon=True).start()
+    return stop
+
+def create_app(model_dir=None):
+    """
+    Application factory for WSGI servers
+
+    Loads the model resources once per process and warms them up. Under
+    gunicorn with preload_app (see gunicorn.conf.py) this runs in the master
+    before the workers are forked, so all workers share the loaded model
+    copy-on-write instead of each loading its own. Threads and pool processes
+    started here would stay in the master, so the artifact watcher and the
+    inference pool are started by each serving process instead (gunicorn's
+    post_fork, or the development server below).
+    """
+    if snapshot is None:
+        load_resources(model_dir)
+        warm_up(start_pool=False)
+        load_shadow_models()
+    return app
+
+def parse_top_k(value, current):
+    """Validate the optional top_k request parameter, returning (k, error)"""
+    if value is None:
+        return TOP_K, None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        return None, "top_k must be a positive integer"
+    return min(value, len(current.class_names)), None
+
+def parse_similar_cases(value):
+    """Validate the optional similar_cases request parameter, returning (n, error)"""
+    if value is None or value is False:
+        return 0, None
+    if value is True:
+        return DEFAULT_SIMILAR_CASES, None
+    if not isinstance(value, int) or value < 1:
+        return None, "similar_cases must be true, false or a positive integer"
+    return min(value, MAX_SIMILAR_CASES), None
+
+def parse_flag(data, name, default=False):
+    """Validate an optional boolean request flag, returning (value, error)"""
+    value = data.get(name)
+    if value is None:
+        return default, None
+    if not isinstance(value, bool):
+        return None, f"{name} must be true or false"
+    return value, None
+
+# Worker processes scoring the serving snapshot outside the GIL (None until started by warm_up in
+# the serving process, and unless INFERENCE_PROCESSES is set)
+inference_pool = None
+_inference_pool_lock = threading.Lock()
+
+def start_inference_pool(current=None):
+    """
+    Start this process's inference pool for a snapshot (the serving one by default)
+
+    Pipes and worker processes are not shared across fork, so every serving
+    process starts its own: warm_up does it in gunicorn's post_fork and in the
+    development server, before the process reports ready, and a reload starts
+    one for the new snapshot before swapping it in. The pool it replaces is
+    closed in the background. Returns None unless INFERENCE_PROCESSES is set.
+    """
+    global inference_pool
+    current = current or snapshot
+    if config.INFERENCE_PROCESSES <= 0:
+        return None
+    with _inference_pool_lock:
+        # A pool inherited through fork belongs to the parent; only replace our own
+        previous = inference_pool if inference_pool is not None and inference_pool.pid == os.getpid() else None
+        if previous is not None and previous.snapshot is current:
+            return previous
+        pool = InferencePool(current, config.INFERENCE_PROCESSES)
+        inference_pool = pool
+    if previous is not None:
+        threading.Thread(target=previous.close, name='inference-pool-close', daemon=True).start()
+    print(f"{CHECK} Inference pool started: {pool.processes} processes, "
+          f"{pool.shared_bytes} bytes of shared model arrays (version {current.version})")
+    return pool
+
+def inference_pool_for(current):
+    """This process's running pool for a snapshot, or None to score in-process"""
+    pool = inference_pool
+    if pool is not None and pool.snapshot is current and pool.pid == os.getpid():
+        return pool
+    return None
+
+def close_inference_pool():
+    """Stop this process's inference pool and free its shared memory (called at interpreter exit)"""
+    pool = inference_pool
+    if pool is not None and pool.pid == os.getpid():
+        pool.close()
+
+atexit.register(close_inference_pool)
+
+def score_texts(current, symptom_texts):
+    """Vectorize symptom texts and score them with one predict_proba call"""
+    pool = inference_pool_for(current)
+    if pool is not None:
+        try:
+            with STAGE_SECONDS.time('inference_pool'):
+                return pool.predict_proba(symptom_texts)
+        except PoolClosed:
+            # Replaced by a reload while this request waited; score in-process below
+            pass
+
+    # Transform symptoms using TF-IDF vectorizer
+    with STAGE_SECONDS.time('transform'):
+        symptoms_vectorized = current.tfidf.transform(symptom_texts)
+
+    # Get probability predictions for all diseases
+    with STAGE_SECONDS.time('predict_proba'):
+        return current.model.predict_proba(symptoms_vectorized)
+
+# Coalesces concurrent single-text predictions into one scoring call (disabled unless configured)
+micro_batcher = MicroBatcher(
+    score_texts,
+    max_batch_size=config.MICROBATCH_MAX_SIZE,
+    max_wait=config.MICROBATCH_MAX_WAIT_MS / 1000.0
+) if config.MICROBATCH_ENABLED else None
+
+# Copies sampled requests to the shadow models off the request path
+shadow_scorer = ShadowScorer(model_registry, config.SHADOW_FRACTION, config.SHADOW_QUEUE_SIZE)
+
+def predict_probabilities(current, symptom_texts):
+    """
+    Return one probability row per symptom text, scored by the given snapshot
+
+    Rows for inputs already seen (in canonical form) come from the prediction
+    cache; the rest are vectorized and scored together in one call. A single
+    uncached text goes through the micro-batcher when it is enabled, so
+    concurrent requests share that call.
+    """
+    rows = [None] * len(symptom_texts)
+    keys = [None] * len(symptom_texts)
+    if prediction_cache is not None:
+        with STAGE_SECONDS.time('cache_lookup'):
+            for i, symptoms in enumerate(symptom_texts):
+                # The version keeps rows from a previous model out even if a request races a reload
+                keys[i] = (current.version, canonical_key(current.analyzer, current.tfidf.vocabulary_, symptoms))
+                rows[i] = prediction_cache.get(keys[i])
+
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if missing:
+        if micro_batcher is not None and len(missing) == 1:
+            probabilities = [micro_batcher.predict(current, symptom_texts[missing[0]], config.MICROBATCH_TIMEOUT)]
+        else:
+            probabilities = score_texts(current, [symptom_texts[i] for i in missing])
+
+        for i, row in zip(missing, probabilities):
+            # Copy so a cached row does not keep the whole batch matrix alive
+            row = row.copy()
+            row.flags.writeable = False
+            rows[i] = row
+            if prediction_cache is not None:
+                prediction_cache.put(keys[i], row)
+
+    # Shadow models see the same (corrected) texts; this only samples and enqueues
+    shadow_scorer.offer(current, symptom_texts, rows)
+    return rows
+
+def json_response(body, status=200):
+    """Wrap an already serialized JSON body in a response"""
+    return app.response_class(body, status=status, mimetype='application/json')
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started, for the request latency histogram"""
+    g.request_start = time.perf_counter()
+
+# Bounds concurrent prediction requests in this worker (disabled unless configured)
+admission_controller = AdmissionController(
+    config.ADMISSION_MAX_IN_FLIGHT,
+    queue_size=config.ADMISSION_QUEUE_SIZE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT_MS / 1000.0
+) if config.ADMISSION_MAX_IN_FLIGHT > 0 else None
+
+# Per-client token buckets for the prediction endpoints (disabled unless configured)
+rate_limiter = TokenBucketLimiter(
+    config.RATE_LIMIT_PER_SECOND, config.RATE_LIMIT_BURST
+) if config.RATE_LIMIT_PER_SECOND > 0 else None
+
+# Background-written record of every prediction (disabled unless a directory is configured)
+audit_log = AuditLog(
+    config.AUDIT_LOG_DIR,
+    queue_size=config.AUDIT_QUEUE_SIZE,
+    max_bytes=config.AUDIT_MAX_BYTES,
+    max_age=config.AUDIT_MAX_AGE
+) if config.AUDIT_LOG_DIR else None
+
+# Fixed-memory statistics of predictions and inputs for /stats (disabled unless configured)
+traffic_analytics = TrafficAnalytics(
+    snapshot_interval=config.ANALYTICS_SNAPSHOT_INTERVAL
+) if config.ANALYTICS_ENABLED else None
+
+def rejection(message, status, retry_after, error_type):
+    """Fast error response telling the client when to try again"""
+    g.error_type = error_type
+    response = jsonify({"error": message, "retry_after": retry_after})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.before_request
+def admit_request():
+    """Rate-limit and admit prediction requests; shed the rest before any work is done"""
+    if request.endpoint not in ADMISSION_ENDPOINTS:
+        return None
+
+    if rate_limiter is not None:
+        client = request.headers.get(config.RATE_LIMIT_KEY_HEADER) if config.RATE_LIMIT_KEY_HEADER else None
+        allowed, retry_after = rate_limiter.allow(client or request.remote_addr)
+        if not allowed:
+            return rejection("Rate limit exceeded, please retry later", 429, retry_after, 'rate_limited')
+
+    if admission_controller is not None:
+        if not admission_controller.acquire():
+            return rejection("Server is overloaded, please retry later", 503,
+                             config.ADMISSION_RETRY_AFTER, 'overloaded')
+        g.admitted = True
+    return None
+
+@app.teardown_request
+def release_admission(exc=None):
+    """Free the request's admission slot, however the request ended"""
+    if g.pop('admitted', False):
+        admission_controller.release()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and its latency; failed requests are also counted by error type"""
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    start = g.get('request_start')
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+    REQUESTS.inc(endpoint, str(response.status_code))
+    if response.status_code >= 400:
+        default_type = 'server_error' if response.status_code >= 500 else 'client_error'
+        ERRORS.inc(endpoint, g.get('error_type', default_type))
+    return response
+
+def collect_runtime_metrics():
+    """Cache counters and model info, read at scrape time"""
+    lines = []
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        for name in ('hits', 'misses', 'evictions', 'expirations'):
+            metric = f'symptomsense_cache_{name}_total'
+            lines += [f'# HELP {metric} Prediction cache {name}', f'# TYPE {metric} counter', f'{metric} {stats[name]}']
+        lines += ['# HELP symptomsense_cache_entries Prediction cache entries',
+                  '# TYPE symptomsense_cache_entries gauge', f'symptomsense_cache_entries {stats["size"]}']
+    if admission_controller is not None:
+        stats = admission_controller.stats()
+        lines += ['# HELP symptomsense_admission_in_flight Prediction requests running',
+                  '# TYPE symptomsense_admission_in_flight gauge', f'symptomsense_admission_in_flight {stats["in_flight"]}',
+                  '# HELP symptomsense_admission_waiting Prediction requests waiting for a slot',
+                  '# TYPE symptomsense_admission_waiting gauge', f'symptomsense_admission_waiting {stats["waiting"]}']
+        for name in ('queued', 'rejected', 'timed_out'):
+            metric = f'symptomsense_admission_{name}_total'
+            lines += [f'# HELP {metric} Prediction requests {name.replace("_", " ")} by admission control',
+                      f'# TYPE {metric} counter', f'{metric} {stats[name]}']
+    if rate_limiter is not None:
+        lines += ['# HELP symptomsense_rate_limited_total Prediction requests rejected by the per-client rate limit',
+                  '# TYPE symptomsense_rate_limited_total counter', f'symptomsense_rate_limited_total {rate_limiter.limited}']
+    current = snapshot
+    if current is not None:
+        lines += ['# HELP symptomsense_model_info Active model version',
+                  '# TYPE symptomsense_model_info gauge',
+                  f'symptomsense_model_info{{version="{current.version}",source="{current.source}"}} 1']
+    return lines
+
+REGISTRY.add_collector(collect_runtime_metrics)
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    """
+    POST endpoint to predict diseases from symptoms
+    
+    Expected JSON input:
+    {
+        "symptoms": "text",
+        "age": 22,
+        "gender": "female",
+        "top_k": 3,         (optional)
+        "demographics": true,   (optional, reweight by age and gender; default from config)
+        "synonyms": true,       (optional, rewrite layman phrases to symptom terms; default from config)
+        "autocorrect": true,    (optional, fix misspelled symptoms; default from config)
+        "explain": false,       (optional, include the tree's decision path)
+        "similar_cases": 5      (optional, true or a count: most similar labeled dataset cases)
+    }
+    
+    Returns top k (default 3) probable diseases with medication, recommendation, and description,
+    plus "corrections": [{"from": "hedache", "to": "headache"}] when misspelled words were corrected,
+    "rewrites": [{"from": "throwing up", "to": "vomiting"}] when layman phrases were rewritten,
+    and "explanation": {"path", "matched_terms", "leaf", "depth"} when explain is true, and
+    "similar_cases": [{"case", "symptoms", "disease", "age_group", "gender", "similarity"}] when requested
+    """
+    try:
+        # Pin the serving snapshot for the whole request
+        current = snapshot
+
+        # Validate that models are loaded
+        if current is None:
+            return jsonify({
+                "error": "Models not loaded. Please ensure all required files are present."
+            }), 500
+        
+        # Get JSON data from request
+        with STAGE_SECONDS.time('parse'):
+            data = request.get_json(silent=True)
+
+        if data is None:
+            return jsonify({"error": "Request body must be valid JSON"}), 400
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        # Extract and validate input parameters
+        symptoms, age, gender, error = validate_record(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        k, error = parse_top_k(data.get('top_k'), current)
+        if error:
+            return jsonify({"error": error}), 400
+
+        use_demographics, error = parse_flag(data, 'demographics', config.DEMOGRAPHIC_PRIORS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        use_synonyms, error = parse_flag(data, 'synonyms', config.SYNONYMS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        use_autocorrect, error = parse_flag(data, 'autocorrect', config.SPELL_CORRECTION)
+        if error:
+            return jsonify({"error": error}), 400
+
+        explain, error = parse_flag(data, 'explain')
+        if error:
+            return jsonify({"error": error}), 400
+        if explain and current.explainer is None:
+            return jsonify({"error": "Explanations are only available for decision tree models"}), 400
+
+        n_similar, error = parse_similar_cases(data.get('similar_cases'))
+        if error:
+            return jsonify({"error": error}), 400
+        if n_similar and current.case_index is None:
+            return jsonify({"error": "Similar cases need the training dataset next to the model"}), 400
+
+        # Rewrite layman phrases ("throwing up") to canonical symptom terms ("vomiting")
+        rewrites = None
+        if use_synonyms and current.rewriter is not None:
+            (symptoms,), (rewrites,) = rewrite_texts(current, [symptoms])
+
+        # Map misspelled symptom words to the model vocabulary
+        corrections = None
+        if use_autocorrect:
+            (symptoms,), (corrections,) = correct_texts(current, [symptoms])
+        
+        # Get probability predictions for all diseases (cached for repeated inputs)
+        probabilities = predict_probabilities(current, [symptoms])[0]
+
+        # Adjust for the patient's age group and gender
+        if use_demographics:
+            probabilities = apply_demographics(current, [probabilities], [(age, gender)])[0]
+        
+        # Render the top k diseases from the precomputed result table
+        with STAGE_SECONDS.time('top_k'):
+            results = current.render_results(probabilities, k)
+
+        if traffic_analytics is not None:
+            with STAGE_SECONDS.time('analytics'):
+                traffic_analytics.observe(current, data.get('symptoms'), int(probabilities.argmax()))
+
+        # Decision path of the (corrected) input through the tree: O(depth), no model call
+        explanation = ''
+        if explain:
+            with STAGE_SECONDS.time('explain'):
+                explanation = ('"explanation":' + json.dumps(
+                    current.explainer.explain(current.tfidf, symptoms), sort_keys=True, separators=(',', ':')) + ',')
+
+        # Nearest labeled dataset cases by cosine similarity of the (corrected) input
+        similar_cases = ''
+        if n_similar:
+            with STAGE_SECONDS.time('similar_cases'):
+                similar_cases = (',"similar_cases":' + json.dumps(
+                    current.case_index.similar(current.tfidf, symptoms, n_similar), sort_keys=True,
+                    separators=(',', ':')))
+
+        # Hand the prediction to the audit log writer (queued, never written here)
+        if audit_log is not None:
+            audit_log.record('/predict', current.version, data.get('symptoms'), age, gender, probabilities,
+                             current.class_names, k, time.perf_counter() - g.request_start)
+        
+        # Build and return response
+        with STAGE_SECONDS.time('serialize'):
+            response = json_response(
+                '{' + corrections_field(corrections) + explanation + '"results":' + results + rewrites_field(rewrites) + similar_cases
+                + ',"tele_consult_link":"https://appointment.com"}'
+            )
+        return response
+        
+    except Exception as e:
+        # Error handling
+        g.error_type = type(e).__name__
+        error_message = str(e)
+        print(f"{CROSS} Error in /predict endpoint: {error_message}")
+        return jsonify({
+            "error": "An error occurred while processing your request",
+            "details": error_message
+        }), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    POST endpoint to predict diseases for many symptom records in one pass
+
+    Expected JSON input:
+    {
+        "records": [
+            {"symptoms": "text", "age": 22, "gender": "female"},
+            ...
+        ],
+        "top_k": 3,         (optional)
+        "demographics": true,   (optional)
+        "synonyms": true,       (optional)
+        "autocorrect": true     (optional)
+    }
+
+    All valid records are vectorized into a single matrix and scored with one
+    predict_proba call. Invalid records get a per-item error instead of failing
+    the whole batch. Items are returned in input order.
+    """
+    try:
+        # Pin the serving snapshot for the whole request
+        current = snapshot
+
+        # Validate that models are loaded
+        if current is None:
+            return jsonify({
+                "error": "Models not loaded. Please ensure all required files are present."
+            }), 500
+
+        # Get JSON data from request (accept a bare list as well)
+        with STAGE_SECONDS.time('parse'):
+            data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({"error": "Request body must be valid JSON"}), 400
+        records = data.get('records') if isinstance(data, dict) else data
+
+        if not isinstance(records, list):
+            return jsonify({"error": "A list of records is required"}), 400
+
+        # Request options sit next to the records (a bare list uses the defaults)
+        options = data if isinstance(data, dict) else {}
+        k, error = parse_top_k(options.get('top_k'), current)
+        if error:
+            return jsonify({"error": error}), 400
+
+        use_demographics, error = parse_flag(options, 'demographics', config.DEMOGRAPHIC_PRIORS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        use_synonyms, error = parse_flag(options, 'synonyms', config.SYNONYMS)
+        if error:
+            return jsonify({"error": error}), 400
+
+        use_autocorrect, error = parse_flag(options, 'autocorrect', config.SPELL_CORRECTION)
+        if error:
+            return jsonify({"error": error}), 400
+
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({
+                "error": f"Batch too large: {len(records)} records (maximum {MAX_BATCH_SIZE})"
+            }), 413
+
+        # Validate every record (keeping per-item errors) and score the valid ones in one pass,
+        # with the same pipeline as score_file.py
+        items, valid, probabilities = score_records(current, records, k, use_demographics, use_autocorrect,
+                                                    use_synonyms, predict=predict_probabilities)
+
+        if traffic_analytics is not None and valid:
+            with STAGE_SECONDS.time('analytics'):
+                for (_, symptoms, _, _), row in zip(valid, probabilities):
+                    traffic_analytics.observe(current, symptoms, int(row.argmax()))
+
+        if audit_log is not None and valid:
+            latency = time.perf_counter() - g.request_start
+            for (_, symptoms, age, gender), row in zip(valid, probabilities):
+                audit_log.record('/predict/batch', current.version, symptoms, age, gender, row,
+                                 current.class_names, k, latency)
+
+        with STAGE_SECONDS.time('serialize'):
+            response = json_response('{"results":[' + ','.join(items) + '],"tele_consult_link":"https://appointment.com"}')
+        return response
+
+    except Exception as e:
+        # Error handling
+        g.error_type = type(e).__name__
+        error_message = str(e)
+        print(f"{CROSS} Error in /predict/batch endpoint: {error_message}")
+        return jsonify({
+            "error": "An error occurred while processing your request",
+            "details": error_message
+        }), 500
+
+@app.route('/symptoms/suggest', methods=['GET'])
+def suggest_symptoms():
+    """
+    GET endpoint for symptom autocomplete
+
+    Query parameters: q (the text typed so far) and limit (optional, 1-20,
+    default 8). Answers from the snapshot's prefix index, whole symptom
+    phrases before single vocabulary terms, most frequent first:
+    {"query": "hea", "suggestions": ["severe headache", "headache"]}
+    """
+    current = snapshot
+    if current is None:
+        return jsonify({
+            "error": "Models not loaded. Please ensure all required files are present."
+        }), 500
+
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', str(DEFAULT_LIMIT))
+    limit = int(limit) if limit.isdigit() else 0
+    if not 1 <= limit <= MAX_LIMIT:
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_LIMIT}"}), 400
+
+    suggestions = current.suggest_index.suggest(query, limit)
+    response = json_response(json.dumps({"query": query, "suggestions": suggestions}, separators=(',', ':')))
+    response.headers['Cache-Control'] = f'public, max-age={SUGGEST_MAX_AGE}'
+    return response
+
+def catalog_response(precomputed):
+    """Serve a precomputed catalog body: gzip when the client accepts it, 304 on a matching ETag"""
+    if request.accept_encodings['gzip']:
+        body, etag, encoding = precomputed.gzipped, precomputed.gzip_etag, 'gzip'
+    else:
+        body, etag, encoding = precomputed.body, precomputed.etag, None
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'public, max-age={CATALOG_MAX_AGE}'
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/diseases', methods=['GET'])
+def list_diseases():
+    """
+    GET endpoint listing every disease the model can predict
+
+    Returns {"count": n, "diseases": [{"disease", "severity", "medication",
+    "recommendation", "description"}, ...]} in model class order. The body is
+    built once per model version; send If-None-Match to get a 304 when it has
+    not changed.
+    """
+    current = snapshot
+    if current is None:
+        return jsonify({
+            "error": "Models not loaded. Please ensure all required files are present."
+        }), 500
+    return catalog_response(current.catalog.listing)
+
+@app.route('/diseases/<name>', methods=['GET'])
+def get_disease(name):
+    """GET endpoint for one disease's catalog entry (name is case-insensitive)"""
+    current = snapshot
+    if current is None:
+        return jsonify({
+            "error": "Models not loaded. Please ensure all required files are present."
+        }), 500
+    precomputed = current.catalog.get(name)
+    if precomputed is None:
+        return jsonify({"error": f"Unknown disease: {name}"}), 404
+    return catalog_response(precomputed)
+
+@app.route('/stats', methods=['GET'])
+def traffic_stats():
+    """
+    Live prediction and input statistics of this worker
+
+    Predicted disease counts next to the training class distribution (with
+    total variation distance and PSI), the most frequent input tokens,
+    out-of-vocabulary rates, an estimate of distinct inputs, and the periodic
+    snapshots kept in memory. ?token=word adds that token's estimated count.
+    """
+    current = snapshot
+    if traffic_analytics is None:
+        return jsonify({"error": "Traffic analytics are disabled (SYMPTOMSENSE_ANALYTICS=0)"}), 404
+    if current is None:
+        return jsonify({
+            "error": "Models not loaded. Please ensure all required files are present."
+        }), 500
+    stats = traffic_analytics.summary(current)
+    token = request.args.get('token')
+    if token:
+        stats["token"] = {"token": token, "count": traffic_analytics.token_count(token.lower())}
+    return jsonify(stats), 200
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint to verify API is running"""
+    current = snapshot
+    pool = inference_pool_for(current)
+    status = {
+        "status": "healthy",
+        "model_loaded": current is not None,
+        "tfidf_loaded": current is not None,
+        "mapping_loaded": current is not None,
+        "model": current.info() if current is not None else None,
+        "reload": dict(reload_status),
+        "registry": model_registry.info(),
+        "shadow": shadow_scorer.stats(),
+        "inference_pool": pool.info() if pool is not None else None,
+        "admission": admission_controller.stats() if admission_controller is not None else None,
+        "rate_limit": rate_limiter.stats() if rate_limiter is not None else None,
+        "audit_log": audit_log.stats() if audit_log is not None else None,
+        "cache": prediction_cache.stats() if prediction_cache is not None else None
+    }
+    return jsonify(status), 200
+
+@app.route('/livez', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the worker process is up and answering requests"""
+    return jsonify({"status": "alive", "pid": os.getpid()}), 200
+
+@app.route('/readyz', methods=['GET'])
+def readiness_check():
+    """Readiness probe: the model is loaded and warmed up in this worker, and its inference pool is running"""
+    # With INFERENCE_PROCESSES set, this worker's pool must be running as well
+    pool_ready = config.INFERENCE_PROCESSES <= 0 or inference_pool_for(snapshot) is not None
+    is_ready = ready and snapshot is not None and pool_ready
+    status = {
+        "status": "ready" if is_ready else "not ready",
+        "pid": os.getpid(),
+        "model_loaded": snapshot is not None,
+        "warmed_up": ready,
+        "inference_pool": pool_ready
+    }
+    return jsonify(status), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of this worker's counters and latency histograms"""
+    return app.response_class(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Reload the model artifacts in this worker without downtime
+
+    Requires the X-Admin-Token header to match SYMPTOMSENSE_ADMIN_TOKEN; the
+    endpoint is disabled when no token is configured. The reload runs in the
+    background; poll /health for its outcome.
+    """
+    if not config.ADMIN_TOKEN:
+        return jsonify({"error": "Reload endpoint is disabled (SYMPTOMSENSE_ADMIN_TOKEN not set)"}), 403
+    if request.headers.get('X-Admin-Token') != config.ADMIN_TOKEN:
+        return jsonify({"error": "Invalid admin token"}), 403
+
+    if not start_reload():
+        return jsonify({"status": "reload already in progress"}), 409
+    return jsonify({
+        "status": "reload started",
+        "current_version": snapshot.version if snapshot is not None else None
+    }), 202
+
+@app.route('/', methods=['GET'])
+def index():
+    """Root endpoint with API information"""
+    return jsonify({
+        "message": "Disease Prediction API",
+        "version": "1.0",
+        "endpoints": {
+            "POST /predict": "Predict diseases from symptoms",
+            "POST /predict/batch": "Predict diseases for a list of symptom records",
+            "GET /symptoms/suggest": "Symptom autocomplete (?q=prefix&limit=8)",
+            "GET /diseases": "List the diseases the model can predict",
+            "GET /diseases/<name>": "Details of one disease",
+            "GET /stats": "Live prediction and input statistics (per worker)",
+            "GET /health": "Health check endpoint",
+            "GET /livez": "Liveness probe",
+            "GET /readyz": "Readiness probe (model loaded and warmed up)",
+            "GET /metrics": "Prometheus metrics (per worker)",
+            "POST /admin/reload": "Reload model artifacts without downtime (admin token required)"
+        }
+    }), 200
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("Disease Prediction API - Starting Server")
+    print("=" * 50)
+    
+    # Load all resources before starting the server
+    # (development server only; see gunicorn.conf.py for production serving)
+    try:
+        create_app()
+        # This process serves requests itself, so it runs the inference pool and the artifact
+        # watcher (when configured)
+        start_inference_pool()
+        start_artifact_watcher()
+        print("\n" + "=" * 50)
+        print("Server starting on http://127.0.0.1:5000")
+        print("=" * 50 + "\n")
+        app.run(debug=True, host='0.0.0.0', port=5000)
+    except Exception as e:
+        print(f"\n{CROSS} Failed to start server: {e}")
+        print("Please ensure all required files (model.pkl, tfidf.pkl, mapping.json) are present.")
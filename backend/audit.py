@@ -0,0 +1,193 @@
+"""
+Non-blocking prediction audit log
+
+Request threads hand each prediction to AuditLog.record(), which only puts a
+tuple on a bounded queue: nothing is formatted or written on the request path,
+and when the queue is full the record is dropped and counted instead of
+waiting. A writer thread drains the queue in batches, renders JSON lines and
+appends them to the current log file, which is rotated by size and by age.
+
+Each process writes its own file (audit-<pid>.jsonl), so gunicorn workers never
+interleave writes. Rotated files are renamed to audit-<pid>-<timestamp>.jsonl.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from metrics import REGISTRY
+from snapshot import CROSS, top_k_indices
+
+AUDIT_RECORDS = REGISTRY.counter(
+    'symptomsense_audit_records_total', 'Prediction audit records by outcome (written or dropped)', ('outcome',))
+
+# Records written per batch at most
+WRITE_BATCH = 512
+
+class AuditLog:
+    """Bounded in-memory queue plus a background JSONL writer with rotation"""
+
+    def __init__(self, directory, queue_size=10000, max_bytes=50 * 1024 * 1024, max_age=3600.0,
+                 flush_interval=1.0):
+        self.directory = directory
+        self.queue_size = queue_size
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._opened_at = 0.0
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+    def _ensure_started(self):
+        """Start the writer thread if this process does not have one yet"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # A queue or file inherited through fork belongs to the parent
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._file = None
+                os.makedirs(self.directory, exist_ok=True)
+                threading.Thread(target=self._run, name='audit-writer', daemon=True).start()
+                atexit.register(self.close)
+                self._pid = os.getpid()
+
+    def record(self, endpoint, version, symptoms, age, gender, probabilities, class_names, k, latency):
+        """Queue one prediction for the log; never blocks, drops the record when the queue is full"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((time.time(), endpoint, version, symptoms, age, gender,
+                                    probabilities, class_names, k, latency))
+        except queue.Full:
+            self.dropped += 1
+            AUDIT_RECORDS.inc('dropped')
+
+    @staticmethod
+    def render(entry):
+        """One JSON line for a queued record"""
+        timestamp, endpoint, version, symptoms, age, gender, probabilities, class_names, k, latency = entry
+        results = [[class_names[index], round(float(probabilities[index]), 4)]
+                   for index in top_k_indices(probabilities, k)]
+        return json.dumps({
+            "ts": round(timestamp, 3),
+            "endpoint": endpoint,
+            "model": version,
+            "symptoms": symptoms,
+            "age": age,
+            "gender": gender,
+            "results": results,
+            "latency_ms": round(latency * 1000, 3)
+        }, separators=(',', ':'), default=str)
+
+    def _path(self):
+        return os.path.join(self.directory, f'audit-{os.getpid()}.jsonl')
+
+    def _rotate_if_needed(self):
+        """Close and rename the current file when it is too large or too old"""
+        if self._file is None:
+            return
+        too_big = self.max_bytes > 0 and self._file.tell() >= self.max_bytes
+        too_old = self.max_age > 0 and time.time() - self._opened_at >= self.max_age
+        if not (too_big or too_old):
+            return
+        self._file.close()
+        self._file = None
+        path = self._path()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+        rotated = os.path.join(self.directory, f'audit-{os.getpid()}-{stamp}.jsonl')
+        suffix = 1
+        while os.path.exists(rotated):
+            rotated = os.path.join(self.directory, f'audit-{os.getpid()}-{stamp}.{suffix}.jsonl')
+            suffix += 1
+        os.replace(path, rotated)
+        self.rotations += 1
+
+    def _write(self, batch):
+        """Append a batch of records to the current file, opening or rotating it as needed"""
+        self._rotate_if_needed()
+        if self._file is None:
+            self._file = open(self._path(), 'a', encoding='utf-8')
+            self._opened_at = time.time()
+        self._file.write(''.join(self.render(entry) + '\n' for entry in batch))
+        self._file.flush()
+        self.written += len(batch)
+        AUDIT_RECORDS.inc('written', amount=len(batch))
+
+    def _drain(self, first=None):
+        """Take everything queued (at most WRITE_BATCH records), starting with first"""
+        batch = [first] if first is not None else []
+        while len(batch) < WRITE_BATCH:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _done(self, batch):
+        """Mark a drained batch as handled, for close() to wait on"""
+        for _ in batch:
+            self._queue.task_done()
+
+    def _run(self):
+        """Writer loop: wait for records, write them in batches, rotate on schedule"""
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                with self._write_lock:
+                    try:
+                        self._rotate_if_needed()
+                    except OSError as e:
+                        print(f"{CROSS} Audit log rotation failed: {e}")
+                continue
+            with self._write_lock:
+                batch = self._drain(first)
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    print(f"{CROSS} Audit log write failed: {e}")
+                finally:
+                    self._done(batch)
+
+    def flush(self):
+        """Write whatever is still queued"""
+        with self._write_lock:
+            try:
+                while not self._queue.empty():
+                    batch = self._drain()
+                    try:
+                        self._write(batch)
+                    finally:
+                        self._done(batch)
+            except Exception as e:
+                print(f"{CROSS} Audit log flush failed: {e}")
+
+    def close(self):
+        """Flush and close the current file (called at interpreter exit; a later record reopens it)"""
+        self.flush()
+        # A batch the writer thread took before the flush is written before the file is closed
+        self._queue.join()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        """Counters for /health"""
+        return {
+            "directory": self.directory,
+            "queued": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations
+        }
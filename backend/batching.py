@@ -0,0 +1,111 @@
+"""
+Micro-batching scheduler for single-text predictions
+
+Concurrent /predict requests each enqueue their symptom text and wait on a
+future. A scheduler thread takes the first waiting item, keeps collecting
+until either max_wait has passed since that item arrived or max_batch_size
+items are queued, then runs one vectorized transform + predict_proba for the
+whole group and hands every caller its own probability row.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import REGISTRY
+
+BATCH_SIZE = REGISTRY.histogram(
+    'symptomsense_microbatch_size', 'Texts scored per micro-batch flush',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'symptomsense_microbatch_queue_wait_seconds', 'Time a text waited in the micro-batch queue')
+
+class _Item:
+    """One queued text, the snapshot that must score it and the caller's future"""
+
+    __slots__ = ('current', 'text', 'future', 'enqueued')
+
+    def __init__(self, current, text):
+        self.current = current
+        self.text = text
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-text predictions into vectorized batches
+
+    score(current, texts) must return one probability row per text. The
+    scheduler thread starts on first use in each process, so the batcher can
+    be created before gunicorn forks its workers.
+    """
+
+    def __init__(self, score, max_batch_size=32, max_wait=0.002):
+        self.score = score
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        """Start the scheduler thread if this process does not have one yet"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # A queue inherited through fork may hold items whose waiters do not exist here
+                self._queue = queue.SimpleQueue()
+                threading.Thread(target=self._run, name='micro-batcher', daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, current, text):
+        """Queue one text for scoring by the given snapshot; returns a Future of its probability row"""
+        self._ensure_started()
+        item = _Item(current, text)
+        self._queue.put(item)
+        return item.future
+
+    def predict(self, current, text, timeout=None):
+        """Score one text through the batcher and wait for its row"""
+        return self.submit(current, text).result(timeout)
+
+    def _run(self):
+        """Scheduler loop: gather a batch, flush it, repeat"""
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            deadline = first.enqueued + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """Score a batch in one call per snapshot and resolve every caller's future"""
+        now = time.perf_counter()
+        for item in batch:
+            QUEUE_WAIT_SECONDS.observe(now - item.enqueued)
+        BATCH_SIZE.observe(len(batch))
+
+        # Requests that raced a model reload may carry different snapshots
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item.current), []).append(item)
+
+        for items in groups.values():
+            try:
+                rows = self.score(items[0].current, [item.text for item in items])
+            except Exception as e:
+                for item in items:
+                    item.future.set_exception(e)
+                continue
+            for item, row in zip(items, rows):
+                item.future.set_result(row)
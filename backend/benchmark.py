@@ -0,0 +1,284 @@
+"""
+In-process load and latency benchmark for the prediction API
+
+Drives the Flask app directly (test client, or a local threaded server) with
+symptom texts sampled from symptomsense_final_40diseases.csv, and reports
+throughput and p50/p95/p99 latency for a cold pass and a warm pass. The cold
+pass starts from an empty prediction cache and sends each distinct input
+(distinct after canonicalization, so no request can hit the cache) once; the
+dataset has a few hundred of those, so it can be shorter than --requests. The
+warm pass sends the --requests sampled inputs. Each pass reports its cache
+hits, so a cold pass that was not really cold shows up.
+
+Examples:
+
+    python benchmark.py
+    python benchmark.py --requests 5000 --concurrency 8 --batch-size 16
+    python benchmark.py --mode server --output bench.json
+    python benchmark.py --baseline bench.json --threshold 0.10
+
+With --baseline the run fails (exit code 1) when throughput drops, or p95
+latency grows, by more than the threshold fraction against the baseline file.
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET = os.path.join(BASE_DIR, 'symptomsense_final_40diseases.csv')
+
+# Representative age for each age_group in the dataset
+AGE_BY_GROUP = {'child': 8, 'teen': 16, 'adult': 35, 'senior': 70}
+
+def load_records(path=DATASET):
+    """Read request payloads (symptoms, age, gender) from the dataset CSV"""
+    records = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            records.append({
+                "symptoms": row['symptoms'],
+                "age": AGE_BY_GROUP.get(row['age_group'], 35),
+                "gender": row['gender'] if row['gender'] != 'any' else 'female'
+            })
+    return records
+
+def sample_records(records, count, seed):
+    """Sample count payloads with replacement, reproducibly"""
+    rng = random.Random(seed)
+    return [rng.choice(records) for _ in range(count)]
+
+def distinct_records(records, key, seed):
+    """The records in a reproducible random order, keeping the first of each key only"""
+    records = list(records)
+    random.Random(seed).shuffle(records)
+    seen = set()
+    distinct = []
+    for record in records:
+        record_key = key(record['symptoms'])
+        if record_key not in seen:
+            seen.add(record_key)
+            distinct.append(record)
+    return distinct
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+class TestClientDriver:
+    """Sends requests through Flask's test client (one client per thread)"""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def post(self, path, payload):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        return client.post(path, json=payload).status_code
+
+    def close(self):
+        pass
+
+class ServerDriver:
+    """Sends HTTP requests to the app served by a local threaded Werkzeug server"""
+
+    def __init__(self, app):
+        import http.client
+        from werkzeug.serving import make_server, WSGIRequestHandler
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.http_client = http.client
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.local = threading.local()
+
+    def post(self, path, payload):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = self.http_client.HTTPConnection('127.0.0.1', self.port)
+        body = json.dumps(payload)
+        connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self.server.shutdown()
+
+def run_pass(driver, records, concurrency, batch_size, cache=None):
+    """Send all records (single or batched) from concurrency threads; returns the pass statistics"""
+    hits = cache.stats()['hits'] if cache is not None else None
+    if batch_size > 1:
+        requests = [('/predict/batch', {"records": records[i:i + batch_size]})
+                    for i in range(0, len(records), batch_size)]
+    else:
+        requests = [('/predict', record) for record in records]
+
+    def send(request):
+        path, payload = request
+        start = time.perf_counter()
+        status = driver.post(path, payload)
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(send, requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in outcomes)
+    errors = sum(1 for _, status in outcomes if status != 200)
+    return {
+        "requests": len(requests),
+        "records": len(records),
+        "errors": errors,
+        "cache_hits": cache.stats()['hits'] - hits if cache is not None else None,
+        "elapsed_seconds": round(elapsed, 4),
+        "requests_per_second": round(len(requests) / elapsed, 2) if elapsed else 0.0,
+        "records_per_second": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "p50": round(1000 * percentile(latencies, 0.50), 3),
+            "p95": round(1000 * percentile(latencies, 0.95), 3),
+            "p99": round(1000 * percentile(latencies, 0.99), 3),
+            "max": round(1000 * latencies[-1], 3) if latencies else 0.0
+        }
+    }
+
+def check_regression(results, baseline, threshold):
+    """Compare a run with a baseline result file; returns a list of regression messages"""
+    problems = []
+    if baseline.get('config') != results['config']:
+        print(f"[!] Baseline was recorded with a different configuration: {baseline.get('config')}")
+    for name, run in results['runs'].items():
+        base = baseline.get('runs', {}).get(name)
+        if not base:
+            continue
+        if run['records_per_second'] < base['records_per_second'] * (1 - threshold):
+            problems.append(
+                f"{name}: throughput {run['records_per_second']} records/s is below "
+                f"baseline {base['records_per_second']} by more than {threshold:.0%}"
+            )
+        if run['latency_ms']['p95'] > base['latency_ms']['p95'] * (1 + threshold):
+            problems.append(
+                f"{name}: p95 latency {run['latency_ms']['p95']} ms is above "
+                f"baseline {base['latency_ms']['p95']} ms by more than {threshold:.0%}"
+            )
+    return problems
+
+def print_run(name, run):
+    """Human-readable summary of one pass"""
+    latency = run['latency_ms']
+    print(f"  {name:<5} {run['records_per_second']:>10.1f} records/s  {run['requests_per_second']:>10.1f} req/s  "
+          f"p50 {latency['p50']:.3f} ms  p95 {latency['p95']:.3f} ms  p99 {latency['p99']:.3f} ms  "
+          f"errors {run['errors']}"
+          + (f"  cache hits {run['cache_hits']}" if run['cache_hits'] is not None else ''))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction API in-process")
+    parser.add_argument('--requests', type=int, default=2000, help="records sent per pass")
+    parser.add_argument('--concurrency', type=int, default=4, help="client threads")
+    parser.add_argument('--batch-size', type=int, default=1, help="records per request; >1 uses /predict/batch")
+    parser.add_argument('--mode', choices=('testclient', 'server'), default='testclient',
+                        help="drive the app through Flask's test client or a local HTTP server")
+    parser.add_argument('--seed', type=int, default=0, help="sampling seed")
+    parser.add_argument('--output', help="write machine-readable results to this JSON file")
+    parser.add_argument('--baseline', help="compare against a previous results JSON file")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed regression against the baseline, as a fraction")
+    args = parser.parse_args(argv)
+
+    records = sample_records(load_records(), args.requests, args.seed)
+
+    # Cold start: import and load the model in this process
+    start = time.perf_counter()
+    import app as backend
+    from cache import canonical_key
+    backend.load_resources()
+    load_seconds = time.perf_counter() - start
+
+    current = backend.snapshot
+    cold_records = distinct_records(
+        load_records(), lambda symptoms: canonical_key(current.analyzer, current.tfidf.vocabulary_, symptoms),
+        args.seed)[:args.requests]
+
+    driver = ServerDriver(backend.app) if args.mode == 'server' else TestClientDriver(backend.app)
+    try:
+        # Cold pass: empty cache, nothing warmed up yet, every input new to the cache
+        if backend.prediction_cache is not None:
+            backend.prediction_cache.clear()
+        cold = run_pass(driver, cold_records, args.concurrency, args.batch_size, backend.prediction_cache)
+
+        # Warm pass: the sampled inputs, every one of them already cached by the cold pass
+        backend.warm_up()
+        warm = run_pass(driver, records, args.concurrency, args.batch_size, backend.prediction_cache)
+    finally:
+        driver.close()
+
+    results = {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "config": {
+            "requests": args.requests,
+            "cold_records": len(cold_records),
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "mode": args.mode,
+            "seed": args.seed,
+            "cache_size": backend.config.CACHE_SIZE,
+            "microbatch": backend.config.MICROBATCH_ENABLED
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "model": backend.snapshot.info(),
+        "load_seconds": round(load_seconds, 4),
+        "runs": {"cold": cold, "warm": warm}
+    }
+
+    print("\n" + "=" * 50)
+    print("BENCHMARK RESULTS")
+    print("=" * 50)
+    print(f"  model {results['model']['version']} ({results['model']['source']}), "
+          f"loaded in {results['load_seconds'] * 1000:.1f} ms")
+    print(f"  {args.requests} records ({len(cold_records)} distinct in the cold pass), concurrency {args.concurrency}, batch size {args.batch_size}, mode {args.mode}")
+    print_run('cold', cold)
+    print_run('warm', warm)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n  Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        problems = check_regression(results, baseline, args.threshold)
+        if problems:
+            print("\n[X] Performance regression against baseline:")
+            for problem in problems:
+                print(f"  - {problem}")
+            return 1
+        print(f"\n[OK] Within {args.threshold:.0%} of baseline {args.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
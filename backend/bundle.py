@@ -0,0 +1,192 @@
+"""
+Single-file model bundle
+
+A bundle holds everything the server needs in one versioned, checksummed file:
+the compiled engine arrays (see engine.py), the engine metadata and the disease
+mapping. Layout:
+
+    8 bytes   magic b'SSBUNDLE'
+    4 bytes   format version (uint32, little endian)
+    4 bytes   header length in bytes (uint32, little endian)
+    header    UTF-8 JSON: format version, creation time, payload checksum,
+              engine metadata, mapping and the list of array sections
+    padding   to a 64-byte boundary
+    sections  raw C-ordered array data, each starting on a 64-byte boundary
+
+Every section is opened with np.memmap(mode='r'), so loading is a header parse
+plus a few mmaps: no unpickling and no scikit-learn import. Workers forked from
+the same process, or started on the same file, share the model pages through
+the OS page cache.
+
+Run this file to convert model.pkl, tfidf.pkl, label_encoder.pkl and
+mapping.json into model.bundle:
+
+    python bundle.py [output]
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import numpy as np
+
+from engine import CompiledEngine, compile_artifacts
+
+BUNDLE_FILE = 'model.bundle'
+
+MAGIC = b'SSBUNDLE'
+BUNDLE_FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')
+
+class BundleError(ValueError):
+    """Raised when a bundle file is malformed, corrupted or of an unsupported version"""
+
+def _align(offset):
+    """Round an offset up to the next section boundary"""
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def write_bundle(path, arrays, meta, mapping):
+    """
+    Write engine arrays, engine metadata and the disease mapping to a bundle file
+
+    The file is written next to the destination and renamed into place, so a
+    reader never sees a partially written bundle.
+    """
+    arrays = {name: np.ascontiguousarray(value) for name, value in arrays.items()}
+
+    # Lay out sections relative to the start of the payload
+    sections = []
+    offset = 0
+    for name, value in arrays.items():
+        if value.dtype.hasobject:
+            raise BundleError(f"Section {name!r} has object dtype and cannot be memory-mapped")
+        sections.append({
+            'name': name,
+            'dtype': value.dtype.str,
+            'shape': list(value.shape),
+            'offset': offset,
+            'nbytes': int(value.nbytes),
+        })
+        offset = _align(offset + value.nbytes)
+    payload_size = offset
+
+    payload = bytearray(payload_size)
+    for section in sections:
+        data = arrays[section['name']].tobytes()
+        payload[section['offset']:section['offset'] + len(data)] = data
+
+    header = json.dumps({
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'payload_size': payload_size,
+        'sha256': hashlib.sha256(payload).hexdigest(),
+        'meta': meta,
+        'mapping': mapping,
+        'sections': sections,
+    }, sort_keys=True).encode('utf-8')
+
+    data_start = _align(_PREAMBLE.size + len(header))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, BUNDLE_FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(b'\0' * (data_start - _PREAMBLE.size - len(header)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+def read_bundle_header(path):
+    """Read and validate the preamble and JSON header, returning (header, data_start)"""
+    with open(path, 'rb') as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise BundleError(f"{path} is too short to be a bundle")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise BundleError(f"{path} is not a model bundle")
+        if version != BUNDLE_FORMAT_VERSION:
+            raise BundleError(f"Unsupported bundle format version {version} (expected {BUNDLE_FORMAT_VERSION})")
+        header_bytes = f.read(header_length)
+
+    try:
+        header = json.loads(header_bytes.decode('utf-8'))
+    except ValueError as e:
+        raise BundleError(f"{path} has a corrupted header: {e}")
+
+    data_start = _align(_PREAMBLE.size + header_length)
+    if os.path.getsize(path) < data_start + header['payload_size']:
+        raise BundleError(f"{path} is truncated")
+    return header, data_start
+
+def read_bundle(path=BUNDLE_FILE, verify=True):
+    """
+    Open a bundle, returning (arrays, meta, header)
+
+    Arrays are read-only memory maps into the file. With verify=True the
+    payload checksum is checked first. Because the arrays stay mapped, a
+    bundle in use must only be replaced by renaming a new file over it (as
+    write_bundle does): overwriting it in place changes the mapped pages under
+    running requests, and a truncated file raises SIGBUS when they are read.
+    """
+    header, data_start = read_bundle_header(path)
+
+    if verify:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            f.seek(data_start)
+            remaining = header['payload_size']
+            while remaining:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    raise BundleError(f"{path} is truncated")
+                digest.update(chunk)
+                remaining -= len(chunk)
+        if digest.hexdigest() != header['sha256']:
+            raise BundleError(f"{path} failed its checksum; the file is corrupted")
+
+    arrays = {}
+    for section in header['sections']:
+        shape = tuple(section['shape'])
+        dtype = np.dtype(section['dtype'])
+        if section['nbytes'] == 0:
+            # Zero-length sections cannot be memory-mapped
+            arrays[section['name']] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[section['name']] = np.memmap(
+                path, dtype=dtype, mode='r', offset=data_start + section['offset'], shape=shape
+            )
+    return arrays, header['meta'], header
+
+def load_bundle(path=BUNDLE_FILE, verify=True):
+    """Load a bundle as (CompiledEngine, mapping, header)"""
+    arrays, meta, header = read_bundle(path, verify=verify)
+    return CompiledEngine(arrays, meta), header['mapping'], header
+
+def convert_artifacts(output=BUNDLE_FILE, model_path='model.pkl', tfidf_path='tfidf.pkl',
+                      label_encoder_path='label_encoder.pkl', mapping_path='mapping.json'):
+    """Convert the pickled artifacts and mapping.json into a bundle file"""
+    from joblib import load as joblib_load
+
+    model = joblib_load(model_path)
+    tfidf = joblib_load(tfidf_path)
+    label_encoder = joblib_load(label_encoder_path) if os.path.exists(label_encoder_path) else None
+    with open(mapping_path, 'r', encoding='utf-8') as f:
+        mapping = json.load(f)
+
+    arrays, meta = compile_artifacts(tfidf, model, label_encoder)
+    write_bundle(output, arrays, meta, mapping)
+    return arrays, meta
+
+if __name__ == '__main__':
+    output = sys.argv[1] if len(sys.argv) > 1 else BUNDLE_FILE
+    try:
+        arrays, meta = convert_artifacts(output)
+        header, _ = read_bundle_header(output)
+    except Exception as e:
+        print(f"[X] Conversion failed: {e}")
+        sys.exit(1)
+    print(f"[OK] Wrote {output} ({os.path.getsize(output)} bytes, sha256 {header['sha256'][:12]})")
+    print(f"     {len(arrays['terms'])} terms, {len(arrays['feature'])}-node tree, {len(header['mapping'])} mapped diseases")
@@ -0,0 +1,86 @@
+"""
+In-process prediction cache
+
+Entries are keyed on a canonical form of the input, so different phrasings that
+produce the same TF-IDF vector ("Fever, headache" and "headache fever") share
+one entry. Eviction is least-recently-used once the cache is full, and every
+entry also expires after a fixed time to live.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+def canonical_key(analyzer, vocabulary, symptoms):
+    """
+    Canonical cache key for a symptom text
+
+    The text is run through the vectorizer's own analyzer (lowercasing,
+    tokenizing, stop words, n-grams) and terms outside the vocabulary are
+    dropped, since they do not change the vector. The remaining terms are
+    sorted; repeats are kept because term counts change the TF-IDF weights.
+    """
+    return tuple(sorted(term for term in analyzer(symptoms) if term in vocabulary))
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss/eviction counters"""
+
+    def __init__(self, max_size, ttl, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. because the model changed"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Counters for the /health endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,122 @@
+"""
+Similar past cases from the training dataset
+
+CaseIndex vectorizes every labeled row of the dataset CSV with the model's own
+TF-IDF vectorizer at load time, L2-normalizes the rows, and stores them as an
+inverted index: for each vocabulary term, the cases containing it and the
+term's weight in each (a column-major sparse matrix in three flat arrays).
+
+The cosine similarity of a query with every case is then one sparse dot
+product. Only the postings of the query's own terms are read, and their
+contributions are summed per case. The n most similar cases are picked with a
+partial sort, so a query costs time in proportion to the postings it touches
+rather than the number of cases.
+"""
+
+import math
+
+import numpy as np
+
+# Cases returned when a request asks for "similar_cases": true, and the most allowed
+DEFAULT_SIMILAR_CASES = 5
+MAX_SIMILAR_CASES = 20
+
+def vectorize_rows(vectorizer, texts):
+    """(indices, values) of the TF-IDF row of every text, for compiled and scikit-learn vectorizers"""
+    if hasattr(vectorizer, 'transform_row'):
+        return [vectorizer.transform_row(text) for text in texts]
+    matrix = vectorizer.transform(texts).tocsr()
+    return [(matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]], matrix.data[matrix.indptr[i]:matrix.indptr[i + 1]])
+            for i in range(matrix.shape[0])]
+
+def _normalized(values):
+    values = np.asarray(values, dtype=np.float64)
+    norm = math.sqrt(float(values @ values))
+    return values / norm if norm else values
+
+class CaseIndex:
+    """Inverted index of L2-normalized TF-IDF case vectors, with each case's labels"""
+
+    def __init__(self, term_ptr, case_ids, weights, symptoms, labels, label_values):
+        # Postings of term t are case_ids/weights[term_ptr[t]:term_ptr[t + 1]]
+        self.term_ptr = term_ptr
+        self.case_ids = case_ids
+        self.weights = weights
+        # Case text, and an index into label_values' (disease, age_group, gender) tuples
+        self.symptoms = symptoms
+        self.labels = labels
+        self.label_values = label_values
+
+    @classmethod
+    def build(cls, vectorizer, rows):
+        """Index dataset rows (dicts with symptoms, disease, age_group and gender)"""
+        symptoms = [row.get('symptoms') or '' for row in rows]
+        n_terms = len(vectorizer.vocabulary_)
+
+        terms, cases, weights = [], [], []
+        for case, (indices, values) in enumerate(vectorize_rows(vectorizer, symptoms)):
+            if len(indices):
+                terms.append(np.asarray(indices, dtype=np.int64))
+                cases.append(np.full(len(indices), case, dtype=np.int32))
+                weights.append(_normalized(values))
+        terms = np.concatenate(terms) if terms else np.zeros(0, dtype=np.int64)
+        cases = np.concatenate(cases) if cases else np.zeros(0, dtype=np.int32)
+        weights = np.concatenate(weights) if weights else np.zeros(0)
+
+        # Group the postings by term (stable, so each list stays in case order)
+        order = np.argsort(terms, kind='stable')
+        term_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=term_ptr[1:])
+
+        label_codes = {}
+        labels = np.array([
+            label_codes.setdefault((row.get('disease'), row.get('age_group'), row.get('gender')), len(label_codes))
+            for row in rows
+        ], dtype=np.int32)
+        return cls(term_ptr, cases[order], weights[order].astype(np.float32), symptoms, labels, list(label_codes))
+
+    def __len__(self):
+        return len(self.symptoms)
+
+    def query(self, indices, values, n):
+        """(case, cosine similarity) of the n cases most similar to one TF-IDF row, best first"""
+        indices = np.asarray(indices, dtype=np.int64)
+        values = _normalized(values)
+        starts = self.term_ptr[indices]
+        ends = self.term_ptr[indices + 1]
+        if not len(indices) or not (ends - starts).any():
+            return []
+
+        # Sparse dot product: sum each touched case's weight products over the query terms
+        case_ids = np.concatenate([self.case_ids[start:end] for start, end in zip(starts, ends)])
+        products = np.concatenate([self.weights[start:end] * value for start, end, value in zip(starts, ends, values)])
+        candidates, positions = np.unique(case_ids, return_inverse=True)
+        scores = np.bincount(positions, weights=products)
+
+        # Partial sort: only the n best are ordered, and ties go to the earlier case (candidates
+        # are in case order), including ties at the cut-off that argpartition would pick arbitrarily
+        if n < len(scores):
+            kth = np.partition(scores, len(scores) - n)[len(scores) - n]
+            above = np.flatnonzero(scores > kth)
+            ties = np.flatnonzero(scores == kth)[:n - len(above)]
+            selected = np.concatenate((above, ties))
+        else:
+            selected = np.arange(len(scores))
+        selected = selected[np.lexsort((candidates[selected], -scores[selected]))]
+        return [(int(candidates[i]), float(scores[i])) for i in selected]
+
+    def similar(self, vectorizer, text, n):
+        """The n dataset cases most similar to text, as response dicts"""
+        (indices, values), = vectorize_rows(vectorizer, [text])
+        results = []
+        for case, similarity in self.query(indices, values, n):
+            disease, age_group, gender = self.label_values[self.labels[case]]
+            results.append({
+                "case": case,
+                "symptoms": self.symptoms[case],
+                "disease": disease,
+                "age_group": age_group,
+                "gender": gender,
+                "similarity": round(min(similarity, 1.0), 4)
+            })
+        return results
@@ -0,0 +1,38 @@
+"""
+Precomputed disease catalog responses
+
+GET /diseases and GET /diseases/<name> only change when the model artifacts
+do, so their bodies are serialized, gzipped and hashed once per model
+snapshot. Serving a request is then a dictionary lookup plus an ETag
+comparison.
+"""
+
+import gzip
+import hashlib
+import json
+
+class PrecomputedBody:
+    """A JSON body with its gzip encoding and a strong ETag for each, derived from the content"""
+
+    __slots__ = ('body', 'gzipped', 'etag', 'gzip_etag')
+
+    def __init__(self, data):
+        self.body = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        # mtime=0 keeps the compressed bytes identical across processes and reloads
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        # The gzip encoding is a different representation, so it needs its own strong tag
+        self.gzip_etag = self.etag + '-gzip'
+
+class DiseaseCatalog:
+    """The catalog of every class the model can predict, and one entry per disease"""
+
+    def __init__(self, class_names, entries):
+        self.listing = PrecomputedBody({"count": len(entries), "diseases": entries})
+        self.entries = {}
+        for name, entry in zip(class_names, entries):
+            self.entries[name.lower()] = PrecomputedBody(entry)
+
+    def get(self, name):
+        """Precomputed body for one disease (case-insensitive), or None"""
+        return self.entries.get(name.strip().lower())
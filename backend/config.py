@@ -0,0 +1,98 @@
+"""
+Runtime settings for the backend, read from SYMPTOMSENSE_* environment variables
+"""
+
+import os
+
+def _env_int(name, default):
+    """Read an integer setting, falling back to the default when unset"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+def _env_float(name, default):
+    """Read a float setting, falling back to the default when unset"""
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+def _env_pairs(name):
+    """Read a name=value,name=value setting into an ordered dict"""
+    pairs = {}
+    for item in (os.environ.get(name) or '').split(','):
+        if '=' in item:
+            key, value = item.split('=', 1)
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+def _env_bool(name, default):
+    """Read an on/off setting (1/0, true/false, yes/no, on/off)"""
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Directory holding model.bundle (or the pickles) and mapping.json; defaults to the backend directory
+MODEL_DIR = os.environ.get('SYMPTOMSENSE_MODEL_DIR') or os.path.dirname(os.path.abspath(__file__))
+
+# Prediction cache: maximum number of entries (0 disables the cache) and entry lifetime in seconds
+CACHE_SIZE = _env_int('SYMPTOMSENSE_CACHE_SIZE', 4096)
+CACHE_TTL = _env_float('SYMPTOMSENSE_CACHE_TTL', 300.0)
+
+# Model hot reload: seconds between artifact file checks (0 disables the watcher), and the
+# token required by POST /admin/reload (the endpoint is disabled when empty)
+RELOAD_WATCH_INTERVAL = _env_float('SYMPTOMSENSE_RELOAD_WATCH_INTERVAL', 0.0)
+ADMIN_TOKEN = os.environ.get('SYMPTOMSENSE_ADMIN_TOKEN', '')
+
+# Micro-batching of concurrent /predict calls: on/off, largest batch, longest time the first
+# queued text waits for company (milliseconds), and how long a request waits for its result (seconds)
+MICROBATCH_ENABLED = _env_bool('SYMPTOMSENSE_MICROBATCH', False)
+MICROBATCH_MAX_SIZE = _env_int('SYMPTOMSENSE_MICROBATCH_MAX_SIZE', 32)
+MICROBATCH_MAX_WAIT_MS = _env_float('SYMPTOMSENSE_MICROBATCH_MAX_WAIT_MS', 2.0)
+MICROBATCH_TIMEOUT = _env_float('SYMPTOMSENSE_MICROBATCH_TIMEOUT', 10.0)
+
+# Process-pool inference: worker processes per server worker that vectorize and score texts
+# from shared-memory model arrays, outside the GIL (0 scores in-process)
+INFERENCE_PROCESSES = _env_int('SYMPTOMSENSE_INFERENCE_PROCESSES', 0)
+
+# Demographic priors: reweight predictions by the request's age and gender using class
+# frequencies from the training data (requests can override this with "demographics")
+DEMOGRAPHIC_PRIORS = _env_bool('SYMPTOMSENSE_DEMOGRAPHIC_PRIORS', True)
+
+# Synonym rewriting: replace layman phrases ("throwing up") with canonical symptom terms from
+# synonyms.json before scoring (requests can override this with "synonyms")
+SYNONYMS = _env_bool('SYMPTOMSENSE_SYNONYMS', True)
+
+# Typo correction: map misspelled out-of-vocabulary symptom words to vocabulary terms before
+# scoring (off by default; requests can override this with "autocorrect")
+SPELL_CORRECTION = _env_bool('SYMPTOMSENSE_SPELL_CORRECTION', False)
+
+# Model registry: name of the serving (primary) version, shadow versions as name=directory pairs,
+# the fraction of requests also scored by the shadows, and the shadow work queue length
+MODEL_NAME = os.environ.get('SYMPTOMSENSE_MODEL_NAME') or 'primary'
+SHADOW_MODELS = _env_pairs('SYMPTOMSENSE_SHADOW_MODELS')
+SHADOW_FRACTION = _env_float('SYMPTOMSENSE_SHADOW_FRACTION', 0.1)
+SHADOW_QUEUE_SIZE = _env_int('SYMPTOMSENSE_SHADOW_QUEUE_SIZE', 256)
+
+# Admission control for the prediction endpoints: concurrent requests per worker (0 disables it),
+# requests allowed to wait for a slot, the longest wait (milliseconds), and the Retry-After
+# value sent with 503 responses (seconds)
+ADMISSION_MAX_IN_FLIGHT = _env_int('SYMPTOMSENSE_MAX_IN_FLIGHT', 0)
+ADMISSION_QUEUE_SIZE = _env_int('SYMPTOMSENSE_ADMISSION_QUEUE_SIZE', 16)
+ADMISSION_QUEUE_TIMEOUT_MS = _env_float('SYMPTOMSENSE_ADMISSION_QUEUE_TIMEOUT_MS', 100.0)
+ADMISSION_RETRY_AFTER = _env_int('SYMPTOMSENSE_RETRY_AFTER', 1)
+
+# Per-client rate limiting of the prediction endpoints: sustained requests per second (0 disables
+# it), burst size, and the header identifying a client (the remote address when unset)
+RATE_LIMIT_PER_SECOND = _env_float('SYMPTOMSENSE_RATE_LIMIT', 0.0)
+RATE_LIMIT_BURST = _env_int('SYMPTOMSENSE_RATE_LIMIT_BURST', 20)
+RATE_LIMIT_KEY_HEADER = os.environ.get('SYMPTOMSENSE_RATE_LIMIT_KEY_HEADER', '')
+
+# Prediction audit log: directory for the per-worker JSONL files (disabled when unset), queued
+# records before new ones are dropped, and rotation by size (bytes) and age (seconds)
+AUDIT_LOG_DIR = os.environ.get('SYMPTOMSENSE_AUDIT_LOG_DIR', '')
+AUDIT_QUEUE_SIZE = _env_int('SYMPTOMSENSE_AUDIT_QUEUE_SIZE', 10000)
+AUDIT_MAX_BYTES = _env_int('SYMPTOMSENSE_AUDIT_MAX_BYTES', 50 * 1024 * 1024)
+AUDIT_MAX_AGE = _env_float('SYMPTOMSENSE_AUDIT_MAX_AGE', 3600.0)
+
+# Live traffic analytics for /stats: on/off, and seconds between the snapshots kept in memory
+ANALYTICS_ENABLED = _env_bool('SYMPTOMSENSE_ANALYTICS', True)
+ANALYTICS_SNAPSHOT_INTERVAL = _env_float('SYMPTOMSENSE_ANALYTICS_SNAPSHOT_INTERVAL', 60.0)
@@ -0,0 +1,66 @@
+"""
+Shared pytest fixtures: the shipped model artifacts, the app with that model loaded, and a
+clock that only moves when a test moves it
+"""
+
+import csv
+import os
+
+import pytest
+from joblib import load as joblib_load
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Manual scripts: test_api.py needs a running server, test_pickle_files.py takes file names
+collect_ignore = ['test_api.py', 'test_pickle_files.py']
+
+# Extra inputs covering out-of-vocabulary words, repeats, punctuation and case
+EXTRA_TEXTS = [
+    "fever headache fatigue",
+    "chest pain, nausea",
+    "Fever FEVER fever cough",
+    "xyz qwerty",
+    "",
+    "stomach-pain; vomiting!!",
+    "café fièvre headache",
+]
+
+class FakeClock:
+    """A monotonic clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture(scope='session')
+def pickles():
+    """(model, tfidf, label_encoder) as shipped with the backend"""
+    model = joblib_load(os.path.join(BASE_DIR, 'model.pkl'))
+    tfidf = joblib_load(os.path.join(BASE_DIR, 'tfidf.pkl'))
+    label_encoder = joblib_load(os.path.join(BASE_DIR, 'label_encoder.pkl'))
+    return model, tfidf, label_encoder
+
+@pytest.fixture(scope='session')
+def texts():
+    """All symptom texts from the training CSV plus a few edge cases"""
+    with open(os.path.join(BASE_DIR, 'symptomsense_final_40diseases.csv'), newline='', encoding='utf-8') as f:
+        return [row['symptoms'] for row in csv.DictReader(f)] + EXTRA_TEXTS
+
+@pytest.fixture
+def server():
+    """The app module, serving the shipped model (loaded once per test session)"""
+    import app
+    if app.snapshot is None:
+        app.load_resources()
+        app.warm_up()
+    return app
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
@@ -0,0 +1,141 @@
+"""
+Demographic class priors
+
+The training CSV records an age_group (child/teen/adult/senior) and a gender
+(female/male/any) for every row. At load time these are turned into one
+reweighting row per (age_group, gender) cell: how much more or less common
+each disease is in that cell than in the dataset overall. At request time the
+model's probability rows are multiplied by the weights of each record's cell
+and renormalized, which is one vectorized multiply and one division per batch.
+
+Cells are smoothed toward the overall class distribution, so a cell with few
+rows changes the model's output only a little. A record with no usable age or
+gender falls back to the cells that ignore it; a record with neither gets the
+model's probabilities unchanged.
+"""
+
+import numpy as np
+
+AGE_GROUPS = ('child', 'teen', 'adult', 'senior')
+GENDERS = ('female', 'male')
+
+# Upper age bound (exclusive) of each age group; anything older is a senior
+AGE_GROUP_BOUNDS = ((13, 'child'), (20, 'teen'), (60, 'adult'))
+
+# Accepted spellings of each gender in requests
+GENDER_ALIASES = {
+    'female': 'female', 'f': 'female', 'woman': 'female', 'girl': 'female',
+    'male': 'male', 'm': 'male', 'man': 'male', 'boy': 'male',
+}
+
+# Pseudo-rows of the overall class distribution mixed into every cell
+DEFAULT_STRENGTH = 10.0
+
+def age_group(age):
+    """Bucket an age in years (or an age group name) into the dataset's age groups (None if invalid)"""
+    if isinstance(age, bool) or age is None:
+        return None
+    if isinstance(age, str) and age.strip().lower() in AGE_GROUPS:
+        return age.strip().lower()
+    try:
+        age = float(age)
+    except (TypeError, ValueError):
+        return None
+    if not 0 <= age < 150:
+        return None
+    for bound, group in AGE_GROUP_BOUNDS:
+        if age < bound:
+            return group
+    return 'senior'
+
+def normalize_gender(gender):
+    """Map a request's gender to 'female' or 'male' (None if missing or unrecognized)"""
+    if not isinstance(gender, str):
+        return None
+    return GENDER_ALIASES.get(gender.strip().lower())
+
+class DemographicPriors:
+    """
+    Per-cell class reweighting table aligned with the model's class indices
+
+    weights has one row per (age_group, gender) cell, including the partial
+    cells (age only, gender only) and a final all-ones row for records with
+    no demographic information.
+    """
+
+    def __init__(self, weights, cells, rows):
+        self.weights = weights
+        self.cells = cells
+        self.rows = rows
+        self.neutral = len(weights) - 1
+
+    @classmethod
+    def from_rows(cls, rows, class_names, strength=DEFAULT_STRENGTH):
+        """Build the table from (disease, age_group, gender) rows; returns None if no row matches a class"""
+        class_index = {name: i for i, name in enumerate(class_names)}
+        n_classes = len(class_names)
+        counts = {}
+        for disease, group, gender in rows:
+            index = class_index.get(disease)
+            if index is None or group not in AGE_GROUPS:
+                continue
+            # Rows marked "any" apply to both genders
+            genders = GENDERS if gender == 'any' else (gender,) if gender in GENDERS else ()
+            for cell_gender in genders:
+                cell = counts.setdefault((group, cell_gender), np.zeros(n_classes))
+                cell[index] += 1
+        if not counts:
+            return None
+
+        overall = np.zeros(n_classes)
+        for cell in counts.values():
+            overall += cell
+        overall_share = overall / overall.sum()
+
+        cells = {}
+        weights = []
+        for group in AGE_GROUPS + (None,):
+            for gender in GENDERS + (None,):
+                if group is None and gender is None:
+                    continue
+                cell = np.zeros(n_classes)
+                for (cell_group, cell_gender), cell_counts in counts.items():
+                    if group in (None, cell_group) and gender in (None, cell_gender):
+                        cell += cell_counts
+                # Smoothed share of each class in this cell, relative to its overall share
+                share = (cell + strength * overall_share) / (cell.sum() + strength)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    weight = np.where(overall_share > 0, share / overall_share, 1.0)
+                cells[(group, gender)] = len(weights)
+                weights.append(weight)
+        weights.append(np.ones(n_classes))
+
+        table = np.vstack(weights)
+        table.flags.writeable = False
+        return cls(table, cells, len(rows))
+
+    def lookup(self, age, gender):
+        """Row of the weight table for a record's age and gender"""
+        return self.cells.get((age_group(age), normalize_gender(gender)), self.neutral)
+
+    def apply(self, probabilities, cells):
+        """
+        Reweight probability rows by their cells' weights and renormalize
+
+        probabilities is a sequence of rows, cells the matching lookup() results.
+        Rows in the neutral cell, and rows whose reweighted mass is zero, are
+        returned unchanged.
+        """
+        matrix = np.asarray(probabilities, dtype=np.float64)
+        cells = np.asarray(cells, dtype=np.intp)
+        weighted = matrix * self.weights[cells]
+        totals = weighted.sum(axis=1, keepdims=True)
+        reweight = (totals > 0) & (cells != self.neutral)[:, None]
+        return np.where(reweight, weighted / np.where(reweight, totals, 1.0), matrix)
+
+    def info(self):
+        """Summary for /health"""
+        return {
+            "rows": self.rows,
+            "cells": len(self.cells)
+        }
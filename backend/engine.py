@@ -0,0 +1,292 @@
+"""
+Compiled inference engine for the TF-IDF + DecisionTree model
+
+The export step reads the fitted TfidfVectorizer, DecisionTreeClassifier and
+LabelEncoder once and flattens them into plain NumPy arrays (vocabulary, idf
+weights, tree node arrays, leaf probabilities). Serving from those arrays needs
+only NumPy, not scikit-learn, and produces the same probabilities as the pickles.
+
+The arrays are stored on disk in a model bundle (see bundle.py).
+"""
+
+import math
+import re
+import unicodedata
+import numpy as np
+
+from vocab import CompactVocabulary, compile_vocabulary
+
+# Version of the exported array layout, bumped whenever it changes
+ENGINE_FORMAT_VERSION = 1
+
+def _strip_accents_unicode(s):
+    """Remove accents from any unicode symbol (same as sklearn's strip_accents_unicode)"""
+    try:
+        s.encode("ASCII", errors="strict")
+        return s
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize("NFKD", s)
+        return "".join([c for c in normalized if not unicodedata.combining(c)])
+
+def _strip_accents_ascii(s):
+    """Transliterate to ASCII (same as sklearn's strip_accents_ascii)"""
+    return unicodedata.normalize("NFKD", s).encode("ASCII", "ignore").decode("ASCII")
+
+def _tfidf_param(tfidf, name):
+    """Read a TfidfTransformer parameter from the vectorizer (older pickles keep it on _tfidf only)"""
+    if name in tfidf.__dict__:
+        return tfidf.__dict__[name]
+    return getattr(tfidf._tfidf, name)
+
+def _plain_array(values):
+    """Convert object arrays (e.g. string labels) to fixed-width unicode so they load without pickle"""
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = values.astype(str)
+    return values
+
+def compile_vectorizer(tfidf):
+    """Flatten a fitted TfidfVectorizer into (arrays, meta)"""
+    if tfidf.analyzer != 'word' or tfidf.tokenizer is not None or tfidf.preprocessor is not None:
+        raise ValueError("Only word analyzers with the default tokenizer and preprocessor can be compiled")
+    if tfidf.strip_accents not in (None, 'ascii', 'unicode'):
+        raise ValueError(f"Unsupported strip_accents setting: {tfidf.strip_accents!r}")
+
+    # Terms ordered by feature index
+    terms = [None] * len(tfidf.vocabulary_)
+    for term, index in tfidf.vocabulary_.items():
+        terms[index] = term
+
+    stop_words = tfidf.get_stop_words()
+    use_idf = bool(_tfidf_param(tfidf, 'use_idf'))
+
+    arrays = {
+        'terms': np.array(terms, dtype=str),
+        'stop_words': np.array(sorted(stop_words) if stop_words else [], dtype=str),
+        'idf': np.asarray(tfidf.idf_, dtype=np.float64) if use_idf else np.ones(len(terms)),
+    }
+    arrays.update(compile_vocabulary(terms))
+    meta = {
+        'lowercase': bool(tfidf.lowercase),
+        'strip_accents': tfidf.strip_accents,
+        'token_pattern': tfidf.token_pattern,
+        'ngram_range': list(tfidf.ngram_range),
+        'binary': bool(tfidf.binary),
+        'norm': _tfidf_param(tfidf, 'norm'),
+        'use_idf': use_idf,
+        'sublinear_tf': bool(_tfidf_param(tfidf, 'sublinear_tf')),
+    }
+    return arrays, meta
+
+def compile_tree(model, label_encoder=None):
+    """Flatten a fitted DecisionTreeClassifier (and optional LabelEncoder) into (arrays, meta)"""
+    if model.n_outputs_ != 1:
+        raise ValueError("Only single-output decision trees can be compiled")
+
+    tree = model.tree_
+
+    # Normalize leaf values exactly as DecisionTreeClassifier.predict_proba does
+    proba = np.array(tree.value[:, 0, :model.n_classes_], dtype=np.float64)
+    normalizer = proba.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    proba /= normalizer
+
+    arrays = {
+        'children_left': np.asarray(tree.children_left, dtype=np.int64),
+        'children_right': np.asarray(tree.children_right, dtype=np.int64),
+        'feature': np.asarray(tree.feature, dtype=np.int64),
+        'threshold': np.asarray(tree.threshold, dtype=np.float64),
+        'proba': proba,
+        'classes': _plain_array(model.classes_),
+    }
+    if label_encoder is not None:
+        arrays['label_names'] = _plain_array(label_encoder.classes_)
+    meta = {
+        'n_features': int(model.n_features_in_),
+        'max_depth': int(tree.max_depth),
+    }
+    return arrays, meta
+
+def compile_artifacts(tfidf, model, label_encoder=None):
+    """Compile the three fitted sklearn objects into one (arrays, meta) pair"""
+    vectorizer_arrays, vectorizer_meta = compile_vectorizer(tfidf)
+    tree_arrays, tree_meta = compile_tree(model, label_encoder)
+
+    if len(vectorizer_arrays['terms']) != tree_meta['n_features']:
+        raise ValueError(
+            f"Vectorizer has {len(vectorizer_arrays['terms'])} features but model expects {tree_meta['n_features']}"
+        )
+
+    arrays = dict(vectorizer_arrays)
+    arrays.update(tree_arrays)
+    meta = {
+        'format_version': ENGINE_FORMAT_VERSION,
+        'vectorizer': vectorizer_meta,
+        'tree': tree_meta,
+    }
+    return arrays, meta
+
+class CompiledVectorizer:
+    """NumPy-only replacement for a fitted TfidfVectorizer's transform()"""
+
+    def __init__(self, arrays, meta):
+        self.terms = arrays['terms']
+        self.idf = arrays['idf']
+        # Sorted UTF-8 terms with binary-search lookup instead of a per-process dict (see vocab.py)
+        if 'vocab_bytes' in arrays:
+            self.vocabulary_ = CompactVocabulary.from_arrays(arrays)
+        else:
+            self.vocabulary_ = CompactVocabulary.from_terms(self.terms)
+        self.stop_words = frozenset(str(word) for word in arrays['stop_words']) or None
+        self.n_features = len(self.terms)
+
+        self.lowercase = meta['lowercase']
+        self.ngram_range = tuple(meta['ngram_range'])
+        self.binary = meta['binary']
+        self.norm = meta['norm']
+        self.use_idf = meta['use_idf']
+        self.sublinear_tf = meta['sublinear_tf']
+        self.token_pattern = re.compile(meta['token_pattern'])
+        self.strip_accents = {
+            None: None,
+            'ascii': _strip_accents_ascii,
+            'unicode': _strip_accents_unicode,
+        }[meta['strip_accents']]
+
+    def build_analyzer(self):
+        """Return a callable turning a document into its list of terms (like sklearn's)"""
+        return self.analyze
+
+    def analyze(self, doc):
+        """Preprocess, tokenize, drop stop words and build word n-grams"""
+        if self.lowercase:
+            doc = doc.lower()
+        if self.strip_accents is not None:
+            doc = self.strip_accents(doc)
+        tokens = self.token_pattern.findall(doc)
+
+        if self.stop_words is not None:
+            tokens = [w for w in tokens if w not in self.stop_words]
+
+        min_n, max_n = self.ngram_range
+        if max_n != 1:
+            original_tokens = tokens
+            if min_n == 1:
+                tokens = list(original_tokens)
+                min_n += 1
+            else:
+                tokens = []
+            n_original_tokens = len(original_tokens)
+            for n in range(min_n, min(max_n + 1, n_original_tokens + 1)):
+                for i in range(n_original_tokens - n + 1):
+                    tokens.append(" ".join(original_tokens[i:i + n]))
+        return tokens
+
+    def transform_row(self, doc):
+        """Return (indices, values) of the TF-IDF vector of one document, indices ascending"""
+        counts = {}
+        vocabulary = self.vocabulary_
+        for term in self.analyze(doc):
+            index = vocabulary.get(term)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+
+        indices = np.array(sorted(counts), dtype=np.int64)
+        if self.binary:
+            values = np.ones(len(indices), dtype=np.float64)
+        else:
+            values = np.array([counts[i] for i in indices], dtype=np.float64)
+
+        if self.sublinear_tf:
+            np.log(values, values)
+            values += 1
+        if self.use_idf:
+            values *= self.idf[indices]
+
+        # Row normalization with the same sequential summation order as sklearn
+        if self.norm == 'l2':
+            total = 0.0
+            for value in values:
+                total += value * value
+            if total != 0.0:
+                values /= math.sqrt(total)
+        elif self.norm == 'l1':
+            total = 0.0
+            for value in values:
+                total += abs(value)
+            if total != 0.0:
+                values /= total
+        return indices, values
+
+    def transform(self, raw_documents):
+        """Vectorize documents into a dense float32 matrix ready for the tree"""
+        if isinstance(raw_documents, str):
+            raise ValueError("Iterable over raw text documents expected, string object received.")
+        raw_documents = list(raw_documents)
+        X = np.zeros((len(raw_documents), self.n_features), dtype=np.float32)
+        for row, doc in enumerate(raw_documents):
+            indices, values = self.transform_row(doc)
+            X[row, indices] = values
+        return X
+
+class CompiledTree:
+    """NumPy-only replacement for a fitted DecisionTreeClassifier's predict_proba()"""
+
+    def __init__(self, arrays, meta):
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.proba = arrays['proba']
+        self.classes_ = arrays['classes']
+        self.n_features_in_ = meta['n_features']
+        self.max_depth = meta['max_depth']
+
+    def apply(self, X):
+        """Return the leaf index reached by every row of X, walking all rows one level at a time"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])
+        nodes = np.zeros(X.shape[0], dtype=np.int64)
+        active = self.children_left[nodes] != -1
+        while active.any():
+            current = nodes[active]
+            values = X[rows[active], self.feature[current]]
+            nodes[active] = np.where(
+                values <= self.threshold[current],
+                self.children_left[current],
+                self.children_right[current],
+            )
+            active = self.children_left[nodes] != -1
+        return nodes
+
+    def predict_proba(self, X):
+        """Return class probabilities for every row of X"""
+        return self.proba[self.apply(X)]
+
+    def predict(self, X):
+        """Return the most probable class for every row of X"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+class CompiledLabelEncoder:
+    """NumPy-only replacement for a fitted LabelEncoder's inverse_transform()"""
+
+    def __init__(self, label_names):
+        self.classes_ = label_names
+
+    def inverse_transform(self, y):
+        """Map encoded labels back to disease names"""
+        return self.classes_[np.asarray(y)]
+
+class CompiledEngine:
+    """The compiled vectorizer, tree and label encoder loaded from one set of arrays"""
+
+    def __init__(self, arrays, meta):
+        if meta.get('format_version') != ENGINE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported engine format version {meta.get('format_version')} (expected {ENGINE_FORMAT_VERSION})"
+            )
+        self.arrays = arrays
+        self.meta = meta
+        self.vectorizer = CompiledVectorizer(arrays, meta['vectorizer'])
+        self.tree = CompiledTree(arrays, meta['tree'])
+        self.label_encoder = CompiledLabelEncoder(arrays['label_names']) if 'label_names' in arrays else None
@@ -0,0 +1,101 @@
+"""
+Decision-path explanations for the tree model
+
+A decision tree's prediction is fully explained by the root-to-leaf path the
+input takes: at each node one TF-IDF feature (a symptom term) is compared with
+a threshold. TreeExplainer flattens the tree into plain Python lists at load
+time (node -> term, threshold, children, class distribution), so explaining a
+prediction is one vectorization plus a walk of at most max_depth nodes, with
+no call into the model.
+"""
+
+import numpy as np
+
+from engine import compile_tree
+
+def feature_names(vectorizer, features):
+    """{feature index: term} for the features a tree tests, without materializing the whole vocabulary"""
+    used = {int(index) for index in features if index >= 0}
+    terms = getattr(vectorizer, 'terms', None)
+    if terms is not None:
+        # CompiledVectorizer: terms are stored by feature index
+        return {index: str(terms[index]) for index in used}
+    return {index: str(term) for term, index in vectorizer.vocabulary_.items() if index in used}
+
+class TreeExplainer:
+    """Per-node lookup lists of one decision tree, aligned with the snapshot's classes"""
+
+    def __init__(self, children_left, children_right, feature, threshold, node_proba, feature_names, class_names):
+        self.children_left = [int(child) for child in children_left]
+        self.children_right = [int(child) for child in children_right]
+        self.feature = [int(index) for index in feature]
+        self.threshold = [float(value) for value in threshold]
+        self.feature_names = [feature_names[index] if index >= 0 else None for index in self.feature]
+        # Most probable class at every node, and its share of the node's training samples
+        self.node_class = [class_names[index] for index in np.argmax(node_proba, axis=1)]
+        self.node_probability = [float(value) for value in np.max(node_proba, axis=1)]
+
+    @classmethod
+    def from_model(cls, model, vectorizer, class_names):
+        """Build an explainer for a fitted DecisionTreeClassifier or a CompiledTree; None for other models"""
+        if hasattr(model, 'tree_'):
+            arrays, _ = compile_tree(model)
+        elif hasattr(model, 'children_left'):
+            arrays = {name: getattr(model, name)
+                      for name in ('children_left', 'children_right', 'feature', 'threshold', 'proba')}
+        else:
+            return None
+        return cls(arrays['children_left'], arrays['children_right'], arrays['feature'],
+                   arrays['threshold'], arrays['proba'], feature_names(vectorizer, arrays['feature']), class_names)
+
+    @staticmethod
+    def vectorize(vectorizer, text):
+        """{feature index: float32 weight} of the text's TF-IDF vector, as the tree sees it"""
+        if hasattr(vectorizer, 'transform_row'):
+            indices, values = vectorizer.transform_row(text)
+        else:
+            row = vectorizer.transform([text])
+            indices, values = row.indices, row.data
+        # The tree compares float32 features against float64 thresholds
+        return dict(zip(np.asarray(indices).tolist(), np.asarray(values, dtype=np.float32).tolist()))
+
+    def explain(self, vectorizer, text):
+        """
+        The decision path of one symptom text
+
+        Every step names the term tested, its threshold, the input's weight for
+        it and which way the input went. matched_terms lists the input terms
+        that pushed the path to the right (weight above the threshold), i.e. the
+        symptoms that decided the outcome, each once in path order; the leaf
+        gives the disease it votes for.
+        """
+        weights = self.vectorize(vectorizer, text)
+        path = []
+        matched = []
+        node = 0
+        while self.children_left[node] != -1:
+            term = self.feature_names[node]
+            threshold = self.threshold[node]
+            weight = weights.get(self.feature[node], 0.0)
+            above = weight > threshold
+            path.append({
+                "node": node,
+                "term": term,
+                "threshold": round(threshold, 4),
+                "weight": round(weight, 4),
+                "condition": f"{term} > {round(threshold, 4)}" if above else f"{term} <= {round(threshold, 4)}"
+            })
+            # A term can be tested again further down; list it once, where it first decided
+            if above and term not in matched:
+                matched.append(term)
+            node = self.children_right[node] if above else self.children_left[node]
+        return {
+            "path": path,
+            "depth": len(path),
+            "matched_terms": matched,
+            "leaf": {
+                "node": node,
+                "disease": self.node_class[node],
+                "probability": round(self.node_probability[node], 2)
+            }
+        }
@@ -136,3 +136,5 @@ if __name__ == '__main__':
         print("\n3. Ensure pickle files are saved in binary mode:")
         print("   with open('file.pkl', 'wb') as f:")
         print("       pickle.dump(obj, f)")
+        print("\n4. Rebuild model.bundle so the server no longer depends on the pickles:")
+        print("   python bundle.py")
@@ -0,0 +1,43 @@
+"""
+Gunicorn configuration for serving the Disease Prediction API
+
+    cd backend
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The model is loaded once in the master (preload_app) and the workers are forked
+from it, so they share the loaded model pages copy-on-write. Settings can be
+overridden with SYMPTOMSENSE_* environment variables.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('SYMPTOMSENSE_BIND', '0.0.0.0:5000')
+
+# Prediction is CPU-bound, so scale processes with cores and keep a few threads per worker for I/O
+workers = int(os.environ.get('SYMPTOMSENSE_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('SYMPTOMSENSE_THREADS', 4))
+worker_class = 'gthread'
+
+# Load the app (and the model) in the master before forking the workers
+preload_app = True
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+def when_ready(server):
+    """Move everything loaded so far out of the garbage collector's reach before forking"""
+    # Without this the first collection in each worker touches every object
+    # header and copies the shared pages the model lives in
+    gc.freeze()
+
+def post_fork(server, worker):
+    """Warm up each worker right after it is forked"""
+    import app as backend
+    # Also starts the worker's inference pool (when configured) before it reports ready
+    backend.warm_up()
+    # Threads do not survive fork, so each worker runs its own artifact watcher
+    backend.start_artifact_watcher()
+    server.log.info("Worker %s warmed up", worker.pid)
@@ -0,0 +1,167 @@
+"""
+Low-overhead in-process metrics with Prometheus text exposition
+
+Counters and fixed-bucket histograms are plain Python lists updated under a
+short lock, so recording a sample costs a bisect and two additions. Values are
+per process: under gunicorn every worker keeps its own, and a scrape of
+/metrics reports the worker that answered it.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Latency buckets in seconds, from 50 microseconds to 2.5 seconds
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+def _format_labels(label_names, label_values, extra=None):
+    """Render a Prometheus label set such as {stage="parse",le="0.001"}"""
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    """Render a sample value the way Prometheus expects"""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        """Add amount to the counter for the given label values"""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        """Current count for the given label values"""
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        """Prometheus text lines for this counter"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels"""
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """Record one sample"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum and count
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values):
+        """Context manager recording the duration of a block"""
+        return _Timer(self, label_values)
+
+    def snapshot(self, *label_values):
+        """(bucket counts, sum, count) for the given label values, or None"""
+        with self._lock:
+            series = self._series.get(label_values)
+            return (list(series[0]), series[1], series[2]) if series else None
+
+    def render(self):
+        """Prometheus text lines for this histogram (cumulative buckets)"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, label_values, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+class _Timer:
+    """Times a with-block into a histogram using the monotonic perf counter"""
+
+    __slots__ = ('histogram', 'label_values', 'start')
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+class Registry:
+    """Ordered collection of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, label_names=()):
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable returning extra exposition lines at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self):
+        """The full Prometheus text exposition"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+# Process-wide registry and the request-path metrics
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter(
+    'symptomsense_requests_total', 'HTTP requests by endpoint and status code', ('endpoint', 'status'))
+ERRORS = REGISTRY.counter(
+    'symptomsense_errors_total', 'Failed requests by endpoint and error type', ('endpoint', 'type'))
+REQUEST_SECONDS = REGISTRY.histogram(
+    'symptomsense_request_seconds', 'End-to-end request handling time', ('endpoint',))
+STAGE_SECONDS = REGISTRY.histogram(
+    'symptomsense_stage_seconds', 'Time spent in each prediction stage', ('stage',))
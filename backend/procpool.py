@@ -0,0 +1,213 @@
+"""
+Process-pool inference backend with shared-memory model arrays
+
+In a threaded server, tokenizing and vectorizing hold the GIL, so a single
+process tops out at about one core however many threads it runs.
+InferencePool moves vectorize + predict_proba into worker processes:
+
+- The compiled engine arrays (vocabulary terms, stop words, idf, tree nodes,
+  leaf probabilities; see engine.py) are copied once into one
+  multiprocessing.shared_memory block. Every worker maps that block and builds
+  its CompiledEngine on zero-copy NumPy views of it.
+- Each worker owns one duplex pipe. A request is a compact frame of UTF-8 text
+  bytes plus offsets, and the answer is the raw float64 probability matrix;
+  nothing is pickled on the request path.
+- Idle workers wait in a queue. A request thread borrows one, sends its frame
+  and blocks in recv_bytes (which releases the GIL), so N concurrent requests
+  keep up to N processes busy.
+
+Workers are started with the 'spawn' method, which is safe from a threaded
+parent and works on every platform.
+"""
+
+import multiprocessing
+import os
+import queue
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine import CompiledEngine, compile_artifacts
+
+# Array sections start on this boundary inside the shared block
+ALIGNMENT = 64
+
+# Response status byte
+_OK = b'\x00'
+_ERROR = b'\x01'
+
+def engine_artifacts(snapshot):
+    """The (arrays, meta) of a snapshot's compiled engine, compiling pickled models on the fly"""
+    if snapshot.engine is not None:
+        return snapshot.engine.arrays, snapshot.engine.meta
+    return compile_artifacts(snapshot.tfidf, snapshot.model, snapshot.label_encoder)
+
+def pack_arrays(arrays):
+    """Copy arrays into a new shared memory block; returns (block, layout)"""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset += (array.nbytes + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, array in arrays.items():
+        spec = layout[name]
+        view = np.ndarray(spec["shape"], dtype=spec["dtype"], buffer=block.buf, offset=spec["offset"])
+        view[...] = array
+    return block, layout
+
+def view_arrays(block, layout):
+    """Read-only NumPy views of every array in a shared memory block"""
+    arrays = {}
+    for name, spec in layout.items():
+        view = np.ndarray(spec["shape"], dtype=spec["dtype"], buffer=block.buf, offset=spec["offset"])
+        view.flags.writeable = False
+        arrays[name] = view
+    return arrays
+
+def encode_texts(texts):
+    """Frame a list of texts as: count (uint32), count + 1 offsets (uint32), UTF-8 bytes"""
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return struct.pack('<I', len(encoded)) + offsets.tobytes() + b''.join(encoded)
+
+def decode_texts(frame):
+    """Inverse of encode_texts"""
+    (count,) = struct.unpack_from('<I', frame)
+    offsets = np.frombuffer(frame, dtype=np.uint32, count=count + 1, offset=4).tolist()
+    start = 4 + 4 * (count + 1)
+    blob = frame[start:]
+    return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+
+def _worker_main(block_name, layout, meta, connection):
+    """Worker process: build the engine on the shared arrays and answer frames until told to stop"""
+    block = shared_memory.SharedMemory(name=block_name)
+    engine = CompiledEngine(view_arrays(block, layout), meta)
+    try:
+        while True:
+            frame = connection.recv_bytes()
+            if not frame:
+                break
+            try:
+                texts = decode_texts(frame)
+                probabilities = engine.tree.predict_proba(engine.vectorizer.transform(texts))
+                connection.send_bytes(_OK + np.ascontiguousarray(probabilities, dtype=np.float64).tobytes())
+            except Exception as e:
+                connection.send_bytes(_ERROR + f"{type(e).__name__}: {e}".encode('utf-8'))
+    finally:
+        del engine
+        block.close()
+
+class PoolClosed(RuntimeError):
+    """The pool was closed (e.g. replaced after a reload) before it could take the request"""
+
+class InferencePool:
+    """Worker processes scoring texts for one model snapshot from shared-memory arrays"""
+
+    def __init__(self, snapshot, processes):
+        self.snapshot = snapshot
+        self.processes = processes
+        self.n_classes = len(snapshot.class_names)
+        self.pid = os.getpid()
+        arrays, self._meta = engine_artifacts(snapshot)
+        self._block, self._layout = pack_arrays(arrays)
+        self.shared_bytes = self._block.size
+        self.restarts = 0
+
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = [None] * processes
+        # Indexes of workers not serving a request; None once the pool is closed
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        for index in range(processes):
+            self._start_worker(index)
+            self._idle.put(index)
+
+    def _start_worker(self, index):
+        parent_end, child_end = self._context.Pipe(duplex=True)
+        process = self._context.Process(
+            target=_worker_main, args=(self._block.name, self._layout, self._meta, child_end),
+            name=f'inference-{index}', daemon=True
+        )
+        process.start()
+        child_end.close()
+        self._workers[index] = (process, parent_end)
+
+    def _replace_worker(self, index):
+        """Start a fresh worker in place of one whose pipe broke (unless the pool was closed meanwhile)"""
+        with self._lock:
+            process, connection = self._workers[index]
+            connection.close()
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=1)
+            # close() may already have unlinked the shared memory a new worker would attach to
+            if self._closed:
+                return
+            self._start_worker(index)
+            self.restarts += 1
+
+    def predict_proba(self, symptom_texts):
+        """Score texts in one worker process; returns the probability matrix"""
+        frame = encode_texts(symptom_texts)
+        index = self._idle.get()
+        if index is None:
+            self._idle.put(None)
+            raise PoolClosed("Inference pool is closed")
+        try:
+            connection = self._workers[index][1]
+            connection.send_bytes(frame)
+            reply = connection.recv_bytes()
+        except (EOFError, OSError) as e:
+            self._replace_worker(index)
+            raise RuntimeError(f"Inference worker {index} exited: {e}") from e
+        finally:
+            self._idle.put(index)
+        if reply[:1] == _ERROR:
+            raise RuntimeError(f"Inference worker failed: {reply[1:].decode('utf-8')}")
+        return np.frombuffer(reply, dtype=np.float64, offset=1).reshape(len(symptom_texts), self.n_classes)
+
+    def close(self, timeout=5.0):
+        """
+        Stop the workers and release the shared memory block
+
+        Requests already in a worker finish first; later callers get PoolClosed.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        deadline = time.monotonic() + timeout
+        for _ in range(self.processes):
+            try:
+                index = self._idle.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            try:
+                self._workers[index][1].send_bytes(b'')
+            except OSError:
+                pass
+        self._idle.put(None)
+        for process, connection in self._workers:
+            process.join(timeout=max(0.1, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        self._block.close()
+        self._block.unlink()
+
+    def info(self):
+        """Pool details for /health"""
+        return {
+            "processes": self.processes,
+            "alive": sum(1 for process, _ in self._workers if process.is_alive()),
+            "restarts": self.restarts,
+            "model_version": self.snapshot.version,
+            "shared_memory_bytes": self.shared_bytes
+        }
@@ -0,0 +1,59 @@
+"""
+Registry of named model versions
+
+Each version is a complete ModelSnapshot (vectorizer, classifier, label
+encoder, mapping). One version is the primary and answers requests; the
+others are shadows that only score sampled traffic in the background (see
+shadow.py). Updates replace the whole name -> snapshot mapping, so readers
+never need a lock.
+"""
+
+import threading
+
+class ModelRegistry:
+    """Named ModelSnapshots with one primary"""
+
+    def __init__(self):
+        self._versions = {}
+        self._primary = None
+        self._lock = threading.Lock()
+
+    def register(self, name, snapshot, primary=False):
+        """Add or replace a named version, optionally making it the primary"""
+        with self._lock:
+            versions = dict(self._versions)
+            versions[name] = snapshot
+            self._versions = versions
+            if primary or self._primary is None:
+                self._primary = name
+
+    def remove(self, name):
+        """Drop a shadow version (the primary cannot be removed)"""
+        with self._lock:
+            if name == self._primary:
+                raise ValueError(f"Cannot remove the primary model version {name!r}")
+            versions = dict(self._versions)
+            versions.pop(name, None)
+            self._versions = versions
+
+    def get(self, name=None):
+        """The snapshot registered under name (the primary by default), or None"""
+        return self._versions.get(self._primary if name is None else name)
+
+    @property
+    def primary(self):
+        """Name of the primary version"""
+        return self._primary
+
+    def shadows(self):
+        """(name, snapshot) pairs of every version except the primary"""
+        primary = self._primary
+        return [(name, snapshot) for name, snapshot in self._versions.items() if name != primary]
+
+    def info(self):
+        """Version details of every registered model for /health"""
+        versions = self._versions
+        return {
+            "primary": self._primary,
+            "versions": {name: snapshot.info() for name, snapshot in sorted(versions.items())}
+        }
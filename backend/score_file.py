@@ -0,0 +1,175 @@
+"""
+Bulk scoring of symptom records from CSV or JSONL files
+
+Streams the input in fixed-size chunks, scores the chunks on a pool of worker
+processes with the same validation and scoring pipeline as /predict/batch
+(score_records in snapshot.py), and writes one JSON line per input record, in
+input order, as soon as each chunk is done. At most a few chunks are in flight at once, so
+memory use does not grow with the file size.
+
+Input is a CSV with a "symptoms" column (like symptomsense_final_40diseases.csv)
+or JSONL with one {"symptoms": ..., "age": ..., "gender": ...} object per line.
+Output lines look like the /predict/batch items:
+
+    {"index":0,"results":[{"description":...,"disease":...,"probability":1.0,...}, ...]}
+    {"error":"Symptoms text is required","index":1}
+
+A JSONL line that is not valid JSON (or not UTF-8) gets an error item at its
+index like any other invalid record, and the run goes on.
+
+Examples:
+
+    python score_file.py symptomsense_final_40diseases.csv scored.jsonl
+    python score_file.py intake.jsonl - --workers 8 --chunk-size 2000 --top-k 5
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from snapshot import load_snapshot, score_records
+
+# Model snapshot loaded once in each worker process
+_worker_snapshot = None
+
+def _init_worker(model_dir):
+    """Pool initializer: load the model in the worker process"""
+    global _worker_snapshot
+    # Keep the loader's progress output out of the result stream
+    sys.stdout = open(os.devnull, 'w')
+    _worker_snapshot = load_snapshot(model_dir)
+
+class UnreadableLine:
+    """Stands in for an input line that could not be decoded, with the reason"""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+def score_chunk(records, k, demographics=True, autocorrect=False, synonyms=True):
+    """Score a list of (index, record) pairs; returns the output lines in the same order"""
+    order = [index for index, _ in records]
+    errors = {index: json.dumps({"error": record.error, "index": index}, separators=(',', ':'))
+              for index, record in records if isinstance(record, UnreadableLine)}
+    records = [(index, record) for index, record in records if index not in errors]
+    indices = [index for index, _ in records]
+    # CSV input (like the dataset) carries age_group instead of age
+    records = [dict(record, age=record.get('age') or record.get('age_group'))
+               if isinstance(record, dict) and 'age_group' in record else record
+               for _, record in records]
+    lines = score_records(_worker_snapshot, records, k, demographics, autocorrect, synonyms, indices=indices)[0] \
+        if records else []
+    if not errors:
+        return lines
+    scored = iter(lines)
+    return [errors[index] if index in errors else next(scored) for index in order]
+
+def parse_line(raw):
+    """One JSONL line (bytes) as a record, or an UnreadableLine saying why it is not one"""
+    try:
+        return json.loads(raw.decode('utf-8'))
+    except UnicodeDecodeError as e:
+        return UnreadableLine(f"Line is not valid UTF-8: {e.reason} at byte {e.start}")
+    except ValueError as e:
+        return UnreadableLine(f"Line is not valid JSON: {e}")
+
+def read_records(path):
+    """Yield input records one at a time from a CSV or JSONL file ('-' reads JSONL from stdin)"""
+    # JSONL is read as bytes, so one badly encoded line does not stop the rest
+    if path == '-':
+        for raw in sys.stdin.buffer:
+            if raw.strip():
+                yield parse_line(raw)
+        return
+
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, 'rb') as f:
+            for raw in f:
+                if raw.strip():
+                    yield parse_line(raw)
+
+def read_chunks(records, chunk_size):
+    """Group records into lists of (index, record) pairs of at most chunk_size"""
+    chunk = []
+    for index, record in enumerate(records):
+        chunk.append((index, record))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def score_file(input_path, output, workers, chunk_size, k, model_dir, progress=True, demographics=True,
+               autocorrect=False, synonyms=True):
+    """Score every record of input_path into the output stream; returns the number of records"""
+    max_in_flight = workers * 2
+    in_flight = deque()
+    done = 0
+    start = time.perf_counter()
+
+    def write_oldest():
+        nonlocal done
+        lines = in_flight.popleft().result()
+        output.write('\n'.join(lines) + '\n')
+        done += len(lines)
+        if progress:
+            elapsed = time.perf_counter() - start
+            rate = done / elapsed if elapsed else 0.0
+            print(f"\r  {done} records scored ({rate:.0f} records/s)", end='', file=sys.stderr, flush=True)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_dir,)) as pool:
+        for chunk in read_chunks(read_records(input_path), chunk_size):
+            # Bounded window: wait for the oldest chunk before reading further
+            if len(in_flight) >= max_in_flight:
+                write_oldest()
+            in_flight.append(pool.submit(score_chunk, chunk, k, demographics, autocorrect, synonyms))
+        while in_flight:
+            write_oldest()
+
+    if progress:
+        elapsed = time.perf_counter() - start
+        print(f"\n[OK] Scored {done} records in {elapsed:.2f}s "
+              f"({done / elapsed if elapsed else 0.0:.0f} records/s) with {workers} workers", file=sys.stderr)
+    return done
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or JSONL file of symptom records")
+    parser.add_argument('input', help="CSV with a symptoms column, JSONL, or - for JSONL on stdin")
+    parser.add_argument('output', help="output JSONL path, or - for stdout")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="records per chunk")
+    parser.add_argument('--top-k', type=int, default=3, help="diseases per record")
+    parser.add_argument('--model-dir', default=config.MODEL_DIR, help="directory with the model artifacts")
+    parser.add_argument('--no-demographics', action='store_true',
+                        help="ignore age and gender (no demographic priors)")
+    parser.add_argument('--autocorrect', action='store_true', help="correct misspelled symptoms")
+    parser.add_argument('--no-synonyms', action='store_true', help="do not rewrite layman phrases to symptom terms")
+    parser.add_argument('--quiet', action='store_true', help="no progress output")
+    args = parser.parse_args(argv)
+
+    if args.top_k < 1 or args.chunk_size < 1 or args.workers < 1:
+        parser.error("--top-k, --chunk-size and --workers must be positive")
+
+    if args.output == '-':
+        score_file(args.input, sys.stdout, args.workers, args.chunk_size, args.top_k, args.model_dir,
+                   progress=not args.quiet, demographics=not args.no_demographics,
+                   autocorrect=args.autocorrect, synonyms=not args.no_synonyms)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            score_file(args.input, output, args.workers, args.chunk_size, args.top_k, args.model_dir,
+                       progress=not args.quiet, demographics=not args.no_demographics,
+                       autocorrect=args.autocorrect, synonyms=not args.no_synonyms)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
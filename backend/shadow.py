@@ -0,0 +1,129 @@
+"""
+Shadow scoring of sampled traffic
+
+A configured fraction of requests is copied, after the primary model has
+answered, onto a bounded queue. A background worker scores those texts with
+every shadow model in the registry and records how often each shadow agrees
+with the primary's top prediction, and how long it took. The request thread
+only samples and does a non-blocking put: when the queue is full the work is
+dropped and counted, never waited for.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+from metrics import REGISTRY
+from snapshot import CROSS
+
+SHADOW_SECONDS = REGISTRY.histogram(
+    'symptomsense_shadow_seconds', 'Time a shadow model took to score a sampled request', ('model',))
+SHADOW_COMPARISONS = REGISTRY.counter(
+    'symptomsense_shadow_comparisons_total', 'Texts scored by a shadow model, by top-1 agreement with the primary',
+    ('model', 'agreement'))
+SHADOW_DROPPED = REGISTRY.counter(
+    'symptomsense_shadow_dropped_total', 'Sampled requests dropped because the shadow queue was full')
+
+class ShadowScorer:
+    """
+    Scores sampled requests with the registry's shadow models on a worker thread
+
+    The worker starts on first use in each process, so the scorer can be
+    created before gunicorn forks its workers.
+    """
+
+    def __init__(self, registry, fraction, queue_size=256):
+        self.registry = registry
+        self.fraction = fraction
+        self.queue_size = queue_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stats = {}
+        self.sampled = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        """Start the worker thread if this process does not have one yet"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                threading.Thread(target=self._run, name='shadow-scorer', daemon=True).start()
+                self._pid = os.getpid()
+
+    def offer(self, primary, symptom_texts, rows):
+        """Maybe queue a request's texts and the primary's probability rows; never blocks"""
+        if self.fraction <= 0 or random.random() >= self.fraction or not self.registry.shadows():
+            return False
+        self._ensure_started()
+        self.sampled += 1
+        try:
+            self._queue.put_nowait((primary, list(symptom_texts), rows))
+        except queue.Full:
+            self.dropped += 1
+            SHADOW_DROPPED.inc()
+            return False
+        return True
+
+    def _run(self):
+        """Worker loop: score each queued request with every shadow model"""
+        while True:
+            primary, symptom_texts, rows = self._queue.get()
+            try:
+                self._compare(primary, symptom_texts, rows)
+            except Exception as e:
+                print(f"{CROSS} Shadow scoring failed: {e}")
+
+    def _compare(self, primary, symptom_texts, rows):
+        """Score with each shadow and count top-1 agreement with the primary"""
+        primary_top = [primary.class_names[int(np.argmax(row))] for row in rows]
+        for name, shadow in self.registry.shadows():
+            start = time.perf_counter()
+            try:
+                probabilities = shadow.predict_proba(symptom_texts)
+            except Exception as e:
+                # One broken shadow must not keep the others from being compared
+                print(f"{CROSS} Shadow model {name} failed: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            SHADOW_SECONDS.observe(elapsed, name)
+
+            agreed = 0
+            for expected, row in zip(primary_top, probabilities):
+                agreed += shadow.class_names[int(np.argmax(row))] == expected
+            SHADOW_COMPARISONS.inc(name, 'true', amount=agreed)
+            SHADOW_COMPARISONS.inc(name, 'false', amount=len(primary_top) - agreed)
+
+            with self._lock:
+                stats = self._stats.setdefault(name, {"requests": 0, "texts": 0, "agreed": 0, "seconds": 0.0})
+                stats["requests"] += 1
+                stats["texts"] += len(primary_top)
+                stats["agreed"] += agreed
+                stats["seconds"] += elapsed
+
+    def stats(self):
+        """Sampling counters and per-shadow agreement and latency for /health"""
+        with self._lock:
+            models = {
+                name: {
+                    "requests": stats["requests"],
+                    "texts": stats["texts"],
+                    "top1_agreement": round(stats["agreed"] / stats["texts"], 4) if stats["texts"] else None,
+                    "mean_latency_ms": round(1000 * stats["seconds"] / stats["requests"], 3)
+                }
+                for name, stats in sorted(self._stats.items())
+            }
+        return {
+            "fraction": self.fraction,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "models": models
+        }
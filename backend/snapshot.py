@@ -0,0 +1,563 @@
+"""
+Immutable model snapshots
+
+A ModelSnapshot bundles one loaded model version: the vectorizer, classifier,
+label encoder and mapping, plus everything derived from them at load time
+(the per-class result table and the vectorizer's analyzer). Snapshots are
+never modified after construction; reloading builds a new one and swaps the
+reference, so a request that picked up the old snapshot finishes on it.
+
+The request pipeline shared by /predict/batch and score_file.py (validation,
+rewriting, correction, scoring, priors and rendering) lives here as well.
+"""
+
+import csv
+import hashlib
+import json
+import pickle
+import os
+import threading
+import time
+import numpy as np
+from bundle import BUNDLE_FILE, load_bundle
+from cases import CaseIndex
+from catalog import DiseaseCatalog
+from demographics import DemographicPriors
+from explain import TreeExplainer
+from metrics import STAGE_SECONDS
+from spelling import COMMON_WORDS_FILE, DEFAULT_TOKEN_PATTERN, SpellingCorrector, read_word_list
+from suggest import SuggestIndex
+from synonyms import SynonymRewriter, read_synonyms
+
+# Training CSV the demographic priors and symptom suggestions are built from
+# (looked up in the model directory first, then next to this file)
+DATASET_FILE = 'symptomsense_final_40diseases.csv'
+
+# Layman phrase -> canonical symptom term dictionary (optional; see synonyms.py)
+SYNONYMS_FILE = 'synonyms.json'
+
+# ASCII-safe symbols for Windows compatibility
+CHECK = "[OK]"
+CROSS = "[X]"
+WARN = "[!]"
+
+def decode_label(disease_label, label_encoder):
+    """Convert a model class label to the disease name string"""
+    # Convert disease label to string (handles numpy int64, int, string, etc.)
+    # If label_encoder exists, use it to decode numeric labels to disease names
+    if label_encoder is not None:
+        try:
+            # If disease_label is numeric, use inverse_transform
+            if isinstance(disease_label, (int, np.integer)):
+                disease = label_encoder.inverse_transform([disease_label])[0]
+            else:
+                # Already a string, use as is
+                disease = str(disease_label)
+        except:
+            # Fallback to string conversion
+            disease = str(disease_label)
+    else:
+        # No label encoder, convert to string
+        disease = str(disease_label)
+
+    # Ensure disease is a string for mapping lookup and other operations
+    return str(disease)
+
+def disease_fields(disease, disease_label, mapping):
+    """Look up severity, medication, recommendation and description for a disease"""
+    # Get disease information from mapping (try both string and original format)
+    disease_info = mapping.get(disease, {})
+    if not disease_info:
+        # Try with original label if disease is different
+        disease_info = mapping.get(disease_label, {})
+
+    # Safe description generation (convert disease to string for .lower())
+    disease_str = str(disease).lower() if disease else "unknown condition"
+
+    # Extract information with defaults if not found
+    return {
+        "disease": disease,  # Return as string
+        "severity": disease_info.get('severity', 'Low'),
+        "medication": disease_info.get('medication', 'Consult a doctor for proper medication'),
+        "recommendation": disease_info.get('recommendation', 'Consult a healthcare professional'),
+        "description": disease_info.get('description', f'Condition related to {disease_str}')
+    }
+
+def build_class_table(classes, label_encoder, mapping):
+    """
+    Precompute the per-class part of every result entry
+
+    Returns (names, fragments, fields), all aligned with the model's class
+    indices. Each fragment is a (prefix, suffix) pair of pre-serialized JSON
+    around the probability value, so a result entry is rendered with two string
+    joins; fields holds the same disease information as a dict.
+    """
+    names = []
+    fragments = []
+    all_fields = []
+    for disease_label in classes:
+        # Label encoders stored in a pickle give back numpy scalars; hashable lookups need plain values
+        if isinstance(disease_label, np.generic):
+            disease_label = disease_label.item()
+        disease = decode_label(disease_label, label_encoder)
+        fields = disease_fields(disease, disease_label, mapping)
+
+        # Keys are emitted sorted, matching jsonify's output
+        before = {key: value for key, value in fields.items() if key < 'probability'}
+        after = {key: value for key, value in fields.items() if key > 'probability'}
+        prefix = json.dumps(before, sort_keys=True, separators=(',', ':'))[:-1] + ',"probability":'
+        suffix = ',' + json.dumps(after, sort_keys=True, separators=(',', ':'))[1:]
+
+        names.append(disease)
+        fragments.append((prefix, suffix))
+        all_fields.append(fields)
+    return names, fragments, all_fields
+
+def top_k_indices(probabilities, k):
+    """
+    Return the indices of the k largest probabilities, most probable first
+
+    Uses a partial selection instead of sorting the whole row. Ties are broken
+    by class index, exactly as a stable descending sort would.
+    """
+    n = len(probabilities)
+    if k >= n:
+        return np.argsort(-probabilities, kind='stable')
+
+    # k-th largest value; everything above it is selected, ties fill the rest in index order
+    kth = np.partition(probabilities, n - k)[n - k]
+    above = np.flatnonzero(probabilities > kth)
+    ties = np.flatnonzero(probabilities == kth)[:k - len(above)]
+    selected = np.concatenate((above, ties))
+    return selected[np.argsort(-probabilities[selected], kind='stable')]
+
+class ModelSnapshot:
+    """One loaded model version and the lookup tables derived from it"""
+
+    def __init__(self, model, tfidf, label_encoder, mapping, version, source, dataset_rows=None, engine=None,
+                 synonyms=None, known_words=None):
+        self.model = model
+        self.tfidf = tfidf
+        self.label_encoder = label_encoder
+        self.mapping = mapping
+        self.version = version
+        self.source = source
+        # The CompiledEngine behind model/tfidf when loaded from a bundle (its arrays feed the process pool)
+        self.engine = engine
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+        # Class-index-aligned result table (see build_class_table)
+        self.class_names, self.class_fragments, class_fields = build_class_table(model.classes_, label_encoder, mapping)
+
+        # Pre-serialized, pre-compressed /diseases responses
+        self.catalog = DiseaseCatalog(self.class_names, class_fields)
+
+        # Vectorizer analyzer used to build canonical cache keys
+        self.analyzer = tfidf.build_analyzer()
+
+        # Decision-path lookup lists for explanations (None for models that are not trees)
+        self.explainer = TreeExplainer.from_model(model, tfidf, self.class_names)
+
+        # Per-(age_group, gender) class reweighting table (None without a dataset)
+        dataset_rows = dataset_rows or []
+        self.priors = DemographicPriors.from_rows(
+            [(row.get('disease'), row.get('age_group'), row.get('gender')) for row in dataset_rows], self.class_names
+        ) if dataset_rows else None
+
+        # Share of each disease in the training data, for drift comparisons in /stats
+        disease_counts = {}
+        for row in dataset_rows:
+            disease_counts[row.get('disease')] = disease_counts.get(row.get('disease'), 0) + 1
+        self.training_distribution = {
+            name: disease_counts.get(name, 0) / len(dataset_rows) for name in self.class_names
+        } if dataset_rows else {}
+
+        # Inverted index of the dataset's cases in TF-IDF space, for similar-case lookups (None without a dataset)
+        self.case_index = CaseIndex.build(tfidf, dataset_rows) if dataset_rows else None
+
+        # Rewriting of layman phrases to canonical symptom terms (None without a dictionary)
+        self.rewriter = SynonymRewriter(synonyms) if synonyms else None
+
+        # The autocomplete index and the spelling corrector each hold their own Python copy of the
+        # vocabulary, so they are built on first use (see suggest_index and corrector)
+        self._symptom_texts = tuple(row.get('symptoms') or '' for row in dataset_rows)
+        self._known_words = known_words
+        self._suggest_index = None
+        self._corrector = None
+        self._lazy_lock = threading.Lock()
+
+    @property
+    def suggest_index(self):
+        """Autocomplete index over the vocabulary and the dataset's symptom phrases"""
+        if self._suggest_index is None:
+            with self._lazy_lock:
+                if self._suggest_index is None:
+                    self._suggest_index = SuggestIndex.build(self.tfidf.vocabulary_, self._symptom_texts, self.analyzer)
+        return self._suggest_index
+
+    @property
+    def corrector(self):
+        """Typo correction against the vocabulary, preferring terms common in the dataset and leaving real words alone"""
+        if self._corrector is None:
+            frequencies = self.suggest_index.frequency
+            with self._lazy_lock:
+                if self._corrector is None:
+                    self._corrector = SpellingCorrector(
+                        self.tfidf.vocabulary_, self.analyzer,
+                        getattr(self.tfidf, 'token_pattern', None) or DEFAULT_TOKEN_PATTERN,
+                        frequencies=frequencies, known_words=self._known_words)
+        return self._corrector
+
+    def predict_proba(self, symptom_texts):
+        """Vectorize symptom texts and return their probability rows"""
+        return self.model.predict_proba(self.tfidf.transform(symptom_texts))
+
+    def demographic_cells(self, records):
+        """Prior table rows for a list of (age, gender) pairs, or None if nothing would change"""
+        if self.priors is None:
+            return None
+        cells = [self.priors.lookup(age, gender) for age, gender in records]
+        if all(cell == self.priors.neutral for cell in cells):
+            return None
+        return cells
+
+    def apply_priors(self, probabilities, cells):
+        """Reweight probability rows by their demographic cells (see demographics.py)"""
+        if cells is None:
+            return probabilities
+        return self.priors.apply(probabilities, cells)
+
+    def render_results(self, probabilities, k):
+        """Render the JSON array of the k most probable diseases of one probability row"""
+        entries = []
+        for index in top_k_indices(probabilities, k):
+            prefix, suffix = self.class_fragments[index]
+            # Round to 2 decimal places; repr matches json's float encoding
+            entries.append(prefix + repr(round(float(probabilities[index]), 2)) + suffix)
+        return '[' + ','.join(entries) + ']'
+
+    def info(self):
+        """Version details for /health"""
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "classes": len(self.class_names),
+            "demographic_priors": self.priors.info() if self.priors is not None else None,
+            "synonyms": self.rewriter.info() if self.rewriter is not None else None
+        }
+
+def validate_record(data):
+    """
+    Extract and validate one {symptoms, age, gender} record
+
+    Returns (symptoms, age, gender, error) where error is None for a valid record
+    """
+    if not isinstance(data, dict):
+        return None, None, None, "Record must be a JSON object"
+
+    symptoms = data.get('symptoms', '')
+    age = data.get('age', None)
+    gender = data.get('gender', None)
+
+    # Validate symptoms input
+    if not symptoms or not isinstance(symptoms, str):
+        return None, None, None, "Symptoms text is required"
+
+    if not symptoms.strip():
+        return None, None, None, "Symptoms text cannot be empty"
+
+    return symptoms, age, gender, None
+
+def rewrite_texts(current, symptom_texts):
+    """Rewrite layman phrases to canonical symptom terms, returning (rewritten_texts, rewrites per text)"""
+    with STAGE_SECONDS.time('synonyms'):
+        results = [current.rewriter.rewrite(symptoms) for symptoms in symptom_texts]
+    return [text for text, _ in results], [rewrites for _, rewrites in results]
+
+def rewrites_field(rewrites):
+    """JSON member (with a leading comma) reporting rewritten phrases, or '' when there are none"""
+    if not rewrites:
+        return ''
+    return ',"rewrites":' + json.dumps(rewrites, sort_keys=True, separators=(',', ':'))
+
+def correct_texts(current, symptom_texts):
+    """Spell-correct symptom texts, returning (corrected_texts, corrections per text)"""
+    with STAGE_SECONDS.time('spell_correct'):
+        results = [current.corrector.correct(symptoms) for symptoms in symptom_texts]
+    return [text for text, _ in results], [corrections for _, corrections in results]
+
+def corrections_field(corrections):
+    """JSON member reporting applied corrections, or '' when there are none"""
+    if not corrections:
+        return ''
+    return '"corrections":' + json.dumps(corrections, sort_keys=True, separators=(',', ':')) + ','
+
+def apply_demographics(current, rows, demographics):
+    """Reweight probability rows by each record's (age, gender) prior; rows are returned as-is without priors"""
+    cells = current.demographic_cells(demographics)
+    if cells is None:
+        return rows
+    with STAGE_SECONDS.time('demographics'):
+        return current.apply_priors(rows, cells)
+
+def score_records(current, records, k, demographics=True, autocorrect=False, synonyms=True, predict=None,
+                  indices=None):
+    """
+    Validate and score a list of records the way /predict/batch does
+
+    Valid records go through rewrite -> correct -> score -> priors -> render,
+    all of them together; invalid ones get a per-item error. predict(current,
+    texts) returns the probability rows (default: the snapshot's own
+    predict_proba; the API passes its cached scorer). indices are the numbers
+    reported as each item's "index" (default: the record positions).
+
+    Returns (items, valid, probabilities): the serialized JSON items in record
+    order, the (position, symptoms, age, gender) of every valid record, and
+    their probability rows.
+    """
+    indices = range(len(records)) if indices is None else indices
+    items = [None] * len(records)
+    valid = []
+    for position, (index, record) in enumerate(zip(indices, records)):
+        symptoms, age, gender, error = validate_record(record)
+        if error:
+            items[position] = json.dumps({"error": error, "index": index}, separators=(',', ':'))
+        else:
+            valid.append((position, symptoms, age, gender))
+    if not valid:
+        return items, valid, []
+
+    texts = [symptoms for _, symptoms, _, _ in valid]
+    rewrites = [None] * len(texts)
+    if synonyms and current.rewriter is not None:
+        texts, rewrites = rewrite_texts(current, texts)
+
+    corrections = [None] * len(texts)
+    if autocorrect:
+        texts, corrections = correct_texts(current, texts)
+
+    # One vectorized transform and one predict_proba call for all the records
+    probabilities = predict(current, texts) if predict is not None else current.predict_proba(texts)
+
+    # One multiply-and-renormalize for the whole batch
+    if demographics:
+        probabilities = apply_demographics(current, probabilities, [(age, gender) for _, _, age, gender in valid])
+
+    with STAGE_SECONDS.time('top_k'):
+        for (position, _, _, _), row, applied, rewritten in zip(valid, probabilities, corrections, rewrites):
+            items[position] = (f'{{{corrections_field(applied)}"index":{indices[position]},'
+                               f'"results":{current.render_results(row, k)}{rewrites_field(rewritten)}}}')
+    return items, valid, probabilities
+
+def read_dataset(path):
+    """Read the training CSV as a list of row dicts"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def artifact_version(paths):
+    """Short content hash of the given artifact files (missing files are skipped)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def load_snapshot(model_dir):
+    """
+    Load model.bundle (or model.pkl, tfidf.pkl, and mapping.json files) from model_dir
+
+    Returns a new ModelSnapshot; nothing global is touched, so a failed load
+    leaves whatever is currently serving in place.
+    """
+    # Resolve artifact paths so loading does not depend on the working directory
+    bundle_path = os.path.join(model_dir, BUNDLE_FILE)
+    model_path = os.path.join(model_dir, 'model.pkl')
+    tfidf_path = os.path.join(model_dir, 'tfidf.pkl')
+    label_encoder_path = os.path.join(model_dir, 'label_encoder.pkl')
+    mapping_path = os.path.join(model_dir, 'mapping.json')
+    disease_info_path = os.path.join(model_dir, 'disease_info.json')
+    
+    model = None
+    tfidf = None
+    label_encoder = None
+    mapping = None
+    engine = None
+    bundle_mapping = None
+    try:
+        if os.path.exists(bundle_path):
+            # Serve from the memory-mapped bundle (no unpickling, no scikit-learn import)
+            print(f"Loading {BUNDLE_FILE}...")
+            try:
+                engine, bundle_mapping, header = load_bundle(bundle_path)
+            except Exception as e:
+                print(f"{CROSS} Error loading {BUNDLE_FILE}: {e}")
+                print("  Tip: Rebuild it from the pickles with: python bundle.py")
+                raise
+            model = engine.tree
+            tfidf = engine.vectorizer
+            label_encoder = engine.label_encoder
+            print(f"{CHECK} Bundle loaded successfully (created {header['created_at']}, "
+                  f"sha256 {header['sha256'][:12]}, {len(tfidf.vocabulary_)} terms)")
+            # Retrained pickles are not served until the bundle is rebuilt from them
+            stale = [os.path.basename(path) for path in (model_path, tfidf_path)
+                     if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(bundle_path)]
+            if stale:
+                print(f"{WARN} Warning: {' and '.join(stale)} newer than {BUNDLE_FILE}, which is still served")
+                print("  Tip: Rebuild the bundle from the pickles with: python bundle.py")
+            version = header['sha256'][:12]
+            source = BUNDLE_FILE
+        else:
+            # Check if files exist
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"model.pkl not found in {model_dir}")
+            if not os.path.exists(tfidf_path):
+                raise FileNotFoundError(f"tfidf.pkl not found in {model_dir}")
+        
+            # Load the trained ML model with proper error handling
+            print("Loading model.pkl...")
+            try:
+                # Try joblib first (more reliable for sklearn models)
+                try:
+                    from joblib import load as joblib_load
+                    file_size = os.path.getsize(model_path)
+                    if file_size == 0:
+                        raise ValueError("model.pkl is empty")
+                    model = joblib_load(model_path)
+                    print(f"{CHECK} Model loaded successfully with joblib (size: {file_size} bytes)")
+                except ImportError:
+                    # Fallback to pickle if joblib not available
+                    with open(model_path, 'rb') as f:
+                        file_size = os.path.getsize(model_path)
+                        if file_size == 0:
+                            raise ValueError("model.pkl is empty")
+                        model = pickle.load(f)
+                        print(f"{CHECK} Model loaded successfully with pickle (size: {file_size} bytes)")
+            except Exception as e:
+                print(f"{CROSS} Error loading model.pkl: {e}")
+                print("  Tip: Try regenerating pickle files from your training script")
+                raise
+        
+            # Load the TF-IDF vectorizer with proper error handling
+            print("Loading tfidf.pkl...")
+            try:
+                # Try joblib first (more reliable for sklearn models)
+                try:
+                    from joblib import load as joblib_load
+                    file_size = os.path.getsize(tfidf_path)
+                    if file_size == 0:
+                        raise ValueError("tfidf.pkl is empty")
+                    tfidf = joblib_load(tfidf_path)
+                    print(f"{CHECK} TF-IDF vectorizer loaded successfully with joblib (size: {file_size} bytes)")
+                except ImportError:
+                    # Fallback to pickle if joblib not available
+                    with open(tfidf_path, 'rb') as f:
+                        file_size = os.path.getsize(tfidf_path)
+                        if file_size == 0:
+                            raise ValueError("tfidf.pkl is empty")
+                        tfidf = pickle.load(f)
+                        print(f"{CHECK} TF-IDF vectorizer loaded successfully with pickle (size: {file_size} bytes)")
+            except Exception as e:
+                print(f"{CROSS} Error loading tfidf.pkl: {e}")
+                print("  Tip: Try regenerating pickle files from your training script")
+                raise
+
+            # stop_words_ (terms cut by max_features/min_df/max_df) is for introspection only
+            if hasattr(tfidf, 'stop_words_'):
+                del tfidf.stop_words_
+        
+            # Load label encoder if it exists (optional)
+            if os.path.exists(label_encoder_path):
+                print("Loading label_encoder.pkl...")
+                try:
+                    # Try joblib first
+                    try:
+                        from joblib import load as joblib_load
+                        label_encoder = joblib_load(label_encoder_path)
+                        print(f"{CHECK} Label encoder loaded successfully with joblib")
+                    except ImportError:
+                        # Fallback to pickle
+                        with open(label_encoder_path, 'rb') as f:
+                            label_encoder = pickle.load(f)
+                        print(f"{CHECK} Label encoder loaded successfully with pickle")
+                except Exception as e:
+                    print(f"{WARN} Warning: Could not load label_encoder.pkl: {e}")
+                    print("  Label encoder is optional, continuing without it...")
+        
+            version = artifact_version([model_path, tfidf_path, label_encoder_path])
+            source = 'pickle'
+        
+        # Load mapping.json (fallback to the bundle's embedded copy, then disease_info.json)
+        if os.path.exists(mapping_path):
+            # mapping.json wins over the bundle's copy, so edits to it take effect without a rebuild
+            with open(mapping_path, 'r', encoding='utf-8') as f:
+                mapping = json.load(f)
+            print(f"{CHECK} mapping.json loaded successfully")
+        elif bundle_mapping is not None:
+            mapping = bundle_mapping
+            print(f"{CHECK} Mapping loaded from {BUNDLE_FILE}")
+        elif os.path.exists(disease_info_path):
+            with open(disease_info_path, 'r', encoding='utf-8') as f:
+                mapping = json.load(f)
+            print(f"{CHECK} disease_info.json loaded successfully (fallback)")
+        else:
+            raise FileNotFoundError("Neither mapping.json nor disease_info.json found")
+            
+        # Verify model has classes_ attribute
+        if not hasattr(model, 'classes_'):
+            raise ValueError("Model does not have 'classes_' attribute")
+        print(f"{CHECK} Model has {len(model.classes_)} disease classes")
+
+        # Training data, for the demographic priors and symptom suggestions (optional)
+        dataset_rows = None
+        for dataset_path in (os.path.join(model_dir, DATASET_FILE),
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), DATASET_FILE)):
+            if os.path.exists(dataset_path):
+                try:
+                    dataset_rows = read_dataset(dataset_path)
+                except Exception as e:
+                    print(f"{WARN} Warning: Could not read {DATASET_FILE}: {e}")
+                    print("  The dataset is optional, continuing without demographic priors...")
+                break
+
+        # Synonym dictionary, reloaded with the model (optional)
+        synonyms = None
+        for synonyms_path in (os.path.join(model_dir, SYNONYMS_FILE),
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), SYNONYMS_FILE)):
+            if os.path.exists(synonyms_path):
+                try:
+                    synonyms = read_synonyms(synonyms_path)
+                except Exception as e:
+                    print(f"{WARN} Warning: Could not read {SYNONYMS_FILE}: {e}")
+                    print("  The synonym dictionary is optional, continuing without phrase rewriting...")
+                break
+
+        # Common English words the spelling corrector must not rewrite
+        known_words = None
+        try:
+            known_words = read_word_list(COMMON_WORDS_FILE)
+        except Exception as e:
+            print(f"{WARN} Warning: Could not read {os.path.basename(COMMON_WORDS_FILE)}: {e}")
+            print("  Continuing without it; spelling correction will also rewrite common words...")
+
+        snapshot = ModelSnapshot(model, tfidf, label_encoder, mapping, version, source, dataset_rows, engine,
+                                 synonyms, known_words)
+        print(f"{CHECK} Result table built for {len(snapshot.class_names)} disease classes")
+        if snapshot.priors is not None:
+            print(f"{CHECK} Demographic priors built from {snapshot.priors.rows} dataset rows")
+        if snapshot.case_index is not None:
+            print(f"{CHECK} Case index built with {len(snapshot.case_index)} dataset rows")
+        if snapshot.rewriter is not None:
+            print(f"{CHECK} Synonym dictionary compiled with {len(snapshot.rewriter.replacements)} phrases")
+        return snapshot
+            
+    except FileNotFoundError as e:
+        print(f"{CROSS} Error loading files: {e}")
+        print(f"Model directory: {model_dir}")
+        print(f"Files in directory: {os.listdir(model_dir)}")
+        raise
+    except Exception as e:
+        print(f"{CROSS} Error loading resources: {e}")
+        print(f"Error type: {type(e).__name__}")
+        raise
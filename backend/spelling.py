@@ -0,0 +1,178 @@
+"""
+Typo-tolerant symptom normalization
+
+Tokens outside the model vocabulary are dropped by the vectorizer, so a
+misspelled symptom ("hedache", "nausia") contributes nothing to the
+prediction. The corrector maps such tokens back to vocabulary terms before
+vectorization.
+
+Candidates come from a precomputed deletion index (the SymSpell approach):
+every vocabulary term is stored under each string obtained by deleting up to
+max_distance characters from it. A token is looked up under its own deletions,
+which gives every term within that edit distance without scanning the
+vocabulary; the candidates are then ranked by true edit distance (adjacent
+transpositions count as one edit) and by how common the term is. The index
+is built on the first lookup, and a term is only stored under as many
+deletions as the minimum token lengths make reachable: terms shorter than
+MIN_LENGTH_BY_DISTANCE[2] never need their distance-2 deletions.
+
+Only tokens that are not real words are corrected: a common English word
+("rough", "night", "sure") is one edit away from plenty of symptom terms
+("cough", "light", "sore") but is not a typo of any of them. Tokens found in
+the common word list (common_words.txt) are left as they are.
+"""
+
+import os
+import re
+import threading
+from itertools import combinations
+
+# Vectorizer default, used when the vectorizer does not expose its pattern
+DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+# Shortest token corrected at each distance (short words are too ambiguous)
+MIN_LENGTH_BY_DISTANCE = {1: 6, 2: 8}
+
+# Words never treated as misspellings, shipped next to this file
+COMMON_WORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'common_words.txt')
+
+# Corrected tokens remembered per corrector (the memo is emptied when full)
+MEMO_SIZE = 10000
+
+def read_word_list(path):
+    """Read a word list (one word per line, # comments) as a set of lowercase words"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.strip().lower() for line in f if line.strip() and not line.startswith('#')}
+
+def deletions(word, max_distance):
+    """Every string obtained by deleting up to max_distance characters from word, word included"""
+    variants = {word}
+    for distance in range(1, min(max_distance, len(word) - 1) + 1):
+        for positions in combinations(range(len(word)), distance):
+            variants.add(''.join(ch for i, ch in enumerate(word) if i not in positions))
+    return variants
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+class SpellingCorrector:
+    """Deletion index over a vocabulary, with term frequencies for ranking"""
+
+    def __init__(self, vocabulary, analyzer, token_pattern=DEFAULT_TOKEN_PATTERN, frequencies=None, max_distance=2,
+                 known_words=None):
+        self.vocabulary = vocabulary
+        self.analyzer = analyzer
+        self.token_pattern = re.compile(token_pattern)
+        self.frequencies = frequencies or {}
+        # Real words that are never corrected, however close they are to a vocabulary term
+        self.known_words = frozenset(known_words or ())
+        self.max_distance = max_distance
+        self._memo = {}
+        # The deletion index is built on first use: most snapshots never correct anything
+        self.index = None
+        self._index_lock = threading.Lock()
+
+    def index_depth(self, length):
+        """
+        How many deletions of a term of this length the index needs
+
+        A token is only corrected at distance d when it has at least
+        MIN_LENGTH_BY_DISTANCE[d] characters, so a shorter term can be reached
+        with fewer deletions of its own (the token's deletions make up the rest).
+        """
+        return max((min(distance, length - minimum + distance)
+                    for distance, minimum in MIN_LENGTH_BY_DISTANCE.items() if distance <= self.max_distance),
+                   default=0)
+
+    def build_index(self):
+        """Build the deletion index now (once; later calls return the same index)"""
+        if self.index is not None:
+            return self.index
+        with self._index_lock:
+            if self.index is None:
+                index = {}
+                for term in self.vocabulary:
+                    # Only single-word terms can be the correction of a single token
+                    if ' ' in term:
+                        continue
+                    for variant in deletions(term, max(0, self.index_depth(len(term)))):
+                        index.setdefault(variant, []).append(term)
+                self.index = index
+        return self.index
+
+    def correct_token(self, token):
+        """The best vocabulary term for an out-of-vocabulary token, or None"""
+        if token in self.known_words:
+            return None
+        if token in self._memo:
+            return self._memo[token]
+        term = self._lookup(token)
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[token] = term
+        return term
+
+    def _lookup(self, token):
+        """Search the deletion index for the closest, most frequent term"""
+        limit = max((distance for distance, length in MIN_LENGTH_BY_DISTANCE.items()
+                     if len(token) >= length and distance <= self.max_distance), default=0)
+        if limit == 0:
+            return None
+        index = self.build_index()
+        best = None
+        seen = set()
+        for variant in deletions(token, limit):
+            for term in index.get(variant, ()):
+                if term in seen:
+                    continue
+                seen.add(term)
+                distance = edit_distance(token, term, limit)
+                if distance > limit:
+                    continue
+                # Closest first, then most frequent, then alphabetical
+                rank = (distance, -self.frequencies.get(term, 0), term)
+                if best is None or rank < best:
+                    best = rank
+        return best[2] if best else None
+
+    def correct(self, text):
+        """
+        Replace out-of-vocabulary tokens of text with their corrections
+
+        Returns (corrected_text, corrections) where corrections lists
+        {"from": token, "to": term} in text order. Stop words, known words
+        and tokens the vectorizer would keep as they are never change.
+        """
+        corrections = []
+
+        def replace(match):
+            token = match.group(0)
+            if token.lower() in self.vocabulary:
+                return token
+            # The analyzer applies the vectorizer's own lowercasing, accents and stop words
+            terms = self.analyzer(token)
+            if len(terms) != 1 or terms[0] in self.vocabulary:
+                return token
+            term = self.correct_token(terms[0])
+            if term is None:
+                return token
+            corrections.append({"from": token, "to": term})
+            return term
+
+        corrected = self.token_pattern.sub(replace, text)
+        return corrected, corrections
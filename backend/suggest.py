@@ -0,0 +1,103 @@
+"""
+Prefix index for symptom autocomplete
+
+Suggestions come from the model's vocabulary and from the comma-separated
+symptom phrases of the training CSV ("body ache", "shortness of breath"). Every
+suggestion is indexed under each of its words, so "ach" finds both "ache" and
+"body ache". Whole phrases rank ahead of vocabulary terms that never appear as
+a phrase on their own ("shortness", "severe"), and each group is ordered by the
+number of texts it appears in.
+
+The keys live in one sorted list; a query is two binary searches for the key
+range that starts with the prefix, followed by a pick of the best ranked
+suggestions in that range. Prefixes of up to SHORT_PREFIX characters match a
+large share of the keys, so their best MAX_LIMIT suggestions are precomputed.
+"""
+
+import heapq
+from bisect import bisect_left
+
+# Default and maximum number of suggestions per query
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Prefixes this short get their suggestions precomputed
+SHORT_PREFIX = 2
+
+# Sorts after every character that can appear in a key
+_KEY_END = '\U0010ffff'
+
+def split_phrases(symptoms):
+    """Split a comma-separated symptom text into normalized phrases"""
+    phrases = []
+    for phrase in symptoms.split(','):
+        phrase = ' '.join(phrase.lower().split())
+        if phrase:
+            phrases.append(phrase)
+    return phrases
+
+class SuggestIndex:
+    """Sorted array of (key, suggestion) pairs with per-suggestion frequencies"""
+
+    def __init__(self, frequencies, phrases=()):
+        # Suggestions in rank order: phrases before bare vocabulary terms, then most frequent, then alphabetical
+        phrases = set(phrases)
+        self.suggestions = sorted(frequencies, key=lambda text: (text not in phrases, -frequencies[text], text))
+        # Shared with the spelling corrector, which ranks candidate terms by it
+        self.frequency = frequencies
+
+        entries = set()
+        for rank, text in enumerate(self.suggestions):
+            words = text.split(' ')
+            for start in range(len(words)):
+                entries.add((' '.join(words[start:]), rank))
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        self.ranks = [rank for _, rank in entries]
+
+        short = {}
+        for key, rank in entries:
+            for length in range(1, min(len(key), SHORT_PREFIX) + 1):
+                short.setdefault(key[:length], set()).add(rank)
+        self.short = {prefix: heapq.nsmallest(MAX_LIMIT, ranks) for prefix, ranks in short.items()}
+
+    @classmethod
+    def build(cls, vocabulary, symptom_texts, analyzer):
+        """
+        Index the vocabulary terms and the distinct phrases of symptom_texts
+
+        Every suggestion counts the texts it appears in, once per text
+        whether it is found as a phrase, as a vocabulary term or both.
+        """
+        frequencies = dict.fromkeys(vocabulary, 0)
+        phrases = set()
+        for text in symptom_texts:
+            text_phrases = split_phrases(text)
+            phrases.update(text_phrases)
+            found = set(text_phrases)
+            found.update(term for term in analyzer(text) if term in vocabulary)
+            for suggestion in found:
+                frequencies[suggestion] = frequencies.get(suggestion, 0) + 1
+        return cls(frequencies, phrases)
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT):
+        """
+        The limit best ranked suggestions with a word starting with prefix
+
+        Only the text after the last comma is matched, so the whole input
+        field ("fever, hea") can be sent as it is typed.
+        """
+        prefix = ' '.join(prefix.rsplit(',', 1)[-1].lower().split())
+        if not prefix:
+            return []
+        if len(prefix) <= SHORT_PREFIX and limit <= MAX_LIMIT:
+            ranks = self.short.get(prefix, [])[:limit]
+        else:
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix + _KEY_END, start)
+            # Lower rank is better; a suggestion can match through several of its words
+            ranks = heapq.nsmallest(limit, set(self.ranks[start:end]))
+        return [self.suggestions[rank] for rank in ranks]
+
+    def __len__(self):
+        return len(self.suggestions)
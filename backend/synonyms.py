@@ -0,0 +1,150 @@
+"""
+Layman phrase rewriting
+
+Patients write "tummy ache" or "throwing up" where the model's vocabulary,
+learned from the dataset CSV, has "abdominal pain" and "vomiting". A synonym
+dictionary (synonyms.json next to the model: {"canonical term": ["phrase",
+...]}) maps such phrases to canonical symptom terms, and SynonymRewriter
+replaces them in the input before it is vectorized.
+
+All phrases are compiled into one Aho-Corasick automaton, a trie whose nodes
+also carry failure links, so a text is scanned in a single pass over its
+characters however many phrases the dictionary holds. Only whole-word matches
+count, and overlapping matches resolve to the leftmost, then longest, phrase.
+"""
+
+import json
+
+# Typographic apostrophes are folded to ASCII ones before matching ("can’t" -> "can't")
+_APOSTROPHES = str.maketrans({'’': "'", '‘': "'"})
+
+def normalize_phrase(phrase):
+    """Lowercase, fold apostrophes and collapse whitespace, as matching does"""
+    return ' '.join(phrase.lower().translate(_APOSTROPHES).split())
+
+def read_synonyms(path):
+    """Read and validate a {canonical: [phrases]} synonym dictionary"""
+    with open(path, 'r', encoding='utf-8') as f:
+        synonyms = json.load(f)
+    if not isinstance(synonyms, dict):
+        raise ValueError("the synonym dictionary must be a JSON object")
+    for canonical, phrases in synonyms.items():
+        if not isinstance(phrases, list) or not all(isinstance(phrase, str) for phrase in phrases):
+            raise ValueError(f"synonyms of {canonical!r} must be a list of strings")
+    return synonyms
+
+class PhraseMatcher:
+    """Aho-Corasick automaton finding every occurrence of a set of phrases in one pass"""
+
+    def __init__(self, phrases):
+        # Node 0 is the root; goto[node] maps a character to the child node
+        self.goto = [{}]
+        self.fail = [0]
+        # Lengths of the phrases ending at each node, including those reached through failure links
+        self.outputs = [()]
+        for phrase in phrases:
+            node = 0
+            for char in phrase:
+                child = self.goto[node].get(char)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto[node][char] = child
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append(())
+                node = child
+            if len(phrase) not in self.outputs[node]:
+                self.outputs[node] += (len(phrase),)
+
+        # Breadth-first, so every node's failure target is finished before its children need it
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                target = self.fail[node]
+                while target and char not in self.goto[target]:
+                    target = self.fail[target]
+                fallback = self.goto[target].get(char, 0)
+                self.fail[child] = fallback if fallback != child else 0
+                self.outputs[child] += self.outputs[self.fail[child]]
+                queue.append(child)
+
+    def __len__(self):
+        return len(self.goto)
+
+    def find(self, text):
+        """(start, end) of every phrase occurrence in text, in order of end position"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        matches = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length in outputs[node]:
+                matches.append((position + 1 - length, position + 1))
+        return matches
+
+class SynonymRewriter:
+    """Rewrites dictionary phrases to their canonical symptom terms"""
+
+    def __init__(self, synonyms):
+        self.replacements = {}
+        # Sorted, so a phrase listed under two canonical terms maps to the same one on every load
+        for canonical in sorted(synonyms):
+            target = ' '.join(canonical.split())
+            for phrase in synonyms[canonical]:
+                phrase = normalize_phrase(phrase)
+                if phrase and phrase != target.lower():
+                    self.replacements.setdefault(phrase, target)
+        self.canonical_terms = len(set(self.replacements.values()))
+        self.matcher = PhraseMatcher(self.replacements)
+
+    def rewrite(self, text):
+        """
+        Replace dictionary phrases in text with their canonical terms
+
+        Returns (text, rewrites) where rewrites lists {"from": phrase as
+        written, "to": canonical term} in text order.
+        """
+        original = text
+        folded = text.lower().translate(_APOSTROPHES)
+        if len(folded) != len(text):
+            # Lowercasing changed the length (rare Unicode cases); rewrite the folded text instead
+            text = folded
+        # Collapse whitespace runs so "throwing   up" matches "throwing up"
+        collapsed = ' '.join(folded.split())
+        if collapsed != folded:
+            text = ' '.join(text.split())
+            folded = collapsed
+
+        candidates = []
+        for start, end in self.matcher.find(folded):
+            # Whole words only: "pee a lot" must not match inside "toupee a lot"
+            if (start == 0 or not folded[start - 1].isalnum()) and (end == len(folded) or not folded[end].isalnum()):
+                candidates.append((start, -end, end))
+        if not candidates:
+            return original, []
+
+        # Leftmost first, then longest; skip anything overlapping an accepted match
+        candidates.sort()
+        pieces = []
+        rewrites = []
+        position = 0
+        for start, _, end in candidates:
+            if start < position:
+                continue
+            target = self.replacements[folded[start:end]]
+            pieces.append(text[position:start])
+            pieces.append(target)
+            rewrites.append({"from": text[start:end], "to": target})
+            position = end
+        pieces.append(text[position:])
+        return ''.join(pieces), rewrites
+
+    def info(self):
+        """Dictionary size for /health"""
+        return {
+            "phrases": len(self.replacements),
+            "canonical_terms": self.canonical_terms,
+            "automaton_states": len(self.matcher)
+        }
@@ -0,0 +1,88 @@
+"""AdmissionController and TokenBucketLimiter, directly and through the 503/429 responses"""
+
+import threading
+import time
+
+from admission import AdmissionController, TokenBucketLimiter
+
+def test_queue_overflow_is_rejected_at_once():
+    """With every slot busy and the queue full, acquire fails without waiting"""
+    controller = AdmissionController(1, queue_size=0, queue_timeout=10)
+    assert controller.acquire()
+    started = time.monotonic()
+    assert not controller.acquire()
+    assert time.monotonic() - started < 1
+    assert controller.stats()['rejected'] == 1
+    assert controller.stats()['timed_out'] == 0
+
+def test_queued_request_times_out():
+    """A queued request gives up after queue_timeout"""
+    controller = AdmissionController(1, queue_size=1, queue_timeout=0.05)
+    assert controller.acquire()
+    started = time.monotonic()
+    assert not controller.acquire()
+    assert time.monotonic() - started >= 0.05
+    stats = controller.stats()
+    assert (stats['queued'], stats['timed_out'], stats['rejected'], stats['waiting']) == (1, 1, 1, 0)
+
+def test_release_admits_a_waiter():
+    """Releasing a slot hands it to a queued request"""
+    controller = AdmissionController(1, queue_size=1, queue_timeout=10)
+    assert controller.acquire()
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(controller.acquire()))
+    waiter.start()
+    while controller.stats()['waiting'] == 0:
+        time.sleep(0.001)
+    controller.release()
+    waiter.join(timeout=5)
+    assert result == [True]
+    assert controller.stats()['in_flight'] == 1
+
+def test_token_bucket(clock):
+    """A client gets burst requests at once, then one per 1/rate seconds"""
+    limiter = TokenBucketLimiter(rate=0.5, burst=2, clock=clock)
+    assert limiter.allow('a') == (True, 0)
+    assert limiter.allow('a') == (True, 0)
+    assert limiter.allow('a') == (False, 2)
+    # Buckets are per client
+    assert limiter.allow('b') == (True, 0)
+    clock.now += 1
+    assert limiter.allow('a') == (False, 1)
+    clock.now += 1
+    assert limiter.allow('a') == (True, 0)
+    assert limiter.stats()['limited'] == 2
+
+def test_overloaded_requests_get_503(server, client, monkeypatch):
+    """A full queue, or a queue wait that runs out, answers 503 with Retry-After"""
+    for queue_size, queue_timeout in ((0, 10), (1, 0.01)):
+        controller = AdmissionController(1, queue_size=queue_size, queue_timeout=queue_timeout)
+        monkeypatch.setattr(server, 'admission_controller', controller)
+        controller.acquire()
+        response = client.post('/predict', json={"symptoms": "fever"})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(server.config.ADMISSION_RETRY_AFTER)
+        assert response.get_json()['retry_after'] == server.config.ADMISSION_RETRY_AFTER
+        # Endpoints outside admission control are not affected
+        assert client.get('/livez').status_code == 200
+
+def test_rate_limited_requests_get_429(server, client, clock, monkeypatch):
+    """A client over its rate gets 429 with the seconds until its next token"""
+    monkeypatch.setattr(server, 'rate_limiter', TokenBucketLimiter(rate=0.25, burst=1, clock=clock))
+    assert client.post('/predict', json={"symptoms": "fever"}).status_code == 200
+    response = client.post('/predict', json={"symptoms": "fever"})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '4'
+    clock.now += 4
+    assert client.post('/predict', json={"symptoms": "fever"}).status_code == 200
+
+def test_slot_is_released_in_teardown(server, client, monkeypatch):
+    """The admission slot is freed whether the request succeeded or failed"""
+    controller = AdmissionController(1, queue_size=0)
+    monkeypatch.setattr(server, 'admission_controller', controller)
+    assert client.post('/predict', json={"symptoms": "fever"}).status_code == 200
+    assert controller.stats()['in_flight'] == 0
+    assert client.post('/predict', json={"symptoms": ""}).status_code == 400
+    assert client.post('/predict/batch', json={"records": "not a list"}).status_code == 400
+    assert controller.stats()['in_flight'] == 0
+    assert controller.stats()['admitted'] == 3
@@ -0,0 +1,82 @@
+"""Sketch error bounds against exact counts, drift measures on known distributions, and /stats"""
+
+import math
+import random
+from collections import Counter
+
+from analytics import CountMinSketch, HyperLogLog, SpaceSaving, TrafficAnalytics, distribution_drift
+
+def zipf_stream(n, distinct, seed=0):
+    """n items drawn from distinct items with Zipf-like frequencies"""
+    rng = random.Random(seed)
+    items = [f"token{i}" for i in range(distinct)]
+    return rng.choices(items, weights=[1 / (i + 1) for i in range(distinct)], k=n)
+
+def test_count_min_error_bound():
+    """Estimates never undercount, and nearly all stay within e * n / width of the true count"""
+    stream = zipf_stream(20000, 2000)
+    exact = Counter(stream)
+    sketch = CountMinSketch(width=512, depth=4)
+    for item in stream:
+        sketch.add(item)
+    bound = math.e * len(stream) / sketch.width
+    errors = [sketch.estimate(item) - count for item, count in exact.items()]
+    assert min(errors) >= 0
+    # The bound holds for each item with probability 1 - e^-depth
+    assert sum(error > bound for error in errors) <= 0.05 * len(errors)
+    assert sketch.estimate("never added") <= bound
+
+def test_space_saving_error_bound():
+    """Every kept count is within its error of the truth, and every item above n / capacity is kept"""
+    stream = zipf_stream(20000, 2000, seed=1)
+    exact = Counter(stream)
+    table = SpaceSaving(capacity=50)
+    for item in stream:
+        table.add(item)
+    top = table.top(50)
+    for item, count, error in top:
+        assert count - error <= exact[item] <= count, item
+    kept = {item for item, _, _ in top}
+    assert {item for item, count in exact.items() if count > len(stream) / table.capacity} <= kept
+    assert [item for item, _, _ in top[:3]] == [item for item, _ in exact.most_common(3)]
+
+def test_hyperloglog_within_tolerance():
+    """Distinct counts are within a few standard errors (1.04 / sqrt(registers)) of the exact count"""
+    for distinct in (50, 1000, 20000):
+        hll = HyperLogLog(precision=12)
+        for i in range(distinct):
+            # Repeats must not change the estimate
+            hll.add(f"input {i}")
+            hll.add(f"input {i}")
+        tolerance = 4 * 1.04 / math.sqrt(hll.size)
+        assert abs(hll.estimate() - distinct) <= max(1, tolerance * distinct), distinct
+
+def test_drift_on_known_distributions():
+    """TVD and PSI match their definitions, are zero for equal shares and finite for disjoint ones"""
+    assert distribution_drift({"a": 0.5, "b": 0.5}, {"a": 0.5, "b": 0.5}) == {"total_variation": 0.0, "psi": 0.0}
+
+    drift = distribution_drift({"a": 0.5, "b": 0.5}, {"a": 0.25, "b": 0.75})
+    assert drift["total_variation"] == 0.25
+    assert drift["psi"] == round(0.25 * math.log(2) + 0.25 * math.log(1.5), 4)
+
+    disjoint = distribution_drift({"a": 1.0}, {"b": 1.0})
+    assert disjoint["total_variation"] == 1.0
+    assert disjoint["psi"] == round(2 * (1 - 1e-4) * math.log(1 / 1e-4), 4)
+
+def test_stats_endpoint(server, client, monkeypatch):
+    """Predictions feed /stats; with analytics disabled it answers 404"""
+    monkeypatch.setattr(server, 'traffic_analytics', TrafficAnalytics(snapshot_interval=0))
+    for symptoms in ("fever, cough", "fever, cough", "xyz qwerty"):
+        assert client.post('/predict', json={"symptoms": symptoms}).status_code == 200
+
+    stats = client.get('/stats?token=Fever').get_json()
+    assert stats["inputs"] == 3
+    assert stats["distinct_inputs_estimate"] == 2
+    assert stats["out_of_vocabulary_inputs"] == 1
+    assert sum(stats["predicted"].values()) == 3
+    assert stats["token"] == {"token": "Fever", "count": 2}
+    assert stats["drift"] is not None and 0 <= stats["drift"]["total_variation"] <= 1
+    assert {"token": "fever", "count": 2, "max_overcount": 0, "in_vocabulary": True} in stats["top_tokens"]
+
+    monkeypatch.setattr(server, 'traffic_analytics', None)
+    assert client.get('/stats').status_code == 404
@@ -0,0 +1,73 @@
+"""AuditLog rotation, drops on a full queue, and flushing on close"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from audit import AuditLog
+
+CLASS_NAMES = ['Flu', 'Cold', 'Migraine']
+PROBABILITIES = np.array([0.2, 0.7, 0.1])
+
+def record(log, symptoms="fever"):
+    log.record('/predict', 'v1', symptoms, 30, 'female', PROBABILITIES, CLASS_NAMES, 2, 0.0015)
+
+def audit_lines(directory):
+    """Every JSON line in every audit file of directory"""
+    lines = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), encoding='utf-8') as f:
+            lines += [json.loads(line) for line in f]
+    return lines
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert condition()
+
+def test_rotates_by_size(tmp_path):
+    """A file that reached max_bytes is renamed before the next write"""
+    log = AuditLog(str(tmp_path), max_bytes=1, max_age=0, flush_interval=0.01)
+    for i in range(3):
+        record(log, f"text {i}")
+        wait_for(lambda: log.written == i + 1)
+    log.close()
+
+    files = sorted(os.listdir(tmp_path))
+    assert log.stats()['rotations'] == 2
+    assert len(files) == 3 and f'audit-{os.getpid()}.jsonl' in files
+    assert sorted(line['symptoms'] for line in audit_lines(tmp_path)) == ['text 0', 'text 1', 'text 2']
+
+def test_full_queue_drops_and_counts(tmp_path):
+    """While the writer is stuck, records beyond the queue size are dropped without blocking"""
+    log = AuditLog(str(tmp_path), queue_size=2, flush_interval=0.01)
+    record(log)
+    wait_for(lambda: log.written == 1)
+    with log._write_lock:
+        # The writer can take at most one record off the queue before it waits for the lock
+        started = time.monotonic()
+        for _ in range(5):
+            record(log)
+        assert time.monotonic() - started < 1
+        assert log.dropped in (2, 3)
+    log.close()
+    assert log.written + log.dropped == 6
+    assert len(audit_lines(tmp_path)) == log.written
+
+def test_close_flushes_queued_records(tmp_path):
+    """Records still queued when the log is closed are written, and the file is closed"""
+    log = AuditLog(str(tmp_path), flush_interval=60)
+    with log._write_lock:
+        for i in range(3):
+            record(log, f"text {i}")
+    log.close()
+    assert log._file is None
+
+    # The writer thread may have taken the first record, so the order is not fixed
+    lines = sorted(audit_lines(tmp_path), key=lambda line: line['symptoms'])
+    assert [line['symptoms'] for line in lines] == ['text 0', 'text 1', 'text 2']
+    assert lines[0]['results'] == [['Cold', 0.7], ['Flu', 0.2]]
+    assert (lines[0]['model'], lines[0]['age'], lines[0]['latency_ms']) == ('v1', 30, 1.5)
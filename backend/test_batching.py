@@ -0,0 +1,71 @@
+"""MicroBatcher flush triggers, per-snapshot grouping and row hand-back"""
+
+import threading
+import time
+
+from batching import MicroBatcher
+
+class RecordingScorer:
+    """score(current, texts) that records each call and answers "<snapshot>:<text>" per text"""
+
+    def __init__(self, fail_for=None):
+        self.calls = []
+        self.fail_for = fail_for
+        self.lock = threading.Lock()
+
+    def __call__(self, current, texts):
+        with self.lock:
+            self.calls.append((current, list(texts)))
+        if current == self.fail_for:
+            raise RuntimeError(f"{current} is broken")
+        return [f"{current}:{text}" for text in texts]
+
+def test_flushes_at_max_batch_size():
+    """A full batch is scored at once, long before max_wait runs out"""
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=3, max_wait=30)
+    started = time.monotonic()
+    futures = [batcher.submit('a', text) for text in ('x', 'y', 'z')]
+    assert [future.result(timeout=5) for future in futures] == ['a:x', 'a:y', 'a:z']
+    assert time.monotonic() - started < 5
+    assert scorer.calls == [('a', ['x', 'y', 'z'])]
+
+def test_flushes_after_max_wait():
+    """A batch that never fills is scored max_wait after its first item arrived"""
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=100, max_wait=0.05)
+    started = time.perf_counter()
+    futures = [batcher.submit('a', text) for text in ('x', 'y')]
+    assert [future.result(timeout=5) for future in futures] == ['a:x', 'a:y']
+    assert time.perf_counter() - started >= 0.05
+    assert scorer.calls == [('a', ['x', 'y'])]
+
+def test_groups_by_snapshot_and_returns_each_row():
+    """Items of different snapshots in one batch are scored separately, and each caller gets its own row"""
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=4, max_wait=30)
+    futures = [batcher.submit(current, text) for current, text in (('a', 'w'), ('b', 'x'), ('a', 'y'), ('b', 'z'))]
+    assert [future.result(timeout=5) for future in futures] == ['a:w', 'b:x', 'a:y', 'b:z']
+    assert sorted(scorer.calls) == [('a', ['w', 'y']), ('b', ['x', 'z'])]
+
+def test_failure_reaches_only_its_group():
+    """A snapshot whose scoring raises fails its own callers; the other snapshot's callers get rows"""
+    scorer = RecordingScorer(fail_for='b')
+    batcher = MicroBatcher(scorer, max_batch_size=2, max_wait=30)
+    good, bad = batcher.submit('a', 'x'), batcher.submit('b', 'y')
+    assert good.result(timeout=5) == 'a:x'
+    assert isinstance(bad.exception(timeout=5), RuntimeError)
+
+def test_concurrent_predict_calls_share_a_batch():
+    """Threads calling predict at once are coalesced into one score call"""
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=8, max_wait=30)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.predict('a', str(i), timeout=5)))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: f'a:{i}' for i in range(8)}
+    assert len(scorer.calls) == 1 and sorted(scorer.calls[0][1]) == [str(i) for i in range(8)]
@@ -0,0 +1,64 @@
+"""PredictionCache eviction, expiry and counters, and canonical cache keys"""
+
+from cache import PredictionCache, canonical_key
+
+def test_lru_eviction_order(clock):
+    """The least recently used entry goes first, and a get counts as a use"""
+    cache = PredictionCache(max_size=3, ttl=60, clock=clock)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'
+
+    cache.put('d', 'D')
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in ('a', 'c', 'd')] == ['A', 'C', 'D']
+
+    cache.put('e', 'E')
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 2
+    assert cache.stats()['size'] == 3
+
+def test_ttl_expiry(clock):
+    """Entries expire ttl seconds after they were stored, not after they were last read"""
+    cache = PredictionCache(max_size=10, ttl=5, clock=clock)
+    cache.put('a', 1)
+    clock.now += 4.9
+    assert cache.get('a') == 1
+    clock.now += 0.1
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['size'] == 0
+
+    # Storing again restarts the entry's lifetime
+    cache.put('a', 2)
+    clock.now += 4.9
+    assert cache.get('a') == 2
+
+def test_counters(clock):
+    """hits, misses, evictions, expirations and invalidations are counted separately"""
+    cache = PredictionCache(max_size=1, ttl=5, clock=clock)
+    cache.get('a')
+    cache.put('a', 1)
+    cache.get('a')
+    cache.put('b', 2)
+    cache.get('a')
+    clock.now += 5
+    cache.get('b')
+    cache.clear()
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['expirations'], stats['invalidations']) == \
+        (1, 3, 1, 1, 1)
+    assert stats['hit_rate'] == 0.25
+
+def test_canonical_key(pickles):
+    """Reordering, case and punctuation share a key; repeated terms do not"""
+    tfidf = pickles[1]
+    analyzer = tfidf.build_analyzer()
+
+    def key(text):
+        return canonical_key(analyzer, tfidf.vocabulary_, text)
+
+    assert key("Fever, headache") == key("headache fever")
+    assert key("headache fever not-a-term") == key("headache fever")
+    assert key("fever fever") != key("fever")
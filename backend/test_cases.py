@@ -0,0 +1,45 @@
+"""Similar-case rankings against brute-force cosine similarity, and their tie order"""
+
+import numpy as np
+
+from cases import CaseIndex, vectorize_rows
+from engine import compile_artifacts, CompiledEngine
+
+def test_case_index_matches_brute_force(pickles, texts):
+    """Similar-case rankings agree with cosine similarity over the dense case matrix"""
+    model, tfidf, label_encoder = pickles
+    engine = CompiledEngine(*compile_artifacts(tfidf, model, label_encoder))
+    index = CaseIndex.build(engine.vectorizer, [{"symptoms": text, "disease": "x"} for text in texts])
+
+    cases = tfidf.transform(texts).toarray()
+    norms = np.linalg.norm(cases, axis=1)
+    cases[norms > 0] /= norms[norms > 0, np.newaxis]
+    for text in texts[:50]:
+        (indices, values), = vectorize_rows(engine.vectorizer, [text])
+        expected = cases @ tfidf.transform([text]).toarray()[0]
+        found = index.query(indices, values, 5)
+        best = sorted(expected[expected > 0], reverse=True)[:5]
+        assert np.allclose([similarity for _, similarity in found], best, atol=1e-6)
+        assert all(np.isclose(expected[case], similarity, atol=1e-6) for case, similarity in found)
+
+def test_ties_go_to_the_earlier_case(pickles):
+    """Cases with equal similarity are ranked, and cut off, in case order"""
+    model, tfidf, label_encoder = pickles
+    engine = CompiledEngine(*compile_artifacts(tfidf, model, label_encoder))
+    # Cases 1, 3, 4, 6 and 8 are identical, so they tie for every query
+    texts = ["cough", "fever headache", "cough", "fever headache", "fever headache", "nausea",
+             "fever headache", "fever", "fever headache"]
+    index = CaseIndex.build(engine.vectorizer, [{"symptoms": text, "disease": "x"} for text in texts])
+    (indices, values), = vectorize_rows(engine.vectorizer, ["fever headache"])
+    for n in range(1, 8):
+        found = index.query(indices, values, n)
+        assert [case for case, _ in found] == [1, 3, 4, 6, 8, 7][:n], n
+
+    # Every cut-off agrees with a full sort by (-similarity, case)
+    for text in ["fever", "fever cough", "headache nausea"]:
+        (indices, values), = vectorize_rows(engine.vectorizer, [text])
+        everything = index.query(indices, values, len(texts))
+        reference = sorted(everything, key=lambda found: (-found[1], found[0]))
+        assert everything == reference
+        for n in range(1, len(everything)):
+            assert index.query(indices, values, n) == reference[:n], (text, n)
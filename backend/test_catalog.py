@@ -0,0 +1,17 @@
+"""ETags and revalidation of the precomputed /diseases bodies"""
+
+import gzip
+
+def test_each_encoding_has_its_own_etag(client):
+    """gzip and identity bodies differ in bytes, so they must not share a strong ETag"""
+    gzipped = client.get('/diseases', headers={'Accept-Encoding': 'gzip'})
+    plain = client.get('/diseases', headers={'Accept-Encoding': 'identity'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(gzipped.data) == plain.data
+    assert gzipped.headers['ETag'] != plain.headers['ETag']
+
+    for encoding, etag, other in (('gzip', gzipped.headers['ETag'], plain.headers['ETag']),
+                                  ('identity', plain.headers['ETag'], gzipped.headers['ETag'])):
+        assert client.get('/diseases', headers={'Accept-Encoding': encoding, 'If-None-Match': etag}).status_code == 304
+        assert client.get('/diseases', headers={'Accept-Encoding': encoding, 'If-None-Match': other}).status_code == 200
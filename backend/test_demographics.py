@@ -0,0 +1,66 @@
+"""Age buckets, gender normalization and the effect of demographic priors on probability rows"""
+
+import numpy as np
+
+from demographics import DemographicPriors, age_group, normalize_gender
+
+CLASSES = ['Chickenpox', 'Arthritis', 'Flu']
+
+# Chickenpox is a children's disease, arthritis a seniors' one, flu is everywhere
+ROWS = [('Chickenpox', 'child', 'any')] * 8 + [('Arthritis', 'senior', 'female')] * 8 + \
+    [('Flu', group, 'any') for group in ('child', 'teen', 'adult', 'senior')] * 2
+
+def test_age_bucket_boundaries():
+    """Each bound belongs to the older group"""
+    assert [age_group(age) for age in (0, 12, 12.9, 13, 19, 20, 59, 60, 149)] == \
+        ['child', 'child', 'child', 'teen', 'teen', 'adult', 'adult', 'senior', 'senior']
+    assert age_group("13") == 'teen'
+    assert age_group(" Adult ") == 'adult'
+    for invalid in (None, True, -1, 150, "old", [], float('nan')):
+        assert age_group(invalid) is None, invalid
+
+def test_gender_normalization():
+    """Known spellings map to female/male; anything else counts as unknown"""
+    assert [normalize_gender(value) for value in ("F", " woman ", "male", "boy")] == \
+        ['female', 'female', 'male', 'male']
+    for unknown in (None, "", "other", "any", 1):
+        assert normalize_gender(unknown) is None, unknown
+
+def test_lookup_falls_back_to_partial_cells():
+    """A missing or unknown gender uses the age-only cell; neither age nor gender is neutral"""
+    priors = DemographicPriors.from_rows(ROWS, CLASSES)
+    assert priors.lookup(8, None) == priors.cells[('child', None)]
+    assert priors.lookup(8, "other") == priors.cells[('child', None)]
+    assert priors.lookup(None, "f") == priors.cells[(None, 'female')]
+    assert priors.lookup(8, "girl") == priors.cells[('child', 'female')]
+    assert priors.lookup(None, None) == priors.neutral
+    assert priors.lookup("unknown", "unknown") == priors.neutral
+
+def test_prior_shifts_probabilities():
+    """A child's row moves toward chickenpox, a senior woman's toward arthritis; neutral rows do not move"""
+    priors = DemographicPriors.from_rows(ROWS, CLASSES)
+    uniform = np.full(3, 1 / 3)
+    child, senior, neutral = priors.apply([uniform] * 3, [priors.lookup(8, 'm'), priors.lookup(70, 'f'),
+                                                          priors.neutral])
+    assert np.allclose([child.sum(), senior.sum()], 1.0)
+    assert child.argmax() == 0 and child[0] > 1 / 3 and child[1] < 1 / 3
+    assert senior.argmax() == 1 and senior[1] > 1 / 3 and senior[0] < 1 / 3
+    assert np.array_equal(neutral, uniform)
+
+    # A class the model rules out stays ruled out
+    child_row = priors.apply([[0.0, 0.5, 0.5]], [priors.lookup(8, None)])[0]
+    assert child_row[0] == 0.0 and np.isclose(child_row.sum(), 1.0)
+
+def test_smoothing_limits_small_cells():
+    """The more pseudo-rows of the overall distribution, the less a cell moves the probabilities"""
+    uniform = [np.full(3, 1 / 3)]
+    shifts = []
+    for strength in (1.0, 10.0, 1000.0):
+        priors = DemographicPriors.from_rows(ROWS, CLASSES, strength=strength)
+        shifts.append(priors.apply(uniform, [priors.lookup(8, None)])[0][0] - 1 / 3)
+    assert shifts[0] > shifts[1] > shifts[2] > 0
+    assert shifts[2] < 0.01
+
+def test_no_matching_rows():
+    """Rows for unknown diseases or age groups give no table"""
+    assert DemographicPriors.from_rows([('Unknown', 'child', 'any'), ('Flu', 'infant', 'any')], CLASSES) is None
@@ -0,0 +1,113 @@
+"""Parity of engine.py and model.bundle with the pickled TfidfVectorizer + DecisionTreeClassifier"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pytest
+
+from bundle import write_bundle, load_bundle, BundleError
+from engine import compile_artifacts, CompiledEngine
+from explain import TreeExplainer
+from snapshot import load_snapshot
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def test_engine_matches_pickles(pickles, texts):
+    """Compiled transform and predict_proba match sklearn on every dataset row"""
+    model, tfidf, label_encoder = pickles
+    engine = CompiledEngine(*compile_artifacts(tfidf, model, label_encoder))
+
+    assert dict(engine.vectorizer.vocabulary_.items()) == tfidf.vocabulary_
+    assert 'not-a-symptom-term' not in engine.vectorizer.vocabulary_
+
+    expected_X = tfidf.transform(texts).toarray().astype(np.float32)
+    actual_X = engine.vectorizer.transform(texts)
+    assert np.array_equal(expected_X, actual_X)
+
+    expected = model.predict_proba(tfidf.transform(texts))
+    actual = engine.tree.predict_proba(actual_X)
+    assert np.array_equal(expected, actual)
+
+    assert np.array_equal(engine.tree.classes_, model.classes_)
+    assert list(engine.label_encoder.inverse_transform(model.classes_)) == \
+        list(label_encoder.inverse_transform(model.classes_))
+
+def test_bundle_roundtrip(pickles, texts):
+    """A written bundle memory-maps back to the same predictions and mapping"""
+    model, tfidf, label_encoder = pickles
+    arrays, meta = compile_artifacts(tfidf, model, label_encoder)
+    mapping = {"Influenza": {"severity": "Low"}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.bundle')
+        write_bundle(path, arrays, meta, mapping)
+        engine, bundle_mapping, header = load_bundle(path)
+
+        expected = model.predict_proba(tfidf.transform(texts))
+        actual = engine.tree.predict_proba(engine.vectorizer.transform(texts))
+        assert np.array_equal(expected, actual)
+        assert bundle_mapping == mapping
+        del engine
+
+def test_bundle_detects_corruption(pickles):
+    """Flipping a payload byte makes the checksum fail"""
+    model, tfidf, label_encoder = pickles
+    arrays, meta = compile_artifacts(tfidf, model, label_encoder)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.bundle')
+        write_bundle(path, arrays, meta, {})
+        with open(path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        with pytest.raises(BundleError):
+            load_bundle(path)
+
+def test_mapping_json_overrides_bundle(pickles):
+    """mapping.json next to a bundle is served instead of the embedded copy, and stale bundles are reported"""
+    model, tfidf, label_encoder = pickles
+    arrays, meta = compile_artifacts(tfidf, model, label_encoder)
+    edited = {"Influenza": {"severity": "Edited"}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = os.path.join(tmp, 'model.bundle')
+        write_bundle(bundle_path, arrays, meta, {"Influenza": {"severity": "Bundled"}})
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert load_snapshot(tmp).mapping == {"Influenza": {"severity": "Bundled"}}
+
+        with open(os.path.join(tmp, 'mapping.json'), 'w', encoding='utf-8') as f:
+            json.dump(edited, f)
+        shutil.copy(os.path.join(BASE_DIR, 'model.pkl'), os.path.join(tmp, 'model.pkl'))
+        bundle_mtime = os.path.getmtime(bundle_path)
+        os.utime(os.path.join(tmp, 'model.pkl'), (bundle_mtime + 10, bundle_mtime + 10))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            current = load_snapshot(tmp)
+        assert current.mapping == edited
+        assert b'"Edited"' in current.catalog.get("Influenza").body
+        assert "model.pkl newer than model.bundle" in output.getvalue()
+
+def test_explainer_follows_model_path(pickles, texts):
+    """The explained decision path ends in the leaf the tree itself reaches"""
+    model, tfidf, label_encoder = pickles
+    class_names = [str(name) for name in label_encoder.inverse_transform(model.classes_)]
+    engine = CompiledEngine(*compile_artifacts(tfidf, model, label_encoder))
+
+    for tree, vectorizer in ((model, tfidf), (engine.tree, engine.vectorizer)):
+        explainer = TreeExplainer.from_model(tree, vectorizer, class_names)
+        for text in texts:
+            explanation = explainer.explain(vectorizer, text)
+            assert explanation['leaf']['node'] == model.apply(tfidf.transform([text]))[0]
+            assert explanation['depth'] <= model.tree_.max_depth
+            # Terms that sent the path right, once each, in the order they were first tested
+            expected = []
+            for step in explanation['path']:
+                if ' > ' in step['condition'] and step['term'] not in expected:
+                    expected.append(step['term'])
+            assert explanation['matched_terms'] == expected
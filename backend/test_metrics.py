@@ -0,0 +1,35 @@
+"""The /metrics exposition after a prediction"""
+
+def samples(client):
+    """{sample name with labels: value} of every sample line in /metrics"""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    values = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values, response.get_data(as_text=True)
+
+def test_predict_is_counted_and_timed(client):
+    """One /predict adds one to its request counter and one observation to its latency histogram"""
+    before, _ = samples(client)
+    assert client.post('/predict', json={"symptoms": "fever, cough"}).status_code == 200
+    after, text = samples(client)
+
+    def delta(name):
+        return after[name] - before.get(name, 0.0)
+
+    assert '# TYPE symptomsense_requests_total counter' in text
+    assert '# TYPE symptomsense_request_seconds histogram' in text
+    assert delta('symptomsense_requests_total{endpoint="/predict",status="200"}') == 1
+    assert delta('symptomsense_request_seconds_count{endpoint="/predict"}') == 1
+    assert delta('symptomsense_request_seconds_bucket{endpoint="/predict",le="+Inf"}') == 1
+    assert delta('symptomsense_request_seconds_sum{endpoint="/predict"}') > 0
+    # Buckets are cumulative
+    buckets = [value for name, value in after.items()
+               if name.startswith('symptomsense_request_seconds_bucket{endpoint="/predict",')]
+    assert buckets == sorted(buckets)
+    for stage in ('parse', 'top_k', 'serialize'):
+        assert delta(f'symptomsense_stage_seconds_count{{stage="{stage}"}}') == 1, stage
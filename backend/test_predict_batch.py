@@ -0,0 +1,87 @@
+"""/predict/batch through the Flask test client, and score_file.py producing the same items"""
+
+import json
+
+import score_file
+
+def test_per_item_errors(client):
+    """Invalid records get their own error; valid ones are scored like /predict"""
+    response = client.post('/predict/batch', json={"records": [
+        "fever",
+        {"symptoms": "   "},
+        {"age": 30},
+        {"symptoms": 42},
+        {"symptoms": "fever headache"},
+    ]})
+    assert response.status_code == 200
+    items = response.get_json()["results"]
+    assert items[0] == {"error": "Record must be a JSON object", "index": 0}
+    assert items[1] == {"error": "Symptoms text cannot be empty", "index": 1}
+    assert items[2] == {"error": "Symptoms text is required", "index": 2}
+    assert items[3] == {"error": "Symptoms text is required", "index": 3}
+
+    single = client.post('/predict', json={"symptoms": "fever headache"}).get_json()
+    assert items[4] == {"index": 4, "results": single["results"]}
+
+def test_items_keep_input_order(client):
+    """Items come back in input order with their index, invalid records interleaved"""
+    records = [{"symptoms": "fever cough"}, None, {"symptoms": "chest pain"}, {"symptoms": ""},
+               {"symptoms": "nausea vomiting"}, [], {"symptoms": "fever cough"}]
+    items = client.post('/predict/batch', json={"records": records}).get_json()["results"]
+    assert [item["index"] for item in items] == list(range(len(records)))
+    assert ["error" in item for item in items] == [False, True, False, True, False, True, False]
+    for i in (0, 2, 4, 6):
+        expected = client.post('/predict', json=records[i]).get_json()["results"]
+        assert items[i]["results"] == expected
+
+def test_bare_list_body(client):
+    """A JSON array is accepted as the records, with default options"""
+    records = [{"symptoms": "fever headache"}, {"symptoms": "chest pain"}]
+    bare = client.post('/predict/batch', json=records)
+    wrapped = client.post('/predict/batch', json={"records": records})
+    assert bare.status_code == 200
+    assert bare.get_json() == wrapped.get_json()
+
+def test_malformed_json_is_a_client_error(client):
+    """A body that is not JSON gets 400 with a message, on both prediction endpoints"""
+    for path in ('/predict/batch', '/predict'):
+        for body in ('{"records": [', 'not json', ''):
+            response = client.post(path, data=body, content_type='application/json')
+            assert response.status_code == 400, (path, body)
+            assert response.get_json() == {"error": "Request body must be valid JSON"}
+
+def test_batch_size_limit(server, client):
+    """More than MAX_BATCH_SIZE records is rejected as a whole with 413"""
+    records = [{"symptoms": "fever"}] * (server.MAX_BATCH_SIZE + 1)
+    response = client.post('/predict/batch', json={"records": records})
+    assert response.status_code == 413
+    assert str(server.MAX_BATCH_SIZE) in response.get_json()["error"]
+
+    response = client.post('/predict/batch', json={"records": records[:server.MAX_BATCH_SIZE]})
+    assert response.status_code == 200
+    assert len(response.get_json()["results"]) == server.MAX_BATCH_SIZE
+
+def test_score_file_matches_batch(server, client, monkeypatch):
+    """score_file.py validates and scores records exactly like /predict/batch"""
+    records = ["fever", {"symptoms": "   "}, {"age": 30}, {"symptoms": "throwing up, tummy ache", "age": 70},
+               {"symptoms": "fever headache", "gender": "female"}]
+    expected = client.post('/predict/batch', json={"records": records, "top_k": 2}).get_json()["results"]
+
+    monkeypatch.setattr(score_file, '_worker_snapshot', server.snapshot)
+    lines = score_file.score_chunk(list(enumerate(records)), 2, autocorrect=server.config.SPELL_CORRECTION)
+    assert [json.loads(line) for line in lines] == expected
+
+def test_unreadable_lines_become_error_items(server, monkeypatch, tmp_path):
+    """A line that is not JSON or not UTF-8 gets an error item at its index; the other lines are scored"""
+    path = tmp_path / 'input.jsonl'
+    path.write_bytes(b'{"symptoms": "fever"}\n{"symptoms": \n\n"\xff\xfe"\n{"symptoms": "cough"}\n')
+    records = list(score_file.read_records(str(path)))
+    assert len(records) == 4
+
+    monkeypatch.setattr(score_file, '_worker_snapshot', server.snapshot)
+    items = [json.loads(line) for line in score_file.score_chunk(list(enumerate(records)), 1)]
+    assert [item["index"] for item in items] == [0, 1, 2, 3]
+    assert "results" in items[0] and "results" in items[3]
+    assert items[1]["error"].startswith("Line is not valid JSON")
+    assert items[2]["error"].startswith("Line is not valid UTF-8")
+    assert [json.loads(line) for line in score_file.score_chunk([(1, records[1])], 1)] == [items[1]]
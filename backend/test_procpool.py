@@ -0,0 +1,48 @@
+"""Process-pool scoring from shared-memory arrays, and readiness waiting for the pool"""
+
+from types import SimpleNamespace
+import numpy as np
+
+from engine import compile_artifacts, CompiledEngine
+from procpool import InferencePool
+
+def test_inference_pool_matches_in_process(pickles, texts):
+    """Worker processes scoring from shared memory return the in-process probabilities"""
+    model, tfidf, label_encoder = pickles
+    engine = CompiledEngine(*compile_artifacts(tfidf, model, label_encoder))
+    class_names = [str(name) for name in label_encoder.inverse_transform(model.classes_)]
+
+    pool = InferencePool(SimpleNamespace(engine=engine, class_names=class_names, version='test'), 2)
+    try:
+        expected = model.predict_proba(tfidf.transform(texts))
+        assert np.array_equal(pool.predict_proba(texts), expected)
+        assert np.array_equal(pool.predict_proba(texts[:1]), expected[:1])
+    finally:
+        pool.close()
+
+def test_no_replacement_after_close(pickles):
+    """A worker failure noticed after close() does not start a worker on the released shared memory"""
+    model, tfidf, label_encoder = pickles
+    engine = CompiledEngine(*compile_artifacts(tfidf, model, label_encoder))
+    pool = InferencePool(SimpleNamespace(engine=engine, class_names=list(model.classes_), version='test'), 1)
+    pool.close()
+    pool._replace_worker(0)
+    assert pool.restarts == 0
+    assert pool.info()['alive'] == 0
+
+def test_readiness_waits_for_the_pool(server, client, monkeypatch):
+    """/readyz answers 503 until warm_up has started the process's pool"""
+    monkeypatch.setattr(server.config, 'INFERENCE_PROCESSES', 1)
+    try:
+        server.load_resources()
+        server.warm_up(start_pool=False)
+        assert client.get('/readyz').status_code == 503
+        assert server.inference_pool_for(server.snapshot) is None
+
+        server.warm_up()
+        assert client.get('/readyz').status_code == 200
+        assert client.get('/health').get_json()['inference_pool']['alive'] == 1
+        assert client.post('/predict', json={"symptoms": "fever cough"}).status_code == 200
+    finally:
+        server.close_inference_pool()
+        server.inference_pool = None
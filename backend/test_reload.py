@@ -0,0 +1,73 @@
+"""Hot reload: failed loads keep the old model, good ones swap it and its cache, the watcher notices new files"""
+
+import os
+import shutil
+import time
+
+import pytest
+
+from cache import PredictionCache
+from registry import ModelRegistry
+
+@pytest.fixture
+def reloadable(server, monkeypatch):
+    """The app with its snapshot, registry, cache and reload status restored after the test"""
+    monkeypatch.setattr(server, 'snapshot', server.snapshot)
+    monkeypatch.setattr(server, 'model_registry', ModelRegistry())
+    monkeypatch.setattr(server, 'prediction_cache', PredictionCache(100, 60))
+    monkeypatch.setattr(server, 'reload_status', dict(server.reload_status))
+    return server
+
+def pickle_model_dir(server, path):
+    """A model directory with the pickled artifacts only, which load as a different version than the bundle"""
+    for name in ('model.pkl', 'tfidf.pkl', 'label_encoder.pkl', 'mapping.json'):
+        shutil.copy(os.path.join(os.path.dirname(server.__file__), name), path)
+    return str(path)
+
+def test_failed_reload_keeps_the_old_snapshot(reloadable, client, tmp_path):
+    """A directory without a model is rejected and the current snapshot keeps serving"""
+    before = reloadable.snapshot
+    last_success = reloadable.reload_status['last_success']
+    assert reloadable.reload_model(str(tmp_path)) is False
+    assert reloadable.snapshot is before
+    assert reloadable.reload_status['last_error'].startswith('FileNotFoundError')
+    assert reloadable.reload_status['last_success'] == last_success
+    assert reloadable.reload_status['in_progress'] is False
+    assert client.post('/predict', json={"symptoms": "fever"}).status_code == 200
+
+def test_reload_swaps_snapshot_and_cache_version(reloadable, client, tmp_path):
+    """A good reload replaces the snapshot in one step and cached rows of the old version are not served"""
+    before = reloadable.snapshot
+    cache = reloadable.prediction_cache
+    expected = client.post('/predict', json={"symptoms": "fever, cough"}).get_json()
+    assert {version for version, _ in cache._entries} == {before.version}
+
+    assert reloadable.reload_model(pickle_model_dir(reloadable, tmp_path)) is True
+    after = reloadable.snapshot
+    assert after is not before and after.version != before.version
+    assert reloadable.model_registry.get() is after
+    assert reloadable.reload_status['last_error'] is None
+    assert cache.stats()['size'] == 0
+
+    # Same model, so the same answer, now cached under the new version
+    assert client.post('/predict', json={"symptoms": "fever, cough"}).get_json() == expected
+    assert {version for version, _ in cache._entries} == {after.version}
+
+def test_watcher_reloads_on_mtime_change(reloadable, monkeypatch, tmp_path):
+    """Touching an artifact file makes the watcher call reload_model for its directory"""
+    model_dir = pickle_model_dir(reloadable, tmp_path)
+    calls = []
+    monkeypatch.setattr(reloadable, 'reload_model', calls.append)
+    monkeypatch.setattr(reloadable, '_watcher_pid', None)
+    stop = reloadable.start_artifact_watcher(interval=0.01, model_dir=model_dir)
+    try:
+        time.sleep(0.05)
+        assert calls == []
+        mapping_path = os.path.join(model_dir, 'mapping.json')
+        os.utime(mapping_path, (time.time(), os.path.getmtime(mapping_path) + 10))
+        deadline = time.monotonic() + 5
+        while not calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert calls == [model_dir]
+    finally:
+        stop.set()
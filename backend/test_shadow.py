@@ -0,0 +1,109 @@
+"""ShadowScorer agreement counting, the bounded queue, and isolation of failing shadows"""
+
+import threading
+import time
+
+import numpy as np
+
+from registry import ModelRegistry
+from shadow import ShadowScorer
+
+class FakeSnapshot:
+    """Stands in for a ModelSnapshot: predict_proba puts all mass on a fixed class per text"""
+
+    def __init__(self, class_names, answers=None, gate=None, error=None):
+        self.class_names = class_names
+        self.answers = answers or {}
+        self.gate = gate
+        self.error = error
+        self.entered = threading.Event()
+
+    def predict_proba(self, symptom_texts):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        rows = np.zeros((len(symptom_texts), len(self.class_names)))
+        for i, text in enumerate(symptom_texts):
+            rows[i, self.class_names.index(self.answers.get(text, self.class_names[0]))] = 1.0
+        return rows
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert condition()
+
+def test_agreement_counters():
+    """Top-1 agreement is compared by class name, so shadows may order their classes differently"""
+    primary = FakeSnapshot(['flu', 'cold'])
+    registry = ModelRegistry()
+    registry.register('primary', primary, primary=True)
+    registry.register('same', FakeSnapshot(['cold', 'flu'], {'a': 'flu', 'b': 'cold', 'c': 'flu'}))
+    registry.register('other', FakeSnapshot(['flu', 'cold'], {'a': 'cold', 'b': 'cold', 'c': 'cold'}))
+    scorer = ShadowScorer(registry, fraction=1.0)
+
+    rows = primary.predict_proba(['a', 'b', 'c'])
+    rows[1] = [0.0, 1.0]
+    assert scorer.offer(primary, ['a', 'b', 'c'], rows)
+    wait_for(lambda: all(model['texts'] == 3 for model in scorer.stats()['models'].values())
+             and len(scorer.stats()['models']) == 2)
+
+    stats = scorer.stats()
+    assert stats['sampled'] == 1 and stats['dropped'] == 0
+    assert stats['models']['same']['top1_agreement'] == 1.0
+    assert stats['models']['other']['top1_agreement'] == round(1 / 3, 4)
+    assert stats['models']['other']['requests'] == 1
+
+def test_full_queue_drops_instead_of_blocking():
+    """With the worker busy and the queue full, offer returns at once and counts the drop"""
+    gate = threading.Event()
+    primary = FakeSnapshot(['flu'])
+    shadow = FakeSnapshot(['flu'], gate=gate)
+    registry = ModelRegistry()
+    registry.register('primary', primary, primary=True)
+    registry.register('shadow', shadow)
+    scorer = ShadowScorer(registry, fraction=1.0, queue_size=1)
+    rows = primary.predict_proba(['a'])
+    try:
+        assert scorer.offer(primary, ['a'], rows)
+        assert shadow.entered.wait(5)
+        assert scorer.offer(primary, ['a'], rows)
+        started = time.monotonic()
+        assert not scorer.offer(primary, ['a'], rows)
+        assert time.monotonic() - started < 1
+        stats = scorer.stats()
+        assert (stats['sampled'], stats['dropped'], stats['queued']) == (3, 1, 1)
+    finally:
+        gate.set()
+    wait_for(lambda: scorer.stats()['models'].get('shadow', {}).get('requests') == 2)
+
+def test_nothing_is_sampled_without_shadows_or_fraction():
+    primary = FakeSnapshot(['flu'])
+    registry = ModelRegistry()
+    registry.register('primary', primary, primary=True)
+    assert not ShadowScorer(registry, fraction=1.0).offer(primary, ['a'], primary.predict_proba(['a']))
+    registry.register('shadow', FakeSnapshot(['flu']))
+    assert not ShadowScorer(registry, fraction=0.0).offer(primary, ['a'], primary.predict_proba(['a']))
+
+def test_failing_shadow_does_not_change_the_response(server, client, monkeypatch):
+    """A shadow that raises leaves the primary's answer as it was, and the worker keeps going"""
+    expected = client.post('/predict', json={"symptoms": "fever, cough"}).get_json()
+
+    failing = FakeSnapshot(list(server.snapshot.class_names), error=RuntimeError("shadow is broken"))
+    registry = ModelRegistry()
+    registry.register(server.config.MODEL_NAME, server.snapshot, primary=True)
+    registry.register('broken', failing)
+    scorer = ShadowScorer(registry, fraction=1.0)
+    monkeypatch.setattr(server, 'shadow_scorer', scorer)
+
+    for _ in range(2):
+        assert client.post('/predict', json={"symptoms": "fever, cough"}).get_json() == expected
+    assert client.post('/predict/batch', json={"records": [{"symptoms": "fever, cough"}]}).status_code == 200
+    wait_for(lambda: scorer.stats()['queued'] == 0 and scorer.stats()['sampled'] == 3)
+
+    # The worker survived the failures and still scores a working shadow
+    registry.register('working', FakeSnapshot(list(server.snapshot.class_names)))
+    client.post('/predict', json={"symptoms": "fever, cough"})
+    wait_for(lambda: 'working' in scorer.stats()['models'])
@@ -0,0 +1,41 @@
+"""Partial top-k selection against a full stable sort, and what a snapshot builds at load time"""
+
+import os
+
+import numpy as np
+
+from snapshot import load_snapshot, top_k_indices
+
+def sorted_top_k(probabilities, k):
+    """Reference: a full descending sort that keeps ties in class index order"""
+    return sorted(range(len(probabilities)), key=lambda i: probabilities[i], reverse=True)[:k]
+
+def test_top_k_matches_full_sort():
+    """Rows with ties at, above and below the k-th value, for every k including k >= n_classes"""
+    rows = [
+        [0.1, 0.4, 0.1, 0.4, 0.0],
+        [0.2, 0.2, 0.2, 0.2, 0.2],
+        [0.0, 0.0, 1.0, 0.0, 0.0],
+        [0.3, 0.1, 0.3, 0.1, 0.2],
+        [0.25, 0.25, 0.1, 0.1, 0.1, 0.1, 0.1],
+        [0.5],
+    ]
+    rng = np.random.default_rng(0)
+    # Few distinct values, so most rows have ties around the k-th largest
+    rows += [list(rng.integers(0, 4, size=10) / 10) for _ in range(200)]
+
+    for row in rows:
+        probabilities = np.array(row)
+        for k in range(1, len(row) + 3):
+            assert list(top_k_indices(probabilities, k)) == sorted_top_k(row, k), (row, k)
+
+def test_vocabulary_copies_are_built_on_first_use():
+    """Loading a snapshot does not build the autocomplete or spelling indexes"""
+    snapshot = load_snapshot(os.path.dirname(os.path.abspath(__file__)))
+    assert snapshot._suggest_index is None and snapshot._corrector is None
+    # The explainer only names the terms its tree tests
+    tested = {name for name in snapshot.explainer.feature_names if name is not None}
+    assert tested and tested <= set(snapshot.tfidf.vocabulary_)
+    assert snapshot.corrector.correct_token("hedache") == "headache"
+    assert snapshot._suggest_index is not None
+    assert snapshot.corrector is snapshot.corrector
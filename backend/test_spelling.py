@@ -0,0 +1,50 @@
+"""Spelling correction: typos of symptoms are fixed, real words one edit from a symptom are not"""
+
+import pytest
+
+from spelling import COMMON_WORDS_FILE, DEFAULT_TOKEN_PATTERN, SpellingCorrector, read_word_list
+
+def build_corrector(tfidf, known_words=True):
+    """A corrector over the shipped vectorizer's vocabulary, with or without the common word list"""
+    return SpellingCorrector(
+        tfidf.vocabulary_, tfidf.build_analyzer(), getattr(tfidf, 'token_pattern', None) or DEFAULT_TOKEN_PATTERN,
+        known_words=read_word_list(COMMON_WORDS_FILE) if known_words else None)
+
+@pytest.fixture
+def tfidf(pickles):
+    return pickles[1]
+
+def test_misspellings_are_corrected(tfidf):
+    """Typos of symptom terms map back to the vocabulary"""
+    corrector = build_corrector(tfidf)
+    assert corrector.correct("hedache and nausia") == (
+        "headache and nausea",
+        [{"from": "hedache", "to": "headache"}, {"from": "nausia", "to": "nausea"}])
+
+def test_real_words_are_left_alone(tfidf):
+    """Common words close to a symptom term are not treated as typos"""
+    corrector = build_corrector(tfidf)
+    for text in ["I feel rough", "pain at night", "my throat is tight", "not sure", "a fight"]:
+        assert corrector.correct(text) == (text, []), text
+    for word in ["rough", "night", "tight", "sure"]:
+        assert corrector.correct_token(word) is None, word
+
+def test_minimum_lengths_without_the_word_list(tfidf):
+    """The minimum lengths alone keep short words from being rewritten"""
+    corrector = build_corrector(tfidf, known_words=False)
+    for word in ["rough", "night", "tight", "sure"]:
+        assert corrector.correct_token(word) is None, word
+    assert corrector.correct_token("hedache") == "headache"
+
+def test_index_is_built_on_first_lookup(tfidf):
+    """Creating a corrector costs nothing until a long enough token is looked up"""
+    corrector = build_corrector(tfidf)
+    assert corrector.correct("fever and cough") == ("fever and cough", [])
+    assert corrector.index is None
+    assert corrector.correct_token("nausia") == "nausea"
+    index = corrector.index
+    assert index is not None
+    # Short terms are stored without the deletions a lookup never reaches
+    assert "fvr" not in index and "cugh" not in index
+    assert corrector.correct_token("hedache") == "headache"
+    assert corrector.index is index
@@ -0,0 +1,54 @@
+"""SuggestIndex counting and ranking, and the /symptoms/suggest endpoint"""
+
+from suggest import SuggestIndex
+
+TEXTS = [
+    "fever, shortness of breath",
+    "fever, shortness of breath, severe headache",
+    "mild fever, cough",
+    "severe headache",
+]
+
+def build(texts=TEXTS):
+    """An index over the words of texts, with a whitespace analyzer"""
+    words = sorted({word for text in texts for word in text.replace(',', ' ').split()})
+    return SuggestIndex.build({word: index for index, word in enumerate(words)}, texts,
+                              lambda text: text.replace(',', ' ').split())
+
+def test_each_text_counts_once():
+    """A phrase that is also a vocabulary term is not counted twice for the same text"""
+    index = build()
+    assert index.frequency["fever"] == 3
+    assert index.frequency["mild fever"] == 1
+    assert index.frequency["shortness"] == 2
+    assert index.frequency["shortness of breath"] == 2
+
+def test_phrases_rank_ahead_of_fragments():
+    """A whole phrase beats the vocabulary fragments it is made of, however frequent they are"""
+    index = build()
+    assert index.suggest("s") == ["severe headache", "shortness of breath", "severe", "shortness"]
+    assert index.suggest("shortness") == ["shortness of breath", "shortness"]
+    assert index.suggest("fe") == ["fever", "mild fever"]
+    assert index.suggest("hea", 1) == ["severe headache"]
+
+def test_short_prefixes_match_a_full_scan():
+    """The precomputed answers for short prefixes are the best ranked matching suggestions"""
+    index = build()
+    for prefix in ["s", "se", "f", "b", "he", "o", "of", "x", "sh"]:
+        matching = [text for text in index.suggestions
+                    if any(word.startswith(prefix) for word in text.split(' '))]
+        for limit in (1, 3, 20):
+            assert index.suggest(prefix, limit) == matching[:limit], (prefix, limit)
+
+def test_suggest_endpoint(client):
+    """Phrases come first, and only the text after the last comma is matched"""
+    response = client.get('/symptoms/suggest?q=s&limit=20')
+    assert response.status_code == 200
+    suggestions = response.get_json()['suggestions']
+    assert suggestions.index("shortness of breath") < suggestions.index("shortness")
+
+    assert client.get('/symptoms/suggest?q=fever,%20hea').get_json() == \
+        {"query": "fever, hea", "suggestions": client.get('/symptoms/suggest?q=hea').get_json()['suggestions']}
+    assert "headache" in client.get('/symptoms/suggest?q=fever,hea').get_json()['suggestions']
+    assert client.get('/symptoms/suggest?q=fever,').get_json()['suggestions'] == []
+    assert client.get('/symptoms/suggest?q=hea&limit=0').status_code == 400
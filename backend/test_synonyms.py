@@ -0,0 +1,16 @@
+"""Aho-Corasick phrase matching and layman phrase rewriting"""
+
+from synonyms import PhraseMatcher, SynonymRewriter
+
+def test_synonym_rewriting():
+    """The automaton finds every occurrence, and rewriting keeps whole, leftmost-longest phrases"""
+    phrases = ['he', 'she', 'his', 'hers', 'throwing up', 'up']
+    text = 'ushers throwing up his hershe'
+    expected = sorted((i, i + len(p)) for p in phrases for i in range(len(text)) if text.startswith(p, i))
+    assert sorted(PhraseMatcher(phrases).find(text)) == expected
+
+    rewriter = SynonymRewriter({"vomiting": ["throwing up", "Threw  up"], "abdominal pain": ["tummy ache", "ache"]})
+    assert rewriter.rewrite("Tummy ache, THREW up; toothache") == (
+        "abdominal pain, vomiting; toothache",
+        [{"from": "Tummy ache", "to": "abdominal pain"}, {"from": "THREW up", "to": "vomiting"}])
+    assert rewriter.rewrite("fever") == ("fever", [])
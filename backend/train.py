@@ -0,0 +1,225 @@
+"""
+Training pipeline for the disease prediction model
+
+Fits the TF-IDF vectorizer, the decision tree classifier and the label encoder
+on symptomsense_final_40diseases.csv, choosing hyperparameters with a
+cross-validated grid search that runs in parallel on all cores. Fitted
+vectorizers are cached on disk between runs (joblib.Memory), so repeated
+searches over the same data skip re-tokenizing and re-vectorizing.
+
+Every run writes a versioned artifact directory:
+
+    artifacts/<version>/
+        model.pkl, tfidf.pkl, label_encoder.pkl   pickles (legacy loader)
+        model.bundle                              what the server loads
+        mapping.json                              disease information
+        manifest.json                             parameters, metrics, timings, dataset hash
+
+With --install the new artifacts are also copied into the serving directory,
+where the artifact watcher or POST /admin/reload picks them up.
+
+Examples:
+
+    python train.py
+    python train.py --folds 10 --jobs 8 --install
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+from joblib import Memory, dump as joblib_dump
+from sklearn import __version__ as sklearn_version
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+from sklearn.tree import DecisionTreeClassifier
+
+import config
+from bundle import BUNDLE_FILE, write_bundle
+from engine import compile_artifacts
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET = os.path.join(BASE_DIR, 'symptomsense_final_40diseases.csv')
+ARTIFACTS_DIR = os.path.join(BASE_DIR, 'artifacts')
+CACHE_DIR = os.path.join(BASE_DIR, '.train_cache')
+
+RANDOM_STATE = 42
+
+# Hyperparameter grid searched with cross-validation
+PARAM_GRID = {
+    'tfidf__ngram_range': [(1, 1), (1, 2)],
+    'tfidf__sublinear_tf': [False, True],
+    'clf__criterion': ['gini', 'entropy'],
+    'clf__max_depth': [None, 10, 20],
+    'clf__min_samples_leaf': [1, 2, 4],
+}
+
+# Files copied into the serving directory by --install
+SERVING_FILES = ['model.pkl', 'tfidf.pkl', 'label_encoder.pkl', 'mapping.json', BUNDLE_FILE]
+
+def load_dataset(path=DATASET):
+    """Read the training CSV as a list of row dicts"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def file_sha256(path):
+    """Hex SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def mapping_from_dataset(rows):
+    """Build mapping.json content from the per-row disease columns (first row per disease wins)"""
+    mapping = {}
+    for row in rows:
+        mapping.setdefault(row['disease'], {
+            "severity": row['severity'],
+            "medication": row['medication'],
+            "recommendation": row['recommendation'],
+            "description": row['description']
+        })
+    return dict(sorted(mapping.items()))
+
+def build_pipeline(cache_dir):
+    """TF-IDF + decision tree pipeline; fitted vectorizers are memoized in cache_dir"""
+    memory = Memory(cache_dir, verbose=0) if cache_dir else None
+    return Pipeline([
+        ('tfidf', TfidfVectorizer(stop_words='english', max_features=1000)),
+        ('clf', DecisionTreeClassifier(random_state=RANDOM_STATE)),
+    ], memory=memory)
+
+def train(dataset=DATASET, folds=5, jobs=-1, cache_dir=CACHE_DIR, mapping_path=None):
+    """
+    Run the grid search and refit on the full dataset
+
+    Returns (tfidf, model, label_encoder, mapping, manifest).
+    """
+    started = time.perf_counter()
+    rows = load_dataset(dataset)
+    texts = [row['symptoms'] for row in rows]
+
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform([row['disease'] for row in rows])
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+    search = GridSearchCV(
+        build_pipeline(cache_dir), PARAM_GRID, cv=cv, scoring='accuracy', n_jobs=jobs, refit=True
+    )
+    search_started = time.perf_counter()
+    search.fit(texts, y)
+    search_seconds = time.perf_counter() - search_started
+
+    best = search.best_estimator_
+    tfidf = best.named_steps['tfidf']
+    model = best.named_steps['clf']
+    # Only for introspection, and it grows with the dataset; transform() does not need it
+    if hasattr(tfidf, 'stop_words_'):
+        del tfidf.stop_words_
+    best_index = search.best_index_
+    fold_scores = [float(search.cv_results_[f'split{i}_test_score'][best_index]) for i in range(folds)]
+
+    if mapping_path and os.path.exists(mapping_path):
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+    else:
+        mapping = mapping_from_dataset(rows)
+
+    manifest = {
+        "dataset": os.path.basename(dataset),
+        "dataset_sha256": file_sha256(dataset),
+        "rows": len(rows),
+        "classes": [str(name) for name in label_encoder.classes_],
+        "best_params": {key: list(value) if isinstance(value, tuple) else value
+                        for key, value in search.best_params_.items()},
+        "metrics": {
+            "cv_folds": folds,
+            "cv_accuracy_mean": round(float(np.mean(fold_scores)), 4),
+            "cv_accuracy_std": round(float(np.std(fold_scores)), 4),
+            "cv_fold_accuracy": [round(score, 4) for score in fold_scores],
+            "train_accuracy": round(float(best.score(texts, y)), 4),
+            "candidates_evaluated": len(search.cv_results_['params'])
+        },
+        "vocabulary_size": len(tfidf.vocabulary_),
+        "tree_nodes": int(model.tree_.node_count),
+        "tree_depth": int(model.tree_.max_depth),
+        "timing_seconds": {
+            "search": round(search_seconds, 3),
+            "total": round(time.perf_counter() - started, 3)
+        },
+        "sklearn_version": sklearn_version,
+        "python_version": sys.version.split()[0]
+    }
+    return tfidf, model, label_encoder, mapping, manifest
+
+def write_artifacts(output_dir, tfidf, model, label_encoder, mapping, manifest):
+    """Write the pickles, the bundle, the mapping and the manifest into output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    joblib_dump(model, os.path.join(output_dir, 'model.pkl'))
+    joblib_dump(tfidf, os.path.join(output_dir, 'tfidf.pkl'))
+    joblib_dump(label_encoder, os.path.join(output_dir, 'label_encoder.pkl'))
+    with open(os.path.join(output_dir, 'mapping.json'), 'w', encoding='utf-8') as f:
+        json.dump(mapping, f, indent=4)
+
+    arrays, meta = compile_artifacts(tfidf, model, label_encoder)
+    write_bundle(os.path.join(output_dir, BUNDLE_FILE), arrays, meta, mapping)
+
+    manifest = dict(manifest)
+    manifest["files"] = {name: file_sha256(os.path.join(output_dir, name))
+                         for name in sorted(os.listdir(output_dir)) if name != 'manifest.json'}
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def install_artifacts(artifact_dir, serving_dir):
+    """Copy the serving files into place; each file is swapped in with an atomic rename"""
+    for name in SERVING_FILES:
+        source = os.path.join(artifact_dir, name)
+        target = os.path.join(serving_dir, name)
+        shutil.copyfile(source, target + '.tmp')
+        os.replace(target + '.tmp', target)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the disease prediction model and emit serving artifacts")
+    parser.add_argument('--dataset', default=DATASET, help="training CSV")
+    parser.add_argument('--folds', type=int, default=5, help="cross-validation folds")
+    parser.add_argument('--jobs', type=int, default=-1, help="parallel jobs for the search (-1 = all cores)")
+    parser.add_argument('--output-dir', default=ARTIFACTS_DIR, help="parent directory for versioned artifacts")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="vectorizer cache directory ('' disables it)")
+    parser.add_argument('--mapping', default=os.path.join(BASE_DIR, 'mapping.json'),
+                        help="disease mapping to ship (derived from the dataset if missing)")
+    parser.add_argument('--install', action='store_true', help="copy the new artifacts into the serving directory")
+    args = parser.parse_args(argv)
+
+    print("Training on", args.dataset)
+    tfidf, model, label_encoder, mapping, manifest = train(
+        args.dataset, folds=args.folds, jobs=args.jobs, cache_dir=args.cache_dir or None, mapping_path=args.mapping
+    )
+
+    version = time.strftime('%Y%m%d-%H%M%S', time.gmtime()) + '-' + manifest['dataset_sha256'][:8]
+    manifest = dict(manifest, version=version, trained_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+    artifact_dir = os.path.join(args.output_dir, version)
+    write_artifacts(artifact_dir, tfidf, model, label_encoder, mapping, manifest)
+
+    metrics = manifest['metrics']
+    print(f"[OK] Best params: {manifest['best_params']}")
+    print(f"[OK] CV accuracy {metrics['cv_accuracy_mean']:.4f} ± {metrics['cv_accuracy_std']:.4f} "
+          f"over {metrics['candidates_evaluated']} candidates in {manifest['timing_seconds']['search']:.2f}s")
+    print(f"[OK] Artifacts written to {artifact_dir}")
+
+    if args.install:
+        install_artifacts(artifact_dir, config.MODEL_DIR)
+        print(f"[OK] Installed into {config.MODEL_DIR}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
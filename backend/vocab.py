@@ -0,0 +1,245 @@
+"""
+Compact vocabulary for the compiled vectorizer
+
+A Python dict vocabulary costs roughly 100 bytes per term (the str object, the
+int, the hash table slot) in every worker, and it grows with each retrain on a
+larger dataset. CompactVocabulary stores the same term -> feature index mapping
+as three flat arrays:
+
+- vocab_bytes: every term's UTF-8 bytes, concatenated in byte order,
+- vocab_offsets: where each term starts (n + 1 entries, so term i is
+  vocab_bytes[offsets[i]:offsets[i + 1]]),
+- vocab_indices: the feature index of each sorted term.
+
+Lookups binary-search the sorted terms, so the arrays can stay memory-mapped
+from the model bundle (or in shared memory for the inference pool) without a
+per-process copy. The class is a read-only Mapping, so code written against
+TfidfVectorizer.vocabulary_ keeps working.
+
+Run directly for a memory report comparing the dict and compact forms, or
+for the memory of a whole loaded ModelSnapshot (including the structures it
+only builds on first use: the autocomplete index and the spelling index):
+
+    python vocab.py
+    python vocab.py --terms 200000
+    python vocab.py --snapshot .
+"""
+
+import argparse
+import os
+import pickle
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+def compile_vocabulary(terms):
+    """Build the vocab_bytes, vocab_offsets and vocab_indices arrays for terms ordered by feature index"""
+    entries = sorted((str(term).encode('utf-8'), index) for index, term in enumerate(terms))
+    offsets = np.zeros(len(entries) + 1, dtype=np.uint32)
+    np.cumsum([len(data) for data, _ in entries], out=offsets[1:])
+    return {
+        'vocab_bytes': np.frombuffer(b''.join(data for data, _ in entries), dtype=np.uint8),
+        'vocab_offsets': offsets,
+        'vocab_indices': np.array([index for _, index in entries], dtype=np.uint32),
+    }
+
+class CompactVocabulary(Mapping):
+    """Read-only term -> feature index mapping over sorted UTF-8 terms in one buffer"""
+
+    def __init__(self, vocab_bytes, vocab_offsets, vocab_indices):
+        # Memoryviews index as plain ints without copying the (possibly memory-mapped) arrays
+        self._arrays = (vocab_bytes, vocab_offsets, vocab_indices)
+        self._bytes = memoryview(np.ascontiguousarray(vocab_bytes, dtype=np.uint8))
+        self._offsets = memoryview(np.ascontiguousarray(vocab_offsets, dtype=np.uint32))
+        self._indices = memoryview(np.ascontiguousarray(vocab_indices, dtype=np.uint32))
+        self._size = len(self._indices)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Wrap the vocab_* arrays of a compiled engine"""
+        return cls(arrays['vocab_bytes'], arrays['vocab_offsets'], arrays['vocab_indices'])
+
+    @classmethod
+    def from_terms(cls, terms):
+        """Build from terms ordered by feature index (bundles written without the vocab_* arrays)"""
+        return cls.from_arrays(compile_vocabulary(terms))
+
+    def _term_bytes(self, position):
+        return self._bytes[self._offsets[position]:self._offsets[position + 1]].tobytes()
+
+    def get(self, term, default=None):
+        """Feature index of term, or default when it is not in the vocabulary"""
+        if not isinstance(term, str):
+            return default
+        key = term.encode('utf-8')
+        data, offsets = self._bytes, self._offsets
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) >> 1
+            probe = data[offsets[middle]:offsets[middle + 1]].tobytes()
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return self._indices[middle]
+        return default
+
+    def __getitem__(self, term):
+        index = self.get(term)
+        if index is None:
+            raise KeyError(term)
+        return index
+
+    def __contains__(self, term):
+        return self.get(term) is not None
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for position in range(self._size):
+            yield self._term_bytes(position).decode('utf-8')
+
+    def items(self):
+        """(term, feature index) pairs in term byte order"""
+        for position in range(self._size):
+            yield self._term_bytes(position).decode('utf-8'), self._indices[position]
+
+    @property
+    def nbytes(self):
+        """Size of the three arrays"""
+        return self._bytes.nbytes + self._offsets.nbytes + self._indices.nbytes
+
+def _rss_bytes():
+    """Resident set size of this process (Linux), or None where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def _measure(kind, path, probes, result):
+    """Child process: RSS growth from loading one vocabulary form from disk and looking terms up"""
+    before = _rss_bytes()
+    if kind == 'dict':
+        # How a worker gets it: unpickled along with the TfidfVectorizer
+        with open(path, 'rb') as f:
+            vocabulary = pickle.load(f)
+    else:
+        # How a worker gets it: memory-mapped arrays from the model bundle
+        vocabulary = CompactVocabulary.from_arrays({
+            name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+            for name in ('vocab_bytes', 'vocab_offsets', 'vocab_indices')
+        })
+    found = sum(1 for term in probes if term in vocabulary)
+    after = _rss_bytes()
+    result.put((before, after, found))
+
+def memory_report(terms):
+    """RSS growth of loading the dict and compact forms of a vocabulary, each in a fresh process"""
+    import multiprocessing
+    import tempfile
+
+    context = multiprocessing.get_context('spawn')
+    arrays = compile_vocabulary(terms)
+    report = {"terms": len(terms), "compact_nbytes": sum(array.nbytes for array in arrays.values())}
+    # Look up a sample of terms so the memory the lookups touch is counted
+    probes = [str(term) for term in terms[::max(1, len(terms) // 1000)]]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {'dict': os.path.join(tmp, 'vocabulary.pkl'), 'compact': tmp}
+        with open(paths['dict'], 'wb') as f:
+            pickle.dump({str(term): index for index, term in enumerate(terms)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, name + '.npy'), array)
+        for kind in ('dict', 'compact'):
+            result = context.Queue()
+            process = context.Process(target=_measure, args=(kind, paths[kind], probes, result))
+            process.start()
+            before, after, found = result.get()
+            process.join()
+            if found != len(probes):
+                raise RuntimeError(f"{kind} vocabulary found {found} of {len(probes)} terms")
+            report[kind] = None if before is None else after - before
+    return report
+
+def _measure_snapshot(model_dir, result):
+    """Child process: RSS growth from loading a snapshot, then from building its on-demand indexes"""
+    import contextlib
+    import io
+
+    from snapshot import load_snapshot
+
+    before = _rss_bytes()
+    with contextlib.redirect_stdout(io.StringIO()):
+        snapshot = load_snapshot(model_dir)
+    loaded = _rss_bytes()
+    snapshot.suggest_index
+    suggest = _rss_bytes()
+    snapshot.corrector.build_index()
+    spelling = _rss_bytes()
+    result.put((len(snapshot.tfidf.vocabulary_), before, loaded, suggest, spelling))
+
+def snapshot_report(model_dir):
+    """RSS growth of loading a ModelSnapshot from model_dir and of each index it builds on first use"""
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')
+    result = context.Queue()
+    process = context.Process(target=_measure_snapshot, args=(model_dir, result))
+    process.start()
+    terms, before, loaded, suggest, spelling = result.get()
+    process.join()
+    if before is None:
+        return {"terms": terms, "load": None, "suggest_index": None, "spelling_index": None}
+    return {"terms": terms, "load": loaded - before, "suggest_index": suggest - loaded,
+            "spelling_index": spelling - suggest}
+
+def _load_terms(bundle_path):
+    from bundle import read_bundle
+
+    arrays, _, _ = read_bundle(bundle_path)
+    return [str(term) for term in arrays['terms']]
+
+def _synthetic_terms(count):
+    """count distinct symptom-like terms, for sizing the report"""
+    stems = ['pain', 'ache', 'fever', 'rash', 'swelling', 'cough', 'itching', 'numbness', 'bleeding', 'fatigue']
+    places = ['chest', 'joint', 'abdominal', 'lower back', 'throat', 'skin', 'eye', 'ear', 'muscle', 'knee']
+    terms = []
+    n = 0
+    while len(terms) < count:
+        terms.append(f"{places[n % len(places)]} {stems[(n // len(places)) % len(stems)]}{n}")
+        n += 1
+    return terms
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the memory of dict and compact vocabularies")
+    parser.add_argument('--bundle', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model.bundle'),
+                        help="model bundle whose vocabulary to measure")
+    parser.add_argument('--terms', type=int, default=0,
+                        help="measure a synthetic vocabulary of this many terms instead of the bundle's")
+    parser.add_argument('--snapshot', metavar='MODEL_DIR',
+                        help="measure a whole ModelSnapshot loaded from this directory instead")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        report = snapshot_report(args.snapshot)
+        if report['load'] is None:
+            print("[X] RSS is not available on this platform")
+            sys.exit(1)
+        print(f"ModelSnapshot with {report['terms']} vocabulary terms:")
+        print(f"  load_snapshot   RSS +{report['load'] / 1024:10.1f} KiB")
+        print(f"  suggest index   RSS +{report['suggest_index'] / 1024:10.1f} KiB  (built on first /symptoms/suggest)")
+        print(f"  spelling index  RSS +{report['spelling_index'] / 1024:10.1f} KiB  (built on first autocorrect)")
+        sys.exit(0)
+
+    terms = _synthetic_terms(args.terms) if args.terms else _load_terms(args.bundle)
+    report = memory_report(terms)
+    if report['dict'] is None:
+        print("[X] RSS is not available on this platform")
+        sys.exit(1)
+    print(f"Vocabulary of {report['terms']} terms:")
+    print(f"  dict     RSS +{report['dict'] / 1024:10.1f} KiB")
+    print(f"  compact  RSS +{report['compact'] / 1024:10.1f} KiB  (arrays {report['compact_nbytes'] / 1024:.1f} KiB,"
+          f" file-backed and shared between workers)")